@@ -0,0 +1,107 @@
+"""Backlink index: out-of-core transpose, query latency and incremental updates.
+
+Saves the synthetic graph of :mod:`benchmarks.bench_graph` (``--nodes``
+articles, ``--degree`` links each on average), builds its
+:class:`~wikiapi.backlinks.BacklinkIndex` with the external sort in
+blocks of ``--block-links`` links, and reports the build time and peak
+memory (``tracemalloc``; mapped arrays are not counted) next to the
+in-memory :meth:`~wikiapi.graph.LinkGraph.transpose`.  It then times
+in-degree and backlink queries, applies ``--updates`` recrawled pages and
+times the queries again before and after :meth:`compact`.
+
+    python -m benchmarks.bench_backlinks [--nodes 100000] [--block-links 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from wikiapi.backlinks import BacklinkIndex
+from wikiapi.index import np
+
+from .bench_graph import synthetic_graph
+
+
+def traced(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def latency(label: str, query, args: list) -> None:
+    times = []
+    for arg in args:
+        start = time.perf_counter()
+        query(arg)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"{label:<30} median {statistics.median(times) * 1e6:7.1f} us,"
+          f" p99 {times[int(len(times) * 0.99)] * 1e6:8.1f} us")
+
+
+def queries(index: BacklinkIndex, titles: list[str], nodes: list[int], label: str) -> None:
+    print(f"-- {label}")
+    latency("count(title)", index.count, titles)
+    latency("in_degree(node)", index.in_degree, nodes)
+    latency("sources(node)", index.sources, nodes)
+    latency("backlinks(title), as titles", index.backlinks, titles[:len(titles) // 10])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--degree", type=int, default=20)
+    parser.add_argument("--block-links", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--updates", type=int, default=1_000)
+    args = parser.parse_args()
+
+    graph = synthetic_graph(args.nodes, args.degree)
+    with tempfile.TemporaryDirectory() as tmp:
+        graph.save(tmp)
+        _, elapsed, peak = traced(graph.transpose)
+        print(f"{len(graph):,} nodes, {graph.num_edges:,} links"
+              f" (numpy: {'yes' if np is not None else 'no'})")
+        print(f"in-memory transpose  {elapsed:6.2f}s, peak {peak / 2**20:6.1f} MiB")
+        index, elapsed, peak = traced(lambda: BacklinkIndex.build(
+            tmp, block_links=args.block_links))
+        print(f"external transpose   {elapsed:6.2f}s, peak {peak / 2**20:6.1f} MiB"
+              f" ({args.block_links:,} links per run)")
+
+        rng = random.Random(1)
+        n = len(index)
+        nodes = [rng.randrange(n) for _ in range(args.queries)]
+        titles = [index.title(node) for node in nodes]
+        top = max(range(n), key=index.in_degree)
+        print(f"most linked: {index.title(top)!r}, {index.in_degree(top):,} backlinks"
+              f" ({-(-index.in_degree(top) // 500)} list=backlinks requests)")
+        queries(index, titles, nodes, "mapped arrays")
+
+        start = time.perf_counter()
+        for i in range(args.updates):
+            source = rng.randrange(n)
+            links = [index.title(rng.randrange(n)) for _ in range(args.degree)]
+            links.append(f"New page {i}")
+            index.update(index.title(source), links)
+        elapsed = time.perf_counter() - start
+        print(f"{args.updates:,} recrawled pages applied: {elapsed / args.updates * 1e6:.0f} us"
+              f" per page")
+        queries(index, titles, nodes, f"with {index.pending:,} pending updates")
+        start = time.perf_counter()
+        index.compact()
+        print(f"compact: {time.perf_counter() - start:.2f}s, {len(index):,} nodes")
+        queries(index, titles, nodes, "after compact")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
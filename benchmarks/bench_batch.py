@@ -0,0 +1,63 @@
+"""Request volume of one-title-per-request vs. batched ``action=query`` fetches.
+
+    python -m benchmarks.bench_batch [--titles 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from wikiapi import Crawler, WikiClient
+
+from .mockwiki import MockWiki
+
+
+async def fetch(titles: list[str], batch_size: int) -> tuple[int, float]:
+    async with MockWiki(len(titles)) as wiki:
+        async with WikiClient(wiki.endpoint, batch_size=batch_size) as client:
+            start = time.perf_counter()
+            if batch_size == 1:
+                articles = await asyncio.gather(*(client.fetch_article(t) for t in titles))
+            else:
+                articles = await client.fetch_articles(titles)
+            elapsed = time.perf_counter() - start
+        # Every caller must get its own page back, whatever the batching.
+        for title, article in zip(titles, articles):
+            expected = "Page " + "".join(filter(str.isdigit, title))
+            assert article.title == expected and not article.missing, (title, article.title)
+        return wiki.requests, elapsed
+
+
+async def crawl(pages: int, batch_size: int) -> tuple[int, float]:
+    async with MockWiki(pages * 4) as wiki:
+        start = time.perf_counter()
+        async with Crawler(wiki.endpoint, concurrency=32, max_pages=pages,
+                           batch_size=batch_size) as crawler:
+            async for _ in crawler.crawl(["Page 0"]):
+                pass
+        return wiki.requests, time.perf_counter() - start
+
+
+async def run(count: int) -> None:
+    # A mix of canonical, unnormalized and redirecting titles.
+    titles = [("Page {}", "page_{}", "Redirect {}")[i % 3].format(i) for i in range(count)]
+    print(f"{'workload':<24} {'batch':>5} {'requests':>9} {'seconds':>8}")
+    for batch_size in (1, 50, 500):
+        requests, elapsed = await fetch(titles, batch_size)
+        print(f"{f'fetch {count} titles':<24} {batch_size:>5} {requests:>9} {elapsed:>8.2f}")
+    for batch_size in (1, 50):
+        requests, elapsed = await crawl(count, batch_size)
+        print(f"{f'crawl {count} pages':<24} {batch_size:>5} {requests:>9} {elapsed:>8.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.titles))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Category walks: sequential small batches vs. batched concurrent vs. offline.
+
+Walks the category tree of the mock wiki (``--pages`` pages in
+``--categories`` categories, each with a few subcategories and cycles)
+from ``Category:Cat 0`` with a simulated ``--latency``:
+
+* sequential: one category at a time, 10 members per request;
+* batched: ``cmlimit=max`` and ``--concurrency`` categories at a time;
+* offline: the same walk over a local category graph, no requests.
+
+Prints members found, categories listed, requests and time to the first
+and the last member.
+
+    python -m benchmarks.bench_categories [--pages 50000] [--latency 0.02]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from wikiapi import WikiClient
+from wikiapi.categories import CategoryWalker
+from wikiapi.graph import LinkGraph
+
+from .mockwiki import MockWiki
+
+
+async def measure(label: str, walker: CategoryWalker, wiki: MockWiki) -> None:
+    before = wiki.requests
+    start = time.perf_counter()
+    first = None
+    count = 0
+    async for _member in walker.walk("Cat 0"):
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {count:>8,} {walker.categories:>6,} {wiki.requests - before:>8,}"
+          f" {(first or 0) * 1e3:>9.1f} {elapsed:>8.2f}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with MockWiki(args.pages, categories=args.categories, latency=args.latency) as wiki:
+        edges = [(f"Category:Cat {j}", member["title"]) for j in range(args.categories)
+                 for member in wiki.category_members(f"Category:Cat {j}")]
+        graph = LinkGraph.from_edges(edges)
+        print(f"{'walk':<24} {'members':>8} {'cats':>6} {'requests':>8}"
+              f" {'first ms':>9} {'total s':>8}")
+        async with WikiClient(wiki.endpoint) as client:
+            await measure("sequential, 10/request", CategoryWalker(
+                client, concurrency=1, batch=10), wiki)
+            await measure(f"batched, {args.concurrency} at a time", CategoryWalker(
+                client, concurrency=args.concurrency), wiki)
+        await measure("offline", CategoryWalker(graph=graph), wiki)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=50_000)
+    parser.add_argument("--categories", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Title completion: build time, table size and per-keystroke latency.
+
+Builds a :class:`~wikiapi.complete.TitleCompleter` over ``--titles``
+synthetic titles with Pareto-distributed popularity, saves it, maps it back
+and times completions for prefixes of one to six characters, as typed.
+
+    python -m benchmarks.bench_complete [--titles 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from wikiapi.complete import TitleCompleter
+from wikiapi.index import np
+
+from .bench_index import make_vocabulary
+
+
+def synthetic_titles(count: int, seed: int = 3):
+    rng = random.Random(seed)
+    vocabulary = [w.rstrip("0123456789").capitalize() for w in make_vocabulary(20_000, rng)]
+    seen = set()
+    while len(seen) < count:
+        title = " ".join(rng.choices(vocabulary, k=rng.randint(1, 4)))
+        if title not in seen:
+            seen.add(title)
+            yield title, rng.paretovariate(1.1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=256)
+    args = parser.parse_args()
+
+    titles = list(synthetic_titles(args.titles))
+    start = time.perf_counter()
+    completer = TitleCompleter.from_titles(titles, threshold=args.threshold)
+    build = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "titles.ac")
+        completer.save(path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        completer = TitleCompleter.open(path)
+        opened = time.perf_counter() - start
+        print(f"{len(completer):,} titles, {len(completer._prefixes):,} precomputed prefixes;"
+              f" built in {build:.1f}s, {size / 2**20:.1f} MiB on disk, opened in"
+              f" {opened * 1e3:.2f} ms (numpy: {'yes' if np is not None else 'no'})")
+
+        rng = random.Random(9)
+        sample = [title for title, _ in rng.sample(titles, args.queries)]
+        print(f"{'prefix len':>10} {'median us':>10} {'p99 us':>8}")
+        for length in range(1, 7):
+            times = []
+            for title in sample:
+                prefix = title[:length]
+                start = time.perf_counter()
+                completer.complete(prefix)
+                times.append((time.perf_counter() - start) * 1e6)
+            times.sort()
+            print(f"{length:>10} {statistics.median(times):>10.1f}"
+                  f" {times[int(len(times) * .99)]:>8.1f}")
+        completer.close()
+
+
+if __name__ == "__main__":
+    main()
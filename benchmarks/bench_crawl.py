@@ -0,0 +1,46 @@
+"""Crawl throughput against the local mock wiki at several concurrency levels.
+
+    python -m benchmarks.bench_crawl [--pages 2000] [--latency 0.02]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from wikiapi import Crawler
+
+from .mockwiki import MockWiki
+
+
+async def run(pages: int, latency: float, levels: list[int], connections: int) -> None:
+    print(f"{'concurrency':>11} {'pages':>6} {'seconds':>8} {'pages/s':>9} {'sockets':>7}")
+    for concurrency in levels:
+        async with MockWiki(pages * 4, latency=latency) as wiki:
+            crawler = Crawler(wiki.endpoint, concurrency=concurrency,
+                              max_connections=connections, max_pages=pages)
+            start = time.perf_counter()
+            count = 0
+            async with crawler:
+                async for _ in crawler.crawl(["Page 0"]):
+                    count += 1
+            elapsed = time.perf_counter() - start
+            print(f"{concurrency:>11} {count:>6} {elapsed:>8.2f} {count / elapsed:>9.0f}"
+                  f" {wiki.connections:>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated server latency per request, seconds")
+    parser.add_argument("--connections", type=int, default=32,
+                        help="keep-alive connections per host")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128, 256])
+    args = parser.parse_args()
+    asyncio.run(run(args.pages, args.latency, args.levels, args.connections))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Dump ingestion throughput: single process vs. a process pool.
+
+Generates a synthetic multistream dump (unless ``--dump``/``--index`` point
+at a real one) and reads it sequentially, then in parallel with growing
+worker counts.
+
+    python -m benchmarks.bench_dump [--pages 50000] [--workers 1 2 4 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from wikiapi.dump import DumpReader
+
+from .dumpgen import synthetic_pages, write_multistream
+
+
+def measure(label: str, pages, size: int) -> None:
+    start = time.perf_counter()
+    count = sum(1 for _ in pages)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {count:>8} {elapsed:>8.2f} {count / elapsed:>10.0f}"
+          f" {size / elapsed / 2**20:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=50_000)
+    parser.add_argument("--dump")
+    parser.add_argument("--index")
+    cpus = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1))))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dump:
+            dump, index = args.dump, args.index
+        else:
+            dump, index = write_multistream(tmp, synthetic_pages(args.pages))
+        size = os.path.getsize(dump)
+        reader = DumpReader(dump, index)
+        print(f"dump: {size / 2**20:.1f} MB compressed, {cpus} CPUs")
+        print(f"{'mode':<22} {'pages':>8} {'seconds':>8} {'pages/s':>10} {'MB/s':>9}")
+        measure("sequential", reader.iter_pages(namespaces=None), size)
+        for workers in args.workers:
+            measure(f"parallel x{workers} ordered",
+                    reader.iter_pages_parallel(workers, namespaces=None), size)
+        measure(f"parallel x{args.workers[-1]} unordered",
+                reader.iter_pages_parallel(args.workers[-1], ordered=False, namespaces=None),
+                size)
+
+
+if __name__ == "__main__":
+    main()
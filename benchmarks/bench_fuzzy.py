@@ -0,0 +1,70 @@
+"""Fuzzy title lookup: build time, index size, latency and recall.
+
+Indexes ``--titles`` synthetic titles (1M by default), then looks up
+misspellings made with one or two random edits (substitution, insertion,
+deletion) and reports latency and how often the intended title comes back.
+
+    python -m benchmarks.bench_fuzzy [--titles 1000000] [--queries 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from wikiapi.fuzzy import FuzzyTitleIndex
+from wikiapi.index import np
+
+from .bench_complete import synthetic_titles
+
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def misspell(title: str, edits: int, rng: random.Random) -> str:
+    chars = list(title)
+    for _ in range(edits):
+        pos = rng.randrange(len(chars))
+        op = rng.randrange(3)
+        if op == 0:
+            chars[pos] = rng.choice(_LETTERS)
+        elif op == 1:
+            chars.insert(pos, rng.choice(_LETTERS))
+        elif len(chars) > 1:
+            del chars[pos]
+    return "".join(chars)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--max-distance", type=int, default=2)
+    args = parser.parse_args()
+
+    titles = [title for title, _ in synthetic_titles(args.titles)]
+    start = time.perf_counter()
+    index = FuzzyTitleIndex.from_titles(titles, max_distance=args.max_distance)
+    build = time.perf_counter() - start
+    print(f"{len(index):,} titles indexed in {build:.1f}s, {index.nbytes() / 2**20:.1f} MiB"
+          f" (numpy: {'yes' if np is not None else 'no'})")
+
+    rng = random.Random(4)
+    print(f"{'edits':>5} {'median ms':>10} {'p95 ms':>8} {'recall':>7}")
+    for edits in range(args.max_distance + 1):
+        times = []
+        found = 0
+        for title in rng.sample(titles, args.queries):
+            query = misspell(title, edits, rng)
+            start = time.perf_counter()
+            matches = index.lookup(query, 10)
+            times.append((time.perf_counter() - start) * 1000)
+            found += any(match == title for match, _ in matches)
+        times.sort()
+        print(f"{edits:>5} {statistics.median(times):>10.3f} {times[int(len(times) * .95)]:>8.3f}"
+              f" {found / args.queries:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Link graph: build time, peak memory, size on disk and neighbour lookups.
+
+Builds a :class:`~wikiapi.graph.LinkGraph` over ``--nodes`` synthetic
+articles with ``--degree`` links each on average, targets skewed towards
+popular pages as on Wikipedia, saves it as ``.npy`` arrays, maps it back
+and times title lookups and successor reads.  The size of the English
+Wikipedia graph (6M articles, 150M links) is extrapolated from the
+per-node and per-link cost.
+
+    python -m benchmarks.bench_graph [--nodes 100000] [--degree 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import resource
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from wikiapi.graph import LinkGraph
+from wikiapi.index import np
+
+
+def synthetic_titles(nodes: int) -> list[str]:
+    return [f"Page {i:08d}" for i in range(nodes)]
+
+
+def synthetic_edges(titles: list[str], degree: int, seed: int = 5):
+    """``(source, target)`` pairs; out-degrees vary, popular targets get more links."""
+    rng = random.Random(seed)
+    n = len(titles)
+    for source in titles:
+        for _ in range(int(rng.expovariate(1 / degree))):
+            yield source, titles[int(n * rng.random() ** 3)]
+
+
+def synthetic_graph(nodes: int, degree: int, seed: int = 5) -> LinkGraph:
+    titles = synthetic_titles(nodes)
+    return LinkGraph.from_edges(synthetic_edges(titles, degree, seed), nodes=titles)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--degree", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = synthetic_graph(args.nodes, args.degree)
+    build = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    with tempfile.TemporaryDirectory() as tmp:
+        graph.save(tmp)
+        size = sum(path.stat().st_size for path in Path(tmp).iterdir())
+        start = time.perf_counter()
+        graph = LinkGraph.open(tmp)
+        opened = time.perf_counter() - start
+        n, m = len(graph), graph.num_edges
+        print(f"{n:,} nodes, {m:,} links; built in {build:.1f}s (peak RSS {peak:.0f} MiB),"
+              f" {size / 2**20:.1f} MiB on disk, opened in {opened * 1e3:.2f} ms"
+              f" (numpy: {'yes' if np is not None else 'no'})")
+        per_node = (size - 4 * m) / n
+        print(f"extrapolated to 6M nodes / 150M links: "
+              f"{(6e6 * per_node + 150e6 * 4) / 2**30:.2f} GiB on disk")
+
+        rng = random.Random(7)
+        titles = [graph.title(rng.randrange(n)) for _ in range(args.queries)]
+        times = []
+        for title in titles:
+            start = time.perf_counter()
+            node = graph.id(title)
+            graph.successors(node)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"title -> successors: median {statistics.median(times) * 1e6:.1f} us,"
+              f" p99 {times[int(len(times) * 0.99)] * 1e6:.1f} us")
+        start = time.perf_counter()
+        total = sum(len(graph.successors(rng.randrange(n))) for _ in range(args.queries))
+        elapsed = time.perf_counter() - start
+        print(f"successors by node number: {elapsed / args.queries * 1e6:.1f} us per node,"
+              f" {total / elapsed / 1e6:.1f}M links/s")
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
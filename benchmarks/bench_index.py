@@ -0,0 +1,102 @@
+"""Local BM25 search: build time, memory and query latency.
+
+Indexes ``--docs`` synthetic articles (Zipf-distributed vocabulary) and
+times a mix of rare, common and multi-term queries.  With ``--disk PATH``
+the index is also written in the memory-mapped format, reopened in a fresh
+process to time a cold start, and queried again from the mapping.
+
+    python -m benchmarks.bench_index [--docs 1000000] [--words 150] [--disk PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from wikiapi.diskindex import DiskIndex, write_index
+from wikiapi.index import InvertedIndex, np
+
+_COLD_OPEN = """
+import sys, time
+start = time.perf_counter()
+from wikiapi.diskindex import DiskIndex
+DiskIndex(sys.argv[1]).search("article", 10)
+print(time.perf_counter() - start)
+"""
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=rng.randint(3, 10))) + str(i) for i in range(size)]
+
+
+def documents(count: int, words: int, vocabulary: list[str], seed: int = 1):
+    rng = random.Random(seed)
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for i in range(count):
+        text = " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=words))
+        yield f"Article {i}", text, i + 1
+
+
+def time_queries(index, vocabulary: list[str], count: int) -> None:
+    rng = random.Random(11)
+    groups = {
+        "rare term": lambda: [rng.choice(vocabulary[10_000:])],
+        "mid term": lambda: [rng.choice(vocabulary[100:1000])],
+        "3 mixed terms": lambda: [rng.choice(vocabulary[:100]), rng.choice(vocabulary[100:5000]),
+                                  rng.choice(vocabulary[5000:])],
+    }
+    print(f"{'query':<14} {'median ms':>10} {'p95 ms':>8}")
+    for name, make in groups.items():
+        times = []
+        for _ in range(count):
+            query = " ".join(make())
+            start = time.perf_counter()
+            index.search(query, 10)
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        print(f"{name:<14} {statistics.median(times):>10.2f} {times[int(len(times) * .95)]:>8.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--vocabulary", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--disk", help="also write and query a memory-mapped index here")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    index = InvertedIndex()
+    start = time.perf_counter()
+    for title, text, pageid in documents(args.docs, args.words, vocabulary):
+        index.add(title, text, pageid)
+    build = time.perf_counter() - start
+    postings = sum(len(d) for d, _ in index.postings.values())
+    print(f"indexed {len(index):,} docs, {len(index.postings):,} terms, {postings:,} postings"
+          f" in {build:.1f}s (numpy: {'yes' if np is not None else 'no'})")
+    time_queries(index, vocabulary, args.queries)
+
+    if args.disk:
+        start = time.perf_counter()
+        write_index(index, args.disk)
+        written = time.perf_counter() - start
+        size = os.path.getsize(args.disk)
+        cold = float(subprocess.run([sys.executable, "-c", _COLD_OPEN, args.disk],
+                                    check=True, capture_output=True, text=True).stdout)
+        print(f"\nwrote {size / 2**20:.1f} MiB in {written:.1f}s; fresh process"
+              f" import + open + first query: {cold * 1000:.0f} ms")
+        with DiskIndex(args.disk) as disk:
+            time_queries(disk, vocabulary, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""PageRank: power iteration time, warm starts and memory on a mapped graph.
+
+Builds the synthetic graph of :mod:`benchmarks.bench_graph` (``--nodes``
+articles, ``--degree`` links each on average), saves it and maps it back,
+then runs :func:`~wikiapi.centrality.pagerank` from a uniform start, and
+again warm-started from those scores after a simulated recrawl (a new
+graph with ``--changed`` of the articles' links redrawn).  Prints
+iterations and time per iteration, and the peak memory a cold run
+allocates (``tracemalloc``; the mapped arrays are not counted), which
+stays at a few node-sized vectors plus one ``--block-links`` block.
+
+    python -m benchmarks.bench_pagerank [--nodes 100000] [--block-links 4194304]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+from wikiapi.graph import LinkGraph
+from wikiapi.index import np
+from wikiapi.centrality import pagerank
+
+from .bench_graph import synthetic_edges, synthetic_titles
+
+
+def run(label: str, graph: LinkGraph, **options):
+    start = time.perf_counter()
+    ranks = pagerank(graph, **options)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {ranks.iterations:>4} iterations in {elapsed:.2f}s"
+          f" ({elapsed / ranks.iterations * 1e3:.0f} ms each), converged: {ranks.converged}")
+    return ranks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--degree", type=int, default=20)
+    parser.add_argument("--tol", type=float, default=1e-6)
+    parser.add_argument("--block-links", type=int, default=1 << 22)
+    parser.add_argument("--changed", type=float, default=0.01)
+    args = parser.parse_args()
+
+    titles = synthetic_titles(args.nodes)
+    edges = list(synthetic_edges(titles, args.degree))
+    with tempfile.TemporaryDirectory() as tmp:
+        LinkGraph.from_edges(edges, nodes=titles).save(tmp)
+        graph = LinkGraph.open(tmp)
+        print(f"{len(graph):,} nodes, {graph.num_edges:,} links"
+              f" (numpy: {'yes' if np is not None else 'no'})")
+        ranks = run("cold start", graph, tol=args.tol, block_links=args.block_links)
+        ranks.save(tmp)
+        tracemalloc.start()
+        pagerank(graph, tol=args.tol, block_links=args.block_links)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"peak memory {peak / 2**20:.1f} MiB"
+              f" ({peak / len(graph):.0f} bytes per node, links mapped)")
+        print("top:", ", ".join(f"{title} {score:.2e}" for title, score in ranks.top(5)))
+
+        rng = random.Random(9)
+        changed = set(rng.sample(titles, int(len(titles) * args.changed)))
+        recrawled = [(s, t) for s, t in edges if s not in changed]
+        recrawled += [(s, rng.choice(titles)) for s in changed for _ in range(args.degree)]
+        updated = LinkGraph.from_edges(recrawled, nodes=titles)
+        run("recrawl cold", updated, tol=args.tol, block_links=args.block_links)
+        run("recrawl warm", updated, tol=args.tol, block_links=args.block_links,
+            initial=ranks)
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
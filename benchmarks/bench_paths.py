@@ -0,0 +1,85 @@
+"""Shortest paths: bidirectional BFS on a local graph vs. a live search.
+
+Builds the synthetic graph of :mod:`benchmarks.bench_graph` (``--nodes``
+articles, ``--degree`` links each on average), and times
+:meth:`~wikiapi.paths.PathFinder.shortest_path` and
+:meth:`~wikiapi.paths.PathFinder.shortest_paths` between random pairs.
+For comparison, it runs the live search of
+:meth:`~wikiapi.paths.PathFinder.find` against the mock wiki
+(``--live-pages`` pages) and counts the requests it needs.
+
+    python -m benchmarks.bench_paths [--nodes 100000] [--queries 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from wikiapi import WikiClient
+from wikiapi.index import np
+from wikiapi.paths import PathFinder
+
+from .bench_graph import synthetic_graph
+from .mockwiki import MockWiki
+
+
+def percentiles(times: list[float]) -> str:
+    times = sorted(times)
+    return (f"median {statistics.median(times) * 1e3:.2f} ms,"
+            f" p99 {times[int(len(times) * 0.99)] * 1e3:.2f} ms")
+
+
+async def live(pages: int, queries: int) -> None:
+    rng = random.Random(11)
+    async with MockWiki(pages, links_per_page=10) as wiki:
+        async with WikiClient(wiki.endpoint) as client:
+            finder = PathFinder(client=client)
+            lengths, times = [], []
+            for _ in range(queries):
+                source, target = (f"Page {rng.randrange(pages)}" for _ in range(2))
+                start = time.perf_counter()
+                paths = await finder.find(source, target)
+                times.append(time.perf_counter() - start)
+                lengths.append(len(paths[0]) - 1 if paths else 0)
+        print(f"live, {pages:,} pages: {percentiles(times)}, "
+              f"{wiki.requests / queries:.1f} requests per query, "
+              f"mean length {statistics.mean(lengths):.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--degree", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--live-pages", type=int, default=20_000)
+    parser.add_argument("--live-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    graph = synthetic_graph(args.nodes, args.degree)
+    start = time.perf_counter()
+    finder = PathFinder(graph)
+    print(f"{len(graph):,} nodes, {graph.num_edges:,} links; reverse graph built in"
+          f" {time.perf_counter() - start:.2f}s (numpy: {'yes' if np is not None else 'no'})")
+    rng = random.Random(3)
+    pairs = [(graph.title(rng.randrange(len(graph))), graph.title(rng.randrange(len(graph))))
+             for _ in range(args.queries)]
+    for label, run in (("one path", lambda s, t: finder.shortest_paths(s, t, limit=1)),
+                       ("all paths", lambda s, t: finder.shortest_paths(s, t, limit=10_000))):
+        times, visited, found = [], [], []
+        for source, target in pairs:
+            start = time.perf_counter()
+            paths = run(source, target)
+            times.append(time.perf_counter() - start)
+            visited.append(finder.visited)
+            found.append(len(paths))
+        print(f"{label:<10} {percentiles(times)}, {statistics.mean(visited):,.0f} nodes"
+              f" visited, {statistics.mean(found):.1f} paths per query")
+    asyncio.run(live(args.live_pages, args.live_queries))
+
+
+if __name__ == "__main__":
+    main()
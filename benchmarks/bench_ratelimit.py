@@ -0,0 +1,56 @@
+"""Adaptive rate limiting against a mock wiki that injects throttling.
+
+The server admits ``--server-rate`` requests per second and throttles the
+rest.  For each throttling style the crawl is run once with plain
+retry-after-sleeping and once with the adaptive limiter, reporting how many
+requests were wasted on throttled responses and where the rate settled.
+
+    python -m benchmarks.bench_ratelimit [--pages 300] [--server-rate 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from wikiapi import Crawler
+
+from .mockwiki import MockWiki
+
+
+async def crawl(wiki: MockWiki, pages: int, rate: float | None) -> tuple[int, float, dict]:
+    start = time.perf_counter()
+    async with Crawler(wiki.endpoint, concurrency=16, max_pages=pages, batch_size=1,
+                       rate=rate) as crawler:
+        async for _ in crawler.crawl(["Page 0"]):
+            pass
+    limits = next(iter(crawler.metrics()["rate_limits"].values()), {})
+    return crawler.fetched, time.perf_counter() - start, limits
+
+
+async def run(pages: int, server_rate: float, start_rate: float) -> None:
+    print(f"{'throttle':>8} {'limiter':>8} {'fetched':>7} {'seconds':>8} {'throttled':>9} "
+          f"{'final rate':>10}")
+    for mode in ("429", "503", "maxlag"):
+        for rate in (None, start_rate):
+            async with MockWiki(pages * 4, throttle_rate=server_rate, throttle=mode,
+                                retry_after=1) as wiki:
+                fetched, elapsed, limits = await crawl(wiki, pages, rate)
+            label = "adaptive" if rate else "none"
+            final = f"{limits['rate']:.1f}" if limits else "-"
+            print(f"{mode:>8} {label:>8} {fetched:>7} {elapsed:>8.2f} {wiki.throttled:>9} "
+                  f"{final:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--server-rate", type=float, default=20.0)
+    parser.add_argument("--start-rate", type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.pages, args.server_rate, args.start_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Article store: compression ratio and random-read latency.
+
+Stores ``--pages`` synthetic articles in an
+:class:`~wikiapi.store.ArticleStore`.  Pages are made from the fixture
+articles in ``benchmarks/fixtures/wikitext`` (or the ``.wiki`` files in
+``--corpus``): each keeps a random share of one fixture's lines with most
+words and numbers redrawn, so pages share markup rather than prose.
+
+For each codec (zstd needs the ``zstandard`` package, zlib is always
+there), with and without a trained dictionary, prints the time to store
+the pages, their compressed size and its ratio to the raw JSON records and
+to one JSON file per page on this disk (allocated blocks, as ``du``
+counts them).  Then times :meth:`~wikiapi.store.ArticleStore.get` for
+random page IDs, almost all cache misses that decompress a block, and for
+runs of ``--run`` pages stored next to each other, mostly cache hits.
+
+    python -m benchmarks.bench_store [--pages 20000] [--block-size 16384]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from wikiapi import Article
+from wikiapi.store import ArticleStore, _record, zstd
+
+FIXTURES = Path(__file__).parent / "fixtures" / "wikitext"
+
+_TOKEN = re.compile(r"([^\W\d_]{4,}|\d+)")
+
+
+def synthetic_articles(corpus: list[str], count: int, *, seed: int = 5) -> list[Article]:
+    rng = random.Random(seed)
+    vocabulary = sorted({word for text in corpus for word in re.findall(r"[^\W\d_]{4,}", text)})
+
+    def redraw(match: re.Match) -> str:
+        token = match[1]
+        if rng.random() < 0.3:
+            return token
+        if token.isdigit():
+            return str(rng.randrange(10 ** len(token)))
+        return rng.choice(vocabulary)
+
+    articles = []
+    for i in range(count):
+        lines = rng.choice(corpus).splitlines()
+        kept = [line for line in lines if rng.random() < 0.7]
+        text = _TOKEN.sub(redraw, "\n".join(kept))
+        pageid = 1000 + i * 3 + rng.randrange(3)
+        articles.append(Article(title=f"Page {pageid}", pageid=pageid, revid=pageid * 7,
+                                text=text))
+    return articles
+
+
+def percentiles(times: list[float]) -> str:
+    times = sorted(times)
+    return (f"median {statistics.median(times) * 1e6:.0f} us,"
+            f" p99 {times[int(len(times) * 0.99)] * 1e6:.0f} us")
+
+
+def per_file_bytes(articles: list[Article], directory: str) -> int:
+    total = 0
+    for article in articles:
+        path = os.path.join(directory, f"{article.pageid}.json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"title": article.title, "pageid": article.pageid,
+                       "revid": article.revid, "text": article.text}, fh, ensure_ascii=False)
+        total += os.stat(path).st_blocks * 512
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20_000)
+    parser.add_argument("--block-size", type=int, default=1 << 14)
+    parser.add_argument("--cache-blocks", type=int, default=64)
+    parser.add_argument("--reads", type=int, default=5_000)
+    parser.add_argument("--run", type=int, default=16)
+    parser.add_argument("--corpus", type=Path, default=FIXTURES)
+    args = parser.parse_args()
+
+    corpus = [path.read_text(encoding="utf-8") for path in sorted(args.corpus.glob("*.wiki"))]
+    articles = synthetic_articles(corpus, args.pages)
+    raw = sum(len(_record(article)) for article in articles)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.mkdir(os.path.join(tmp, "files"))
+        files = per_file_bytes(articles, os.path.join(tmp, "files"))
+        print(f"{len(articles):,} pages, {raw / 2**20:.1f} MiB of JSON records;"
+              f" one file per page takes {files / 2**20:.1f} MiB on disk")
+        print(f"{'store':<18} {'write':>8} {'size':>10} {'vs JSON':>8} {'vs files':>9}")
+        codecs = ["zstd", "zlib"] if zstd is not None else ["zlib"]
+        stores = []
+        for codec in codecs:
+            for trained in (False, True):
+                directory = os.path.join(tmp, f"{codec}-{trained}")
+                start = time.perf_counter()
+                with ArticleStore(directory, codec=codec, block_size=args.block_size,
+                                  dictionary=None if trained else b"") as store:
+                    store.add_articles(articles)
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(os.path.join(directory, "articles.dat")) \
+                    + os.path.getsize(os.path.join(directory, "articles.idx"))
+                label = f"{codec}, {'dictionary' if trained else 'plain'}"
+                print(f"{label:<18} {elapsed:>7.2f}s {size / 2**20:>6.1f} MiB"
+                      f" {raw / size:>7.1f}x {files / size:>8.1f}x")
+                stores.append((label, directory))
+
+        rng = random.Random(7)
+        ids = [article.pageid for article in articles]
+        reads = [rng.choice(ids) for _ in range(args.reads)]
+        starts = [rng.randrange(len(ids) - args.run) for _ in range(args.reads // args.run)]
+        print(f"\nget(), {args.block_size // 1024} KiB blocks, {args.cache_blocks} cached")
+        for label, directory in stores:
+            with ArticleStore(directory, cache_blocks=args.cache_blocks) as store:
+                times = []
+                for pageid in reads:
+                    begin = time.perf_counter()
+                    store.get(pageid)
+                    times.append(time.perf_counter() - begin)
+                store.hits = store.misses = 0
+                neighbours = []
+                for first in starts:
+                    for pageid in ids[first:first + args.run]:
+                        begin = time.perf_counter()
+                        store.get(pageid)
+                        neighbours.append(time.perf_counter() - begin)
+                print(f"{label:<18} random: {percentiles(times)};"
+                      f" neighbours: {percentiles(neighbours)},"
+                      f" {store.hits / (store.hits + store.misses):.0%} hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Template and infobox extraction throughput in pages per second.
+
+Extracts the infobox and all top-level templates from the fixture
+articles in ``benchmarks/fixtures/wikitext`` (or the ``.wiki`` files in
+``--corpus``) ``--rounds`` times:
+
+* cold: the parser cache is cleared before every page, so only repeats
+  within one page are served from it;
+* warm: one parser for the whole run, as when the same templates recur
+  across a dump;
+* batched: :func:`wikiapi.templates.iter_templates` over ``--workers``
+  processes, each with its own cache.
+
+    python -m benchmarks.bench_templates [--rounds 100] [--workers 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from wikiapi.templates import TemplateParser, iter_templates
+
+FIXTURES = Path(__file__).parent / "fixtures" / "wikitext"
+
+
+def measure(label: str, run, pages: int) -> None:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {pages / elapsed:>10.0f} {elapsed / pages * 1e6:>10.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--corpus", type=Path, default=FIXTURES)
+    args = parser.parse_args()
+
+    corpus = [path.read_text(encoding="utf-8") for path in sorted(args.corpus.glob("*.wiki"))]
+    pages = corpus * args.rounds
+    print(f"{len(corpus)} articles x {args.rounds} rounds")
+    print(f"{'extraction':<28} {'pages/s':>10} {'us/page':>10}")
+
+    cold = TemplateParser()
+
+    def infobox_cold():
+        for text in pages:
+            cold.clear()
+            cold.infobox(text)
+
+    def templates_cold():
+        for text in pages:
+            cold.clear()
+            cold.templates(text)
+
+    measure("infobox, cold cache", infobox_cold, len(pages))
+    measure("all templates, cold cache", templates_cold, len(pages))
+
+    warm = TemplateParser()
+    measure("infobox, warm cache", lambda: [warm.infobox(text) for text in pages], len(pages))
+    measure("all templates, warm cache", lambda: [warm.templates(text) for text in pages],
+            len(pages))
+    print(f"warm cache: {len(warm)} entries, "
+          f"{warm.hits / max(1, warm.hits + warm.misses):.1%} hits")
+
+    batched = TemplateParser()
+    measure("batched, 1 process", lambda: list(iter_templates(
+        pages, batch_size=args.batch_size, parser=batched)), len(pages))
+    if args.workers > 1:
+        measure(f"batched, {args.workers} processes", lambda: list(iter_templates(
+            pages, batch_size=args.batch_size, workers=args.workers)), len(pages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Memory and lookup speed of VisitedSet vs. a plain ``set``.
+
+Inserts ``--n`` titles and as many dense page IDs, then times lookups of
+present and absent keys and measures the observed false-positive rate.
+
+    python -m benchmarks.bench_visited [--n 10000000] [--error-rate 1e-4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from wikiapi.visited import VisitedSet
+
+
+def titles(n: int, offset: int = 0):
+    return (f"Article number {i}" for i in range(offset, offset + n))
+
+
+def timed_lookups(container, keys: list) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        key in container
+    return (time.perf_counter() - start) / len(keys) * 1e9
+
+
+def run(n: int, error_rate: float, probes: int) -> None:
+    present = list(titles(probes))
+    absent = list(titles(probes, offset=n))
+    rows = []
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    plain: set = set(titles(n))
+    ids: set = set(range(1, n + 1))
+    build = time.perf_counter() - start
+    plain_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rows.append(("set", build, plain_bytes, timed_lookups(plain, present),
+                 timed_lookups(plain, absent), 0.0))
+    del plain, ids
+
+    visited = VisitedSet(error_rate)
+    start = time.perf_counter()
+    for title in titles(n):
+        visited.add(title)
+    for pageid in range(1, n + 1):
+        visited.add_pageid(pageid)
+    build = time.perf_counter() - start
+    false_positives = sum(key in visited for key in absent) / len(absent)
+    rows.append(("VisitedSet", build, visited.nbytes(), timed_lookups(visited, present),
+                 timed_lookups(visited, absent), false_positives))
+
+    print(f"{n:,} titles + {n:,} page IDs, target error rate {error_rate:g}")
+    print(f"{'structure':<11} {'build s':>8} {'memory MB':>10} {'hit ns':>8} {'miss ns':>8}"
+          f" {'FP rate':>9}")
+    for name, build, nbytes, hit, miss, fp in rows:
+        print(f"{name:<11} {build:>8.1f} {nbytes / 2**20:>10.1f} {hit:>8.0f} {miss:>8.0f}"
+              f" {fp:>9.2e}")
+    print("page-ID bitmap:", f"{visited.memory_report()['pageid_bytes'] / 2**20:.2f} MB",
+          file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=10_000_000)
+    parser.add_argument("--error-rate", type=float, default=1e-4)
+    parser.add_argument("--probes", type=int, default=200_000)
+    args = parser.parse_args()
+    run(args.n, args.error_rate, args.probes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Wikitext to plain text: single-pass cleaner vs. a regex cascade.
+
+Cleans the fixture articles in ``benchmarks/fixtures/wikitext`` (or the
+``.wiki`` files in ``--corpus``) ``--rounds`` times with
+:func:`wikiapi.wikitext.to_plaintext`, with the kind of regex cascade
+that is commonly used for the job (comments, refs, nested templates until
+none are left, tables, files, links, quotes, tags, headings, ...), and
+with ``mwparserfromhell`` (parse, ``strip_code``) when it is installed.
+
+    python -m benchmarks.bench_wikitext [--rounds 200] [--corpus DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import re
+import time
+from pathlib import Path
+
+from wikiapi.wikitext import to_plaintext
+
+FIXTURES = Path(__file__).parent / "fixtures" / "wikitext"
+
+_FLAGS = re.S | re.I
+_CASCADE = [
+    (re.compile(r"<!--.*?-->", re.S), ""),
+    (re.compile(r"<ref[^>]*/>", re.I), ""),
+    (re.compile(r"<ref[^>]*>.*?</ref>", _FLAGS), ""),
+    (re.compile(r"<(gallery|syntaxhighlight|source|timeline|score)[^>]*>.*?</\1>", _FLAGS), ""),
+]
+_TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+_TABLE = re.compile(r"\{\|(?:[^{}]|\{[^|])*?\|\}", re.S)
+_CASCADE_AFTER = [
+    (re.compile(r"\[\[(?:File|Image|Category|[a-z]{2,3}):(?:[^\[\]]|\[\[[^\[\]]*\]\])*\]\]",
+                re.I), ""),
+    (re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]"), r"\1"),
+    (re.compile(r"\[(?:https?:)?//[^\s\]]+ ?([^\]]*)\]"), r"\1"),
+    (re.compile(r"'{2,}"), ""),
+    (re.compile(r"<[^>]+>"), ""),
+    (re.compile(r"^=+\s*(.*?)\s*=+\s*$", re.M), r"\1"),
+    (re.compile(r"^[*#:;]+\s*", re.M), ""),
+    (re.compile(r"__[A-Z]+__"), ""),
+    (re.compile(r"[ \t]+"), " "),
+    (re.compile(r"\n{3,}"), "\n\n"),
+]
+
+
+def regex_cascade(text: str) -> str:
+    for pattern, repl in _CASCADE:
+        text = pattern.sub(repl, text)
+    while True:  # innermost templates first, until none are left
+        text, count = _TEMPLATE.subn("", text)
+        if not count:
+            break
+    while True:
+        text, count = _TABLE.subn("", text)
+        if not count:
+            break
+    for pattern, repl in _CASCADE_AFTER:
+        text = pattern.sub(repl, text)
+    return html.unescape(text).strip()
+
+
+def measure(label: str, clean, corpus: list[str], rounds: int) -> float:
+    size = sum(len(text.encode("utf-8")) for text in corpus)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            clean(text)
+    elapsed = time.perf_counter() - start
+    pages = len(corpus) * rounds
+    print(f"{label:<22} {pages / elapsed:>10.0f} {size * rounds / elapsed / 2**20:>8.1f}"
+          f" {elapsed / pages * 1e6:>10.0f}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--corpus", type=Path, default=FIXTURES)
+    args = parser.parse_args()
+
+    corpus = [path.read_text(encoding="utf-8") for path in sorted(args.corpus.glob("*.wiki"))]
+    print(f"{len(corpus)} articles, {sum(map(len, corpus)) / 1024:.0f} KiB of wikitext")
+    print(f"{'cleaner':<22} {'pages/s':>10} {'MiB/s':>8} {'us/page':>10}")
+    ours = measure("to_plaintext", to_plaintext, corpus, args.rounds)
+    cascade = measure("regex cascade", regex_cascade, corpus, args.rounds)
+    print(f"speed-up vs. regex cascade: {cascade / ours:.1f}x")
+    try:
+        import mwparserfromhell
+    except ImportError:
+        print("mwparserfromhell not installed; skipped")
+        return
+    rounds = max(1, args.rounds // 20)
+    parsed = measure("mwparserfromhell", lambda t: mwparserfromhell.parse(t).strip_code(),
+                     corpus, rounds)
+    print(f"speed-up vs. mwparserfromhell: {parsed / rounds / (ours / args.rounds):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Write small synthetic multistream dumps shaped like the real ones.
+
+    python -m benchmarks.dumpgen OUT_DIR [--pages 10000]
+
+produces ``OUT_DIR/synthwiki-pages-articles-multistream.xml.bz2`` and the
+matching ``...-multistream-index.txt.bz2``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bz2
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+HEADER = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="en">
+  <siteinfo>
+    <sitename>Synthwiki</sitename>
+    <dbname>synthwiki</dbname>
+    <base>https://synth.example.org/wiki/Main_Page</base>
+  </siteinfo>
+"""
+
+
+def page_xml(pageid: int, title: str, text: str, *, ns: int = 0,
+             redirect: str | None = None) -> str:
+    redirect_tag = f"    <redirect title={quoteattr(redirect)} />\n" if redirect else ""
+    return (
+        "  <page>\n"
+        f"    <title>{escape(title)}</title>\n"
+        f"    <ns>{ns}</ns>\n"
+        f"    <id>{pageid}</id>\n"
+        f"{redirect_tag}"
+        "    <revision>\n"
+        f"      <id>{pageid + 1000}</id>\n"
+        "      <model>wikitext</model>\n"
+        "      <format>text/x-wiki</format>\n"
+        f"      <text bytes=\"{len(text.encode())}\" xml:space=\"preserve\">{escape(text)}</text>\n"
+        "    </revision>\n"
+        "  </page>\n"
+    )
+
+
+def synthetic_pages(count: int, *, words: int = 300):
+    """Yield ``(pageid, title, text, ns, redirect)`` for a synthetic wiki."""
+    vocabulary = ("alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu "
+                  "river mountain city history science music language war empire").split()
+    for i in range(count):
+        pageid = i + 1
+        if i % 25 == 24:
+            target = f"Page {i - 1}"
+            yield pageid, f"Redirect {i}", f"#REDIRECT [[{target}]]", 0, target
+            continue
+        body = " ".join(vocabulary[(i * 7 + j * 13) % len(vocabulary)] for j in range(words))
+        links = " ".join(f"[[Page {(i * 31 + j * 17) % count}]]" for j in range(10))
+        text = f"'''Page {i}''' {body}\n\n== See also ==\n{links}\n"
+        yield pageid, f"Page {i}", text, 0 if i % 10 else 4, None
+
+
+def write_multistream(out_dir: str | Path, pages, *, pages_per_stream: int = 100,
+                      name: str = "synthwiki") -> tuple[Path, Path]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    dump_path = out_dir / f"{name}-pages-articles-multistream.xml.bz2"
+    index_path = out_dir / f"{name}-pages-articles-multistream-index.txt.bz2"
+    index_lines = []
+    with open(dump_path, "wb") as dump:
+        dump.write(bz2.compress(HEADER.encode()))
+        batch: list[tuple] = []
+
+        def flush() -> None:
+            offset = dump.tell()
+            xml = "".join(page_xml(pid, title, text, ns=ns, redirect=redirect)
+                          for pid, title, text, ns, redirect in batch)
+            dump.write(bz2.compress(xml.encode()))
+            index_lines.extend(f"{offset}:{pid}:{title}\n" for pid, title, *_ in batch)
+            batch.clear()
+
+        for page in pages:
+            batch.append(page)
+            if len(batch) == pages_per_stream:
+                flush()
+        if batch:
+            flush()
+        dump.write(bz2.compress(b"</mediawiki>\n"))
+    with bz2.open(index_path, "wt", encoding="utf-8") as index:
+        index.writelines(index_lines)
+    return dump_path, index_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, default=10_000)
+    args = parser.parse_args()
+    dump, index = write_multistream(args.out_dir, synthetic_pages(args.pages))
+    print(dump)
+    print(index)
+
+
+if __name__ == "__main__":
+    main()
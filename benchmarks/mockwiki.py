@@ -0,0 +1,287 @@
+"""A local stand-in for a MediaWiki ``api.php`` used by the benchmarks.
+
+The wiki is synthetic: page ``i`` is titled ``Page i``, has page ID ``i + 1``,
+revision ID ``1000 + i`` and links to ``links_per_page`` other pages chosen
+deterministically.  ``Redirect i`` redirects to ``Page i`` and lower-case or
+underscored titles are normalized the way MediaWiki does it.
+``Category:Cat j`` (``categories`` of them, page ID ``pages + 1 + j``) holds
+every page ``i`` with ``i % categories == j`` and a few subcategories, with
+cycles.  The server speaks HTTP/1.1 with keep-alive, can add a fixed latency to every
+response to imitate a remote host, and counts requests (POSTs separately) and
+connections.
+
+With ``throttle_rate`` set the server admits that many requests per second
+and answers the excess with ``throttle`` = ``"429"``, ``"503"`` or
+``"maxlag"`` (an API error), each carrying ``Retry-After: retry_after``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+
+class MockWiki:
+    def __init__(self, pages: int = 10_000, *, links_per_page: int = 20, latency: float = 0.0,
+                 throttle_rate: float | None = None, throttle: str = "429",
+                 retry_after: int | None = 1, categories: int = 100):
+        self.pages = pages
+        self.categories = categories
+        self.links_per_page = links_per_page
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.throttled = 0
+        self._tokens = throttle_rate or 0.0
+        self._refilled = time.monotonic()
+        self.requests = 0
+        self.posts = 0
+        self.connections = 0
+        self._server: asyncio.AbstractServer | None = None
+        self.port = 0
+        self._backlinks: list[list[int]] | None = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}/w/api.php"
+
+    # -- synthetic content -------------------------------------------------
+
+    def index_of(self, title: str) -> int | None:
+        if title.startswith("Page "):
+            try:
+                i = int(title[5:])
+            except ValueError:
+                return None
+            if 0 <= i < self.pages:
+                return i
+        return None
+
+    def link_targets(self, i: int) -> list[int]:
+        return [(i * 7919 + j * 104729 + 1) % self.pages for j in range(self.links_per_page)]
+
+    def backlinks(self, i: int) -> list[int]:
+        if self._backlinks is None:
+            self._backlinks = [[] for _ in range(self.pages)]
+            for j in range(self.pages):
+                for t in dict.fromkeys(self.link_targets(j)):
+                    self._backlinks[t].append(j)
+        return self._backlinks[i]
+
+    def subcategories(self, j: int) -> list[int]:
+        return list(dict.fromkeys(c for c in ((j * 3 + 1) % self.categories,
+                                               (j * 3 + 2) % self.categories,
+                                               (j * 7 + 5) % self.categories) if c != j))
+
+    def category_members(self, title: str) -> list[dict]:
+        if not title.startswith("Category:Cat "):
+            return []
+        j = int(title[13:])
+        if not 0 <= j < self.categories:
+            return []
+        members = [{"pageid": i + 1, "ns": 0, "title": f"Page {i}"}
+                   for i in range(j, self.pages, self.categories)]
+        members += [{"pageid": self.pages + 1 + c, "ns": 14, "title": f"Category:Cat {c}"}
+                    for c in self.subcategories(j)]
+        return members
+
+    def wikitext(self, i: int) -> str:
+        links = " ".join(f"[[Page {t}]]" for t in self.link_targets(i))
+        return f"'''Page {i}''' is a synthetic article.\n\n== Links ==\n{links}\n"
+
+    def page(self, i: int, props: set[str]) -> dict:
+        page: dict = {"pageid": i + 1, "ns": 0, "title": f"Page {i}"}
+        if "info" in props:
+            page["lastrevid"] = 1000 + i
+        if "revisions" in props:
+            page["revisions"] = [{"revid": 1000 + i, "slots": {
+                "main": {"contentmodel": "wikitext", "content": self.wikitext(i)}}}]
+        if "links" in props:
+            page["links"] = [{"ns": 0, "title": f"Page {t}"} for t in self.link_targets(i)]
+        return page
+
+    # -- API ---------------------------------------------------------------
+
+    def handle(self, params: dict[str, str]) -> dict:
+        if params.get("action") != "query":
+            return {"error": {"code": "badvalue", "info": "unsupported action"}}
+        result: dict = {"batchcomplete": True, "query": {}}
+        query = result["query"]
+        props = set(filter(None, params.get("prop", "").split("|")))
+        indices: list[int | str] = []
+        if "titles" in params:
+            normalized, redirects = [], []
+            for title in params["titles"].split("|"):
+                norm = title.replace("_", " ")
+                norm = norm[:1].upper() + norm[1:]
+                if norm != title:
+                    normalized.append({"from": title, "to": norm})
+                if norm.startswith("Redirect ") and "redirects" in params:
+                    target = "Page " + norm[9:]
+                    redirects.append({"from": norm, "to": target})
+                    norm = target
+                i = self.index_of(norm)
+                indices.append(i if i is not None else norm)
+            if normalized:
+                query["normalized"] = normalized
+            if redirects:
+                query["redirects"] = redirects
+        for key, base in (("pageids", 1), ("revids", 1000)):
+            if key in params:
+                for value in params[key].split("|"):
+                    i = int(value) - base
+                    indices.append(i if 0 <= i < self.pages else f"#{value}")
+        if params.get("generator") == "search":
+            limit = int(params.get("gsrlimit", 10))
+            offset = int(params.get("gsroffset", 0))
+            indices.extend(range(offset, min(offset + limit, self.pages)))
+            if offset + limit < self.pages:
+                result["continue"] = {"gsroffset": offset + limit, "continue": "gsroffset||"}
+        if indices:
+            pages = []
+            for index, i in enumerate(dict.fromkeys(indices), 1):
+                pages.append(self.page(i, props) if isinstance(i, int)
+                             else {"ns": 0, "title": i, "missing": True})
+                if "generator" in params:
+                    pages[-1]["index"] = index
+            if "links" in props:
+                self._limit_links(pages, params, result)
+            query["pages"] = pages
+        if params.get("list") == "search":
+            limit = params.get("srlimit", "10")
+            limit = 500 if limit == "max" else int(limit)
+            offset = int(params.get("sroffset", 0))
+            hits = range(offset, min(offset + limit, self.pages))
+            query["search"] = [{"ns": 0, "title": f"Page {i}", "pageid": i + 1} for i in hits]
+            query["searchinfo"] = {"totalhits": self.pages}
+            if offset + limit < self.pages:
+                result["continue"] = {"sroffset": offset + limit, "continue": "-||"}
+        if params.get("list") == "backlinks":
+            target = self.index_of(params.get("bltitle", ""))
+            linking = self.backlinks(target) if target is not None else []
+            limit = params.get("bllimit", "10")
+            limit = 500 if limit == "max" else int(limit)
+            offset = int(params.get("blcontinue", 0))
+            query["backlinks"] = [{"pageid": j + 1, "ns": 0, "title": f"Page {j}"}
+                                  for j in linking[offset:offset + limit]]
+            if offset + limit < len(linking):
+                result["continue"] = {"blcontinue": str(offset + limit), "continue": "-||"}
+        if params.get("list") == "categorymembers":
+            members = self.category_members(params.get("cmtitle", ""))
+            if "cmnamespace" in params:
+                wanted = {int(ns) for ns in params["cmnamespace"].split("|")}
+                members = [m for m in members if m["ns"] in wanted]
+            limit = params.get("cmlimit", "10")
+            limit = 500 if limit == "max" else int(limit)
+            offset = int(params.get("cmcontinue", 0))
+            query["categorymembers"] = members[offset:offset + limit]
+            if offset + limit < len(members):
+                result["continue"] = {"cmcontinue": str(offset + limit), "continue": "-||"}
+        return result
+
+    def _limit_links(self, pages: list[dict], params: dict[str, str], result: dict) -> None:
+        """Apply ``pllimit`` across all pages and emit ``plcontinue``."""
+        limit = params.get("pllimit", "10")
+        budget = 500 if limit == "max" else int(limit)
+        start_id, start_pos = 0, 0
+        if "plcontinue" in params:
+            start_id, start_pos = map(int, params["plcontinue"].split("|"))
+        for page in sorted(pages, key=lambda p: p.get("pageid", 0)):
+            links = page.pop("links", None)
+            if links is None or page["pageid"] < start_id:
+                continue
+            offset = start_pos if page["pageid"] == start_id else 0
+            chunk = links[offset:offset + budget]
+            if chunk:
+                page["links"] = chunk
+            budget -= len(chunk)
+            if offset + len(chunk) < len(links):
+                result.pop("batchcomplete", None)
+                result["continue"] = {"plcontinue": f"{page['pageid']}|{offset + len(chunk)}",
+                                      "continue": "||"}
+                return
+
+    # -- throttling --------------------------------------------------------
+
+    def _admit(self) -> bool:
+        if self.throttle_rate is None:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.throttle_rate,
+                           self._tokens + (now - self._refilled) * self.throttle_rate)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.throttled += 1
+        return False
+
+    def _throttled_response(self) -> bytes:
+        headers = b"Content-Type: application/json\r\n"
+        if self.retry_after is not None:
+            headers += b"Retry-After: %d\r\n" % self.retry_after
+        if self.throttle == "maxlag":
+            status = b"200 OK"
+            payload = json.dumps({"error": {
+                "code": "maxlag", "info": "Waiting for a database server: 6 seconds lagged.",
+                "lag": 6}}).encode()
+        else:
+            status = b"429 Too Many Requests" if self.throttle == "429" else b"503 Service Unavailable"
+            payload = b"{}"
+        return (b"HTTP/1.1 " + status + b"\r\n" + headers
+                + b"Content-Length: %d\r\n\r\n" % len(payload) + payload)
+
+    # -- HTTP plumbing -----------------------------------------------------
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+                target = request_line.split()[1].decode("latin-1")
+                params = dict(parse_qsl(urlsplit(target).query))
+                params.update(parse_qsl(body.decode("latin-1")))
+                self.requests += 1
+                if request_line.startswith(b"POST "):
+                    self.posts += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if not self._admit():
+                    writer.write(self._throttled_response())
+                    await writer.drain()
+                    continue
+                payload = json.dumps(self.handle(params)).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n" % len(payload) + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> MockWiki:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> MockWiki:
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from wikiapi import backlinks, graph
+from wikiapi.backlinks import BacklinkIndex
+from wikiapi.graph import LinkGraph, _row_blocks
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(backlinks, "np", None)
+        monkeypatch.setattr(graph, "np", None)
+    elif backlinks.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def random_graph(n: int, m: int, seed: int) -> LinkGraph:
+    rng = random.Random(seed)
+    edges = [(f"N{rng.randrange(n)}", f"N{rng.randrange(n)}") for _ in range(m)]
+    return LinkGraph.from_edges(edges, nodes=["Orphan"])
+
+
+def forward(g: LinkGraph) -> dict[str, set[str]]:
+    return {g.title(node): {g.title(int(t)) for t in g.successors(node)}
+            for node in range(len(g))}
+
+
+def reverse(links: dict[str, set[str]]) -> dict[str, list[str]]:
+    """Backlinks of every title, sorted, from a plain adjacency dict."""
+    linking: dict[str, list[str]] = {title: [] for title in links}
+    for source, targets in links.items():
+        for target in targets:
+            linking.setdefault(target, []).append(source)
+    return {title: sorted(sources) for title, sources in linking.items()}
+
+
+def check(index: BacklinkIndex, links: dict[str, set[str]]) -> None:
+    expected = reverse(links)
+    assert len(index) == len(expected)
+    degrees = index.in_degrees()
+    for title, sources in expected.items():
+        node = index.id(title)
+        assert sorted(index.backlinks(title)) == sources
+        assert index.count(title) == degrees[node] == len(sources)
+
+
+@pytest.mark.parametrize("block_links", [1, 7, 1 << 23])
+def test_build_out_of_core(backend, tmp_path, block_links):
+    g = random_graph(40, 200, seed=1)
+    g.save(tmp_path / "graph")
+    (tmp_path / "runs").mkdir()
+    with BacklinkIndex.build(tmp_path / "graph", block_links=block_links,
+                             tmp_dir=tmp_path / "runs") as index:
+        memory = g.transpose()
+        assert [int(x) for x in index.reverse.indptr] == [int(x) for x in memory.indptr]
+        assert [int(x) for x in index.reverse.indices] == [int(x) for x in memory.indices]
+        check(index, forward(g))
+        if backend == "numpy" and block_links < 10:
+            assert len(_row_blocks(index.reverse.indptr, block_links)) > 3  # several runs
+    assert not any((tmp_path / "runs").iterdir())
+
+
+def apply_updates(index: BacklinkIndex, links: dict[str, set[str]]) -> None:
+    """Recrawls touching old pages, new titles sorting everywhere, and a deletion."""
+    updates = {
+        "N3": ["N4", "Aardvark", "N3"],        # self-links are dropped
+        "N1 extra": ["N1", "N10", "Zulu"],    # sorts between N1 and N10
+        "Aardvark": ["N3", "Orphan"],
+        "N5": [],                             # deleted
+        "Orphan": ["N1 extra", "N5"],
+        "N7": list(links["N7"]) + ["Zulu"],
+    }
+    for title, targets in updates.items():
+        index.update(title, targets)
+        links[title] = set(targets) - {title}
+        for target in targets:
+            links.setdefault(target, set())
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_update_and_compact(backend, tmp_path, on_disk):
+    g = random_graph(30, 120, seed=2)
+    links = forward(g)
+    if on_disk:
+        g.save(tmp_path)
+        index = BacklinkIndex.build(tmp_path, block_links=5)
+    else:
+        index = BacklinkIndex.build(g)
+    with index:
+        apply_updates(index, links)
+        assert index.pending == 6
+        check(index, links)
+
+        index.compact()
+        assert index.pending == 0
+        check(index, links)
+        titles = [index.title(node) for node in range(len(index))]
+        assert titles == sorted(links)
+        assert forward(index.graph) == links
+        # Node numbers follow the titles, so backlinks come back sorted.
+        assert index.backlinks("N1") == reverse(links)["N1"]
+
+        # Further updates apply on top of the renumbered arrays.
+        index.update("Zulu", ["Aardvark"])
+        links["Zulu"] = {"Aardvark"}
+        index.compact()
+        check(index, links)
+    if on_disk:
+        with BacklinkIndex.open(tmp_path) as reopened:
+            check(reopened, links)
+            assert forward(reopened.graph) == links
+
+
+def test_save_and_open(backend, tmp_path):
+    g = random_graph(20, 60, seed=3)
+    links = forward(g)
+    index = BacklinkIndex.build(g)
+    apply_updates(index, links)
+    index.save(tmp_path)
+    with BacklinkIndex.open(tmp_path) as opened:
+        check(opened, links)
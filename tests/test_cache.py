@@ -0,0 +1,139 @@
+import asyncio
+import os
+import types
+
+import pytest
+
+from benchmarks.mockwiki import MockWiki
+from wikiapi import WikiClient, cache
+from wikiapi.cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable ``time.time`` for the cache module."""
+    now = types.SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+class EditableWiki(MockWiki):
+    """A mock wiki whose pages can get new revisions."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.edits: dict[int, int] = {}
+
+    def edit(self, i: int) -> None:
+        self.edits[i] = self.edits.get(i, 0) + 1
+
+    def page(self, i: int, props: set[str]) -> dict:
+        page = super().page(i, props)
+        edits = self.edits.get(i)
+        if edits:
+            revid = 1_000_000 * edits + i
+            if "lastrevid" in page:
+                page["lastrevid"] = revid
+            for rev in page.get("revisions", ()):
+                rev["revid"] = revid
+                rev["slots"]["main"]["content"] += f"Edited {edits} times.\n"
+        return page
+
+
+def test_key_ignores_order_and_maxlag():
+    key = ResponseCache.key
+    endpoint = "https://example.org/w/api.php"
+    assert (key(endpoint, {"titles": "B|A", "prop": "info", "maxlag": "5"})
+            == key(endpoint, {"prop": "info", "titles": "A|B"}))
+    # Other multi-value parameters keep their order.
+    assert (key(endpoint, {"titles": "A", "prop": "info|revisions"})
+            != key(endpoint, {"titles": "A", "prop": "revisions|info"}))
+    assert key(endpoint, {"titles": "A"}) != key(endpoint + "x", {"titles": "A"})
+
+
+def test_ttl_and_size_bounds(tmp_path, clock):
+    store = ResponseCache(tmp_path, ttl=60, max_bytes=10_000)
+    store.put("a" * 64, b'{"one": 1}')
+    store.put("b" * 64, b'{"two": 2}')
+    clock.value += 30
+    assert store.get("a" * 64) == b'{"one": 1}'
+    clock.value += 31
+    # "a" was stored 61 seconds ago: stale, but kept for revalidation.
+    assert store.stale("a" * 64) == b'{"one": 1}' and store.stale("c" * 64) is None
+    assert store.get("a" * 64, revalidated=True) == b'{"one": 1}'
+    assert store.stale("a" * 64) is None  # fresh again
+    assert store.get("b" * 64) is None and "b" * 64 not in store._sizes
+    assert store.stats["revalidations"] == 1 and store.stats["expirations"] == 1
+    clock.value += 61
+    assert store.purge() == 1 and len(store) == 0
+
+    # Least recently used entries go first, also after reopening.
+    small = ResponseCache(tmp_path / "small", max_bytes=3 * 300)
+    for i in range(3):
+        small.put(f"{i:064}", os.urandom(250))
+        os.utime(small._path(f"{i:064}"), (i, i))
+    small.get(f"{0:064}")
+    small.put(f"{3:064}", os.urandom(250))
+    assert small.evictions == 1 and small.get(f"{1:064}") is None
+    reopened = ResponseCache(tmp_path / "small", max_bytes=2 * 300)
+    assert len(reopened) == 2 and reopened.get(f"{2:064}") is None
+    assert reopened.get(f"{0:064}") is not None and reopened.get(f"{3:064}") is not None
+
+    # Damaged entries are dropped.
+    reopened._path(f"{0:064}").write_bytes(b"garbage")
+    assert reopened.get(f"{0:064}") is None and len(reopened) == 1
+
+
+def test_revalidation_by_lastrevid(tmp_path, clock):
+    titles = [f"Page {i}" for i in range(120)]
+
+    async def run():
+        async with EditableWiki(500) as wiki:
+            store = ResponseCache(tmp_path, ttl=3600)
+            async with WikiClient(wiki.endpoint, batch_size=50, cache=store) as client:
+                fetched = [await client.fetch_articles(titles)]
+                counts = [wiki.requests]
+                # Fresh: answered from the cache.
+                fetched.append(await client.fetch_articles(reversed(titles)))
+                counts.append(wiki.requests)
+                # Stale but unchanged: one prop=info check per batch.
+                clock.value += 3601
+                fetched.append(await client.fetch_articles(titles))
+                counts.append(wiki.requests)
+                # Stale and changed in the first batch: that batch is downloaded again.
+                clock.value += 3601
+                wiki.edit(5)
+                fetched.append(await client.fetch_articles(titles))
+                counts.append(wiki.requests)
+            return fetched, counts, store
+
+    fetched, counts, store = asyncio.run(run())
+    assert counts == [3, 3, 6, 10]
+    assert fetched[1] == fetched[0][::-1] and fetched[2] == fetched[0]
+    assert fetched[3][6] == fetched[0][6]
+    assert fetched[3][5].revid == 1_000_005 and fetched[3][5].text.endswith("Edited 1 times.\n")
+    assert store.revalidations == 5 and store.stores == 4
+
+
+def test_expired_answers_are_fetched_again(tmp_path, clock):
+    async def run():
+        async with MockWiki(500) as wiki:
+            store = ResponseCache(tmp_path, ttl=60)
+            async with WikiClient(wiki.endpoint, cache=store) as client:
+                first = await client.search_articles("page", limit=5)
+                await client.search_articles("page", limit=5)
+                counts = [wiki.requests]
+                clock.value += 61
+                again = await client.search_articles("page", limit=5)
+                counts.append(wiki.requests)
+                # Revisions never change, so they are reused at any age.
+                await client.fetch_articles(revids=[1000, 1001])
+                clock.value += 10 ** 6
+                revisions = await client.fetch_articles(revids=[1001, 1000])
+                counts.append(wiki.requests)
+            return first, again, revisions, counts, store
+
+    first, again, revisions, counts, store = asyncio.run(run())
+    assert counts == [1, 2, 3]
+    assert again == first and [a.title for a in revisions] == ["Page 1", "Page 0"]
+    assert store.expirations == 1
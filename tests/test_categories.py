@@ -0,0 +1,103 @@
+import asyncio
+from collections import deque
+
+from benchmarks.mockwiki import MockWiki
+from wikiapi import WikiClient
+from wikiapi.categories import CategoryWalker
+
+CATEGORYLINKS = """\
+CREATE TABLE `categorylinks` (
+  `cl_from` int(8) unsigned NOT NULL DEFAULT 0,
+  `cl_to` varbinary(255) NOT NULL DEFAULT '',
+  `cl_sortkey` varbinary(230) NOT NULL DEFAULT '',
+  `cl_type` enum('page','subcat','file') NOT NULL DEFAULT 'page',
+  PRIMARY KEY (`cl_from`,`cl_to`)
+) ENGINE=InnoDB DEFAULT CHARSET=binary;
+INSERT INTO `categorylinks` VALUES (1,'Animals','DOG','page'),(2,'Animals','CAT','page'),\
+(4,'Animals','DOG.JPG','file'),(10,'Animals','MAMMALS','subcat'),(1,'Mammals','DOG','page'),\
+(3,'Mammals','WHALE','page'),(11,'Mammals','ANIMALS','subcat'),(3,'Sea_life','WHALE','page');
+"""
+TITLES = {1: "Dog", 2: "Cat", 3: "Whale", 4: "File:Dog.jpg", 10: "Category:Mammals",
+          11: "Category:Animals"}
+
+
+def reference(wiki: MockWiki, root: int, max_depth: int | None) -> dict[str, tuple[int, str]]:
+    """Page title -> (depth, category) by a breadth-first walk over the mock's categories."""
+    depths = {root: 0}
+    queue = deque([root])
+    while queue:
+        j = queue.popleft()
+        if max_depth is not None and depths[j] == max_depth:
+            continue
+        for c in wiki.subcategories(j):
+            if c not in depths:
+                depths[c] = depths[j] + 1
+                queue.append(c)
+    pages = {}
+    for j, depth in depths.items():
+        for i in range(j, wiki.pages, wiki.categories):
+            pages[f"Page {i}"] = depth
+    return pages
+
+
+async def walk(wiki: MockWiki, category: str, **options):
+    async with WikiClient(wiki.endpoint) as client:
+        walker = CategoryWalker(client, concurrency=4)
+        return walker, await walker.members(category, **options)
+
+
+def test_live_walk_follows_cycles_once():
+    async def run():
+        async with MockWiki(500, categories=20) as wiki:
+            return wiki, *(await walk(wiki, "Cat 3"))
+
+    wiki, walker, members = asyncio.run(run())
+    expected = reference(wiki, 3, None)
+    assert len(members) == len({member.title for member in members})
+    assert {member.title: member.depth for member in members} == expected
+    assert all(member.pageid == int(member.title[5:]) + 1 for member in members)
+    # Every reachable category holds pages, and none is listed twice.
+    assert walker.categories == len({member.category for member in members})
+    assert walker.errors == 0
+
+
+def test_live_walk_respects_max_depth():
+    async def run():
+        async with MockWiki(500, categories=20) as wiki:
+            return wiki, *(await walk(wiki, "Category:Cat 3", max_depth=1))
+
+    wiki, _, members = asyncio.run(run())
+    assert {member.title: member.depth for member in members} == reference(wiki, 3, 1)
+
+
+def test_live_walk_buffers_a_bounded_number_of_members():
+    async def run():
+        async with MockWiki(20_000, categories=2) as wiki:
+            async with WikiClient(wiki.endpoint) as client:
+                walker = CategoryWalker(client, concurrency=1)
+                async for _ in walker.walk("Cat 0"):
+                    await asyncio.sleep(0.3)
+                    break
+            return wiki.requests
+
+    # Each category lists 10,000 pages, 500 per request; unbounded, the
+    # worker would have listed both of them by now.
+    assert asyncio.run(run()) <= 3
+
+
+def test_walk_local(tmp_path):
+    path = tmp_path / "categorylinks.sql"
+    path.write_text(CATEGORYLINKS)
+    walker = CategoryWalker.from_dump(path, TITLES)
+    members = {(m.title, m.ns, m.category, m.depth) for m in walker.walk_local("Animals")}
+    assert members == {("Dog", 0, "Category:Animals", 0), ("Cat", 0, "Category:Animals", 0),
+                       ("Whale", 0, "Category:Mammals", 1)}
+    assert walker.categories == 2
+    everything = {(m.title, m.ns, m.depth) for m in walker.walk_local("Category:Animals",
+                                                                      namespaces=None)}
+    assert everything == {("Dog", 0, 0), ("Cat", 0, 0), ("File:Dog.jpg", 6, 0),
+                          ("Category:Mammals", 14, 0), ("Whale", 0, 1),
+                          ("Category:Animals", 14, 1)}
+    assert sorted(m.title for m in walker.walk_local("Animals", max_depth=0)) == ["Cat", "Dog"]
+    assert [m.title for m in walker.walk_local("Sea life")] == ["Whale"]
+    assert list(walker.walk_local("No such category")) == []
@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+from wikiapi import centrality, graph, index
+from wikiapi.centrality import PageRank, _aligned, pagerank
+from wikiapi.graph import LinkGraph
+from wikiapi.index import InvertedIndex
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(centrality, "np", None)
+        monkeypatch.setattr(graph, "np", None)
+        monkeypatch.setattr(index, "np", None)
+    elif centrality.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def random_graph(n: int, m: int, seed: int, *, dangling: int = 3) -> LinkGraph:
+    rng = random.Random(seed)
+    edges = [(f"N{rng.randrange(n)}", f"N{rng.randrange(n)}") for _ in range(m)]
+    return LinkGraph.from_edges(edges, nodes=[f"Sink {i}" for i in range(dangling)])
+
+
+def dense_pagerank(g: LinkGraph, damping: float = 0.85) -> list[float]:
+    """Power iteration over the full transition matrix, to convergence."""
+    n = len(g)
+    matrix = [[0.0] * n for _ in range(n)]
+    for v in range(n):
+        targets = [int(t) for t in g.successors(v)]
+        for t in targets:
+            matrix[t][v] = 1.0 / len(targets)
+        if not targets:  # dangling: spread over every node
+            for t in range(n):
+                matrix[t][v] = 1.0 / n
+    x = [1.0 / n] * n
+    for _ in range(1000):
+        new = [damping * sum(row[v] * x[v] for v in range(n)) + (1 - damping) / n
+               for row in matrix]
+        if sum(abs(a - b) for a, b in zip(new, x)) < 1e-13:
+            return new
+        x = new
+    raise AssertionError("the reference did not converge")
+
+
+@pytest.mark.parametrize("block_links", [1, 5, 1 << 22])
+def test_matches_dense_power_iteration(backend, block_links):
+    g = random_graph(30, 90, seed=1)
+    assert any(g.out_degree(v) == 0 for v in range(len(g)))
+    ranks = pagerank(g, tol=1e-12, max_iter=1000, block_links=block_links)
+    assert ranks.converged
+    expected = dense_pagerank(g)
+    assert sum(ranks[v] for v in range(len(g))) == pytest.approx(1.0)
+    assert [ranks[v] for v in range(len(g))] == pytest.approx(expected, abs=1e-9)
+    best, _ = ranks.top(1)[0]
+    assert ranks.score(best) == pytest.approx(max(expected))
+
+
+def test_top_breaks_ties_by_node(backend):
+    g = LinkGraph.from_edges([("Hub", "Spoke")], nodes=[f"Node {i:04}" for i in range(2000)])
+    ranks = pagerank(g)
+    top = ranks.top(4)
+    assert [title for title, _ in top] == ["Spoke", "Hub", "Node 0000", "Node 0001"]
+    assert top[2][1] == top[3][1] == ranks.score("Node 1999")
+
+
+def test_warm_start_from_same_graph(backend):
+    g = random_graph(40, 120, seed=2)
+    cold = pagerank(g, tol=1e-10, max_iter=1000)
+    warm = pagerank(g, tol=1e-10, max_iter=1000, initial=cold)
+    assert warm.iterations < cold.iterations
+    assert [warm[v] for v in range(len(g))] == pytest.approx(
+        [cold[v] for v in range(len(g))], abs=1e-9)
+
+
+def test_warm_start_from_changed_graph(backend):
+    rng = random.Random(3)
+    edges = [(f"N{rng.randrange(40)}", f"N{rng.randrange(40)}") for _ in range(120)]
+    old = LinkGraph.from_edges(edges)
+    added = [("New", "N1"), ("N2", "New"), ("N3", "Another")]
+    new = LinkGraph.from_edges(edges[5:] + added)
+    before = pagerank(old, tol=1e-10, max_iter=1000)
+
+    aligned = _aligned(before, new)
+    for node in range(len(new)):
+        title = new.title(node)
+        if title in old:
+            assert aligned[node] == pytest.approx(before.score(title))
+        else:
+            assert aligned[node] == pytest.approx(1.0 / len(new))
+
+    cold = pagerank(new, tol=1e-10, max_iter=1000)
+    warm = pagerank(new, tol=1e-10, max_iter=1000, initial=before)
+    assert warm.iterations < cold.iterations
+    assert [warm[v] for v in range(len(new))] == pytest.approx(
+        [cold[v] for v in range(len(new))], abs=1e-9)
+    with pytest.raises(ValueError):
+        pagerank(new, initial=[1.0] * (len(new) + 1))
+
+
+def test_save_and_open(backend, tmp_path):
+    g = random_graph(20, 50, seed=4)
+    g.save(tmp_path)
+    ranks = pagerank(g)
+    ranks.save(tmp_path)
+    with PageRank.open(tmp_path) as opened:
+        assert [opened[v] for v in range(len(g))] == [ranks[v] for v in range(len(g))]
+        assert opened.top(3) == ranks.top(3)
+
+
+def test_column_as_search_priors(backend):
+    # Everything links to "Hub", so it outranks the equally matching "Leaf".
+    edges = [(f"Page {i}", "Hub") for i in range(10)] + [("Hub", "Page 0")]
+    g = LinkGraph.from_edges(edges)
+    ranks = PageRank(g, pagerank(g).scores, weight=2.0)
+    docs = InvertedIndex()
+    docs.add("Leaf", "river delta")
+    docs.add("Hub", "river delta")
+    docs.add("Page 3", "mountain")
+    assert [hit.title for hit in docs.search("river")] == ["Leaf", "Hub"]
+
+    column = ranks.column(docs)
+    assert len(column) == 3
+    assert column[0] == 0.0  # not in the graph
+    assert column[1] == pytest.approx(ranks.boost("Hub")) and column[1] > column[2] > 0
+    plain = {hit.title: hit.score for hit in docs.search("river")}
+    boosted = docs.search("river", priors=ranks)
+    assert [hit.title for hit in boosted] == ["Hub", "Leaf"]
+    assert boosted[0].score == pytest.approx(plain["Hub"] + ranks.boost("Hub"))
+    assert boosted[1].score == pytest.approx(plain["Leaf"])
+
+    # Documents added later are looked up on the next call; a new weight recomputes.
+    docs.add("Page 7", "river")
+    assert len(ranks.column(docs)) == 4
+    ranks.weight = 0.0
+    found = docs.search("river delta", priors=ranks)
+    assert [hit.title for hit in found] == ["Leaf", "Hub", "Page 7"]
+
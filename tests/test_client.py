@@ -0,0 +1,95 @@
+import asyncio
+
+from benchmarks.mockwiki import MockWiki
+from wikiapi import WikiClient, iter_list
+from wikiapi.client import HIGH_BATCH_SIZE
+
+
+async def fetch(titles: list[str], batch_size: int):
+    async with MockWiki(1000) as wiki:
+        async with WikiClient(wiki.endpoint, batch_size=batch_size) as client:
+            articles = await client.fetch_articles(titles)
+    return wiki, articles
+
+
+def test_600_titles_take_12_requests():
+    titles = [f"Page {i}" for i in range(600)]
+    wiki, articles = asyncio.run(fetch(titles, 50))
+    assert wiki.requests == 12
+    assert wiki.posts == 0
+    assert [article.title for article in articles] == titles
+    assert not any(article.missing for article in articles)
+
+
+def test_long_batches_are_posted():
+    titles = [f"Page {i}" for i in range(HIGH_BATCH_SIZE)]
+    wiki, articles = asyncio.run(fetch(titles, HIGH_BATCH_SIZE))
+    assert wiki.requests == wiki.posts == 1
+    assert [article.title for article in articles] == titles
+
+
+def test_identical_requests_in_flight_are_sent_once():
+    async def run():
+        async with MockWiki(100, latency=0.05) as wiki:
+            async with WikiClient(wiki.endpoint) as client:
+                params = {"action": "query", "titles": ["Page 1", "Page 2"], "prop": "info"}
+                same = await asyncio.gather(*(client.api(**params) for _ in range(10)))
+                counts = [wiki.requests, client.coalesced]
+                # Parameters in another order are the same request.
+                await asyncio.gather(client.api(**params),
+                                     client.api(prop="info", titles="Page 2|Page 1",
+                                                action="query"))
+                counts += [wiki.requests, client.coalesced]
+                # Once the response is in, the next identical request is sent again.
+                await client.api(**params)
+                counts.append(wiki.requests)
+        return same, counts
+
+    same, counts = asyncio.run(run())
+    assert counts == [1, 9, 2, 10, 3]
+    assert all(response is same[0] for response in same)
+    assert [page["title"] for page in same[0]["query"]["pages"]] == ["Page 1", "Page 2"]
+
+
+def test_cancelled_caller_does_not_cancel_the_request():
+    async def run():
+        async with MockWiki(100, latency=0.1) as wiki:
+            async with WikiClient(wiki.endpoint) as client:
+                first = asyncio.ensure_future(client.api(action="query", titles="Page 3"))
+                second = asyncio.ensure_future(client.api(action="query", titles="Page 3"))
+                await asyncio.sleep(0.02)
+                first.cancel()
+                data = await second
+        return first, data, wiki.requests
+
+    first, data, requests = asyncio.run(run())
+    assert first.cancelled() and requests == 1
+    assert data["query"]["pages"][0]["title"] == "Page 3"
+
+
+def test_single_fetches_are_batched():
+    async def run():
+        async with MockWiki(100) as wiki:
+            async with WikiClient(wiki.endpoint) as client:
+                titles = ["Page 1", "Page 2", "Page 1", "page_3", "Redirect 2", "Page 1"]
+                articles = await asyncio.gather(*(client.fetch_article(t) for t in titles))
+        return articles, wiki.requests, client.coalesced
+
+    articles, requests, coalesced = asyncio.run(run())
+    assert requests == 1 and coalesced == 2
+    assert [a.title for a in articles] == ["Page 1", "Page 2", "Page 1", "Page 3", "Page 2",
+                                           "Page 1"]
+
+
+def test_blocking_list_stream():
+    async def run():
+        async with MockWiki(300, links_per_page=5) as wiki:
+            stream = iter_list("backlinks", {"bltitle": "Page 1", "bllimit": 2},
+                               endpoint=wiki.endpoint, max_connections=1)
+            items = await asyncio.to_thread(list, stream)
+        return wiki, items
+
+    wiki, items = asyncio.run(run())
+    expected = [f"Page {j}" for j in wiki.backlinks(1)]
+    assert len(expected) > 2 and [item["title"] for item in items] == expected
+    assert wiki.requests == (len(expected) + 1) // 2
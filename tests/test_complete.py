@@ -0,0 +1,84 @@
+import itertools
+import random
+
+import pytest
+
+from wikiapi import complete
+from wikiapi.complete import TitleCompleter, normalize_prefix
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(complete, "np", None)
+    elif complete.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def random_titles(size: int, seed: int) -> list[tuple[str, float]]:
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(size):
+        title = "".join(rng.choices("aAbB c_é", k=rng.randint(1, 6)))
+        if title.strip(" _"):
+            titles.append((title, float(rng.randint(1, 20))))  # exact in float32
+    return titles
+
+
+def reference(titles: list[tuple[str, float]], prefix: str, k: int) -> list[tuple[str, float]]:
+    """The best ``k`` matches by a scan over every title."""
+    key = normalize_prefix(prefix)
+    if key and (prefix[-1:].isspace() or prefix[-1:] == "_"):
+        key += " "
+    entries = [(normalize_prefix(t.replace("_", " ")), t.replace("_", " "), w)
+               for t, w in titles]
+    matches = sorted((-w, norm, title) for norm, title, w in entries if norm.startswith(key))
+    return [(title, -w) for w, _, title in matches[:k]]
+
+
+def test_normalize_prefix():
+    assert normalize_prefix("  New_York   City ") == "new york city"
+    assert normalize_prefix("ÉCOLE") == "école"
+    assert normalize_prefix("") == ""
+
+
+@pytest.mark.parametrize("threshold", [5, 40, 10_000])
+def test_matches_reference(backend, threshold):
+    titles = random_titles(600, seed=1)
+    completer = TitleCompleter.from_titles(titles, k=5, threshold=threshold)
+    assert len(completer) == len(titles)
+    prefixes = ["", " ", "a", "A", "é", "x", "a ", "a_", "A  B", "ab ", "b_c"]
+    prefixes += ["".join(p) for p in itertools.product("ab c", repeat=2)]
+    prefixes += ["".join(p) for p in itertools.product("abé", repeat=3)]
+    for prefix in prefixes:
+        for k in (1, 5, 12):
+            assert completer.complete_weighted(prefix, k) == reference(titles, prefix, k)
+        assert completer.complete(prefix) == [t for t, _ in reference(titles, prefix, 5)]
+    assert completer.complete("a", 0) == []
+
+
+def test_popular_titles_first(backend):
+    completer = TitleCompleter.from_titles(
+        [("New York", 50.0), ("Newton", 80.0), ("New_Zealand", 60.0), ("Newark", 10.0),
+         "New", ("Old York", 99.0)], k=3, threshold=3)
+    assert completer.complete("new") == ["Newton", "New Zealand", "New York"]
+    assert completer.complete("NEW_") == ["New Zealand", "New York"]
+    assert completer.complete("new  y") == ["New York"]
+    assert completer.complete_weighted("new", 10)[-1] == ("New", 1.0)
+    assert completer.complete("") == ["Old York", "Newton", "New Zealand"]
+    with pytest.raises(ValueError):
+        TitleCompleter.from_titles(["A"], k=10, threshold=5)
+
+
+def test_save_and_open(backend, tmp_path):
+    titles = random_titles(300, seed=2)
+    completer = TitleCompleter.from_titles(titles, k=4, threshold=10)
+    completer.save(tmp_path / "titles.bin")
+    with TitleCompleter.open(tmp_path / "titles.bin") as opened:
+        assert (opened.k, opened.threshold, len(opened)) == (4, 10, len(completer))
+        for prefix in ["", "a", "ab", "b c", "é"]:
+            assert opened.complete_weighted(prefix) == completer.complete_weighted(prefix)
+    (tmp_path / "bad.bin").write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        TitleCompleter.open(tmp_path / "bad.bin")
@@ -0,0 +1,81 @@
+import asyncio
+
+from benchmarks.mockwiki import MockWiki
+from wikiapi import Crawler
+
+
+class FlakyCrawler(Crawler):
+    """Fails the first ``failures`` fetches of every batch containing ``title``."""
+
+    def __init__(self, *args, title: str, failures: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.title = title
+        self.failures = failures
+
+    async def _fetch(self, endpoint, entries, links):
+        if self.failures and any(entry.title == self.title for entry in entries):
+            self.failures -= 1
+            raise OSError("connection reset")
+        return await super()._fetch(endpoint, entries, links)
+
+
+async def crawl_flaky(failures: int) -> tuple[Crawler, list[str]]:
+    async with MockWiki(200) as wiki:
+        async with FlakyCrawler(wiki.endpoint, concurrency=4, batch_size=10, max_pages=50,
+                                title="Page 0", failures=failures, max_retries=2) as crawler:
+            titles = [article.title async for article in crawler.crawl(["Page 0"])]
+    return crawler, titles
+
+
+def test_failed_batches_are_retried():
+    crawler, titles = asyncio.run(crawl_flaky(2))
+    assert "Page 0" in titles
+    assert len(titles) == len(set(titles)) == 50
+    assert crawler.retried == 2
+    assert crawler.errors == 0
+
+
+def test_retries_are_bounded():
+    crawler, titles = asyncio.run(crawl_flaky(10))
+    assert titles == []
+    assert crawler.retried == 2
+    assert crawler.errors == 1
+    assert crawler.failures == 7
+
+
+def test_results_are_bounded():
+    async def stall() -> Crawler:
+        async with MockWiki(2000) as wiki:
+            async with Crawler(wiki.endpoint, concurrency=2, batch_size=5) as crawler:
+                async for _ in crawler.crawl(["Page 0"]):
+                    await asyncio.sleep(0.5)
+                    break
+        return crawler
+
+    crawler = asyncio.run(stall())
+    # One taken, a full queue, and one article in hand per blocked worker.
+    assert crawler.fetched <= 1 + 2 * 5 + 2
+
+
+def test_resumed_crawl_delivers_every_page(tmp_path):
+    async def run(wiki: MockWiki, stop: int | None) -> tuple[list[str], set[str]]:
+        titles = []
+        async with Crawler(wiki.endpoint, concurrency=4, batch_size=5, max_pages=40,
+                           state_dir=tmp_path) as crawler:
+            async for article in crawler.crawl(["Page 0"]):
+                titles.append(article.title)
+                if len(titles) == stop:
+                    break
+            seen = {title for _, title in crawler.frontier.seen}
+        return titles, seen
+
+    async def stop_and_resume():
+        async with MockWiki(300) as wiki:
+            first, _ = await run(wiki, 3)
+            second, seen = await run(wiki, None)
+        return first, second, seen
+
+    first, second, seen = asyncio.run(stop_and_resume())
+    assert len(first) == 3
+    assert len(seen) == 40
+    assert set(first) | set(second) == seen
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from wikiapi import diskindex, index
+from wikiapi.centrality import PageRank, pagerank
+from wikiapi.diskindex import DiskIndex, write_index
+from wikiapi.graph import LinkGraph
+from wikiapi.index import InvertedIndex
+
+WORDS = ["river", "delta", "city", "mountain", "lake", "bridge", "tower", "castle", "forest",
+         "valley", "island", "harbour", "station", "museum", "garden", "market", "zürich",
+         "straße", "東京"]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(index, "np", None)
+        monkeypatch.setattr(diskindex, "np", None)
+    elif diskindex.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def build(size: int, seed: int) -> InvertedIndex:
+    rng = random.Random(seed)
+    idx = InvertedIndex(k1=1.5, b=0.6)
+    for i in range(size):
+        title = " ".join(rng.sample(WORDS, rng.randint(1, 2))).title() + f" {i}"
+        # Long documents have term frequencies that take two varint bytes.
+        text = " ".join(rng.choices(WORDS, k=rng.choice([0, 5, 3000])))
+        idx.add(title, text, None if i % 7 == 0 else 10_000 + i)
+    return idx
+
+
+def hits(results) -> list[tuple]:
+    return [(hit.docid, hit.title, hit.pageid) for hit in results]
+
+
+def test_matches_inverted_index(backend, tmp_path):
+    memory = build(300, seed=1)
+    assert max(max(tfs) for _, tfs in memory.postings.values()) > 127
+    write_index(memory, tmp_path / "index.bin")
+    rng = random.Random(2)
+    queries = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(40)]
+    with DiskIndex(tmp_path / "index.bin") as disk:
+        assert len(disk) == len(memory) and disk.num_terms == len(memory.postings)
+        assert disk.avg_length == pytest.approx(memory.avg_length)
+        assert (disk.k1, disk.b) == (memory.k1, memory.b)
+        for query in queries + ["Castle 250", "nothing here"]:
+            for k in (1, 10, 500):
+                expected, found = memory.search(query, k), disk.search(query, k)
+                assert hits(found) == hits(expected)
+                # Norms are stored as float32.
+                assert [hit.score for hit in found] == pytest.approx(
+                    [hit.score for hit in expected], rel=1e-6)
+        terms = [(term, list(docids), list(tfs)) for term, docids, tfs in disk.iter_terms()]
+        assert terms == [(term, list(memory.postings[term][0]), list(memory.postings[term][1]))
+                         for term in sorted(memory.postings)]
+        assert disk.lookup("東京")[2] == len(memory.postings["東京"][0])
+        assert disk.postings("absent") is None and disk.lookup("absent") is None
+        for docid in (0, 7, 299):
+            assert disk.title(docid) == memory.title(docid)
+            assert disk.find(memory.title(docid)) == docid
+        assert disk.find("Absent") is None
+
+
+def test_priors(backend, tmp_path):
+    memory = build(50, seed=3)
+    titles = [memory.title(d) for d in range(len(memory))]
+    g = LinkGraph.from_edges([(title, titles[0]) for title in titles[1:]])
+    ranks = PageRank(g, pagerank(g).scores)
+    write_index(memory, tmp_path / "index.bin")
+    with DiskIndex(tmp_path / "index.bin") as disk:
+        expected = memory.search("river city", 20, priors=ranks)
+        found = disk.search("river city", 20, priors=ranks)
+        assert hits(found) == hits(expected)
+        assert [hit.score for hit in found] == pytest.approx([hit.score for hit in expected])
+
+
+def test_empty_index(backend, tmp_path):
+    write_index(InvertedIndex(), tmp_path / "empty.bin")
+    with DiskIndex(tmp_path / "empty.bin") as disk:
+        assert len(disk) == 0 and disk.num_terms == 0 and disk.avg_length == 0.0
+        assert disk.search("river") == [] and disk.find("River") is None
+        assert list(disk.iter_terms()) == []
+
+
+def test_rejects_other_files(tmp_path):
+    (tmp_path / "bad.bin").write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        DiskIndex(tmp_path / "bad.bin")
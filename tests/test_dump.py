@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.dumpgen import synthetic_pages, write_multistream
+from wikiapi.dump import DumpReader
+
+PAGES = 1000
+
+
+@pytest.fixture(scope="module")
+def dump(tmp_path_factory):
+    dump_path, index_path = write_multistream(tmp_path_factory.mktemp("dump"),
+                                              synthetic_pages(PAGES))
+    with DumpReader(dump_path, index_path) as reader:
+        yield reader
+
+
+@pytest.fixture(scope="module")
+def streamed(dump):
+    return list(dump.iter_pages(None))
+
+
+def test_streaming_reads_every_page(dump, streamed):
+    assert [article.pageid for article in streamed] == list(range(1, PAGES + 1))
+    assert len(dump.index) == PAGES
+    assert [article.title for article in dump] == [article.title for article in streamed
+                                                   if article.ns == 0]
+
+
+def test_get_matches_streaming(dump, streamed):
+    offsets = dump.index.offsets
+    # Page 547 sits in the sixth of ten streams, well away from either end.
+    middle = dump.index.by_title["Page 547"][0]
+    assert offsets[0] < middle < offsets[-1]
+    by_title = {article.title: article for article in streamed}
+    for title in ("Page 0", "Page 547", "Redirect 549", "Page 550", "Redirect 999"):
+        assert dump.get(title) == by_title[title]
+    assert dump.get("No such page") is None
+
+
+def test_get_many_matches_streaming(dump, streamed):
+    titles = [article.title for article in streamed[540:560]] + ["No such page"]
+    titles += [streamed[0].title, streamed[-1].title, "Page 547"]
+    by_title = {article.title: article for article in streamed}
+    assert dump.get_many(titles) == [by_title.get(title) for title in titles]
+
+
+def test_parallel_matches_streaming(dump, streamed):
+    parallel = list(dump.iter_pages_parallel(2, namespaces=None, streams_per_task=3))
+    assert parallel == streamed
+
@@ -0,0 +1,63 @@
+import random
+
+from wikiapi.frontier import Frontier
+
+WIKI = "https://en.wikipedia.org/w/api.php"
+
+
+def drain(frontier: Frontier) -> list[str]:
+    titles = []
+    while (entry := frontier.pop()) is not None:
+        titles.append(entry.title)
+    return titles
+
+
+def test_spill_and_refill_keep_every_entry():
+    depths = list(range(50))
+    random.Random(2).shuffle(depths)
+    frontier = Frontier(hot_size=6)
+    for depth in depths:
+        frontier.add(WIKI, f"Page {depth}", depth=depth)
+    assert frontier._spilled > 0
+    assert len(frontier) == 50
+    popped = drain(frontier)
+    # Spills only ever move the worse half, so the best entries never leave memory.
+    assert popped[:3] == ["Page 0", "Page 1", "Page 2"]
+    assert sorted(popped) == sorted(f"Page {depth}" for depth in depths)
+    assert len(frontier) == 0
+    frontier.close()
+
+
+def test_resume(tmp_path):
+    with Frontier(tmp_path, hot_size=4) as frontier:
+        for i in range(10):
+            frontier.add(WIKI, f"Page {i}", depth=i)
+        done, retried, _ = frontier.pop_batch(3)
+        frontier.complete(done, pageid=7)
+        frontier.retry(retried)
+    with Frontier(tmp_path, hot_size=4) as frontier:
+        assert frontier.resumed
+        assert frontier.has_pageid(WIKI, 7)
+        assert not frontier.add(WIKI, "Page 0")
+        expected = [f"Page {i}" for i in range(10) if f"Page {i}" != done.title]
+        assert sorted(drain(frontier)) == sorted(expected)
+
+
+def test_replay_after_crash(tmp_path):
+    frontier = Frontier(tmp_path, hot_size=4, flush_interval=0.0)
+    for i in range(6):
+        frontier.add(WIKI, f"Page {i}", depth=i)
+    done, retried = frontier.pop_batch(2)
+    frontier.checkpoint()
+    frontier.complete(done, pageid=1)
+    frontier.retry(retried)
+    frontier.add(WIKI, "Page 6", depth=6)
+    frontier.mark_seen(WIKI, "Page 7")
+    # Crash mid-write: no checkpoint, and a torn record at the end of the journal.
+    with open(frontier._journal_path(frontier._generation), "a", encoding="utf-8") as fh:
+        fh.write('["p", 8, "%s", "Pa' % WIKI)
+    with Frontier(tmp_path, hot_size=4) as resumed:
+        assert resumed.has_pageid(WIKI, 1)
+        assert (WIKI, "Page 7") in resumed.seen
+        expected = [f"Page {i}" for i in range(7) if f"Page {i}" != done.title]
+        assert sorted(drain(resumed)) == sorted(expected)
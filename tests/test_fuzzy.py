@@ -0,0 +1,49 @@
+import itertools
+import random
+
+import pytest
+
+from wikiapi import fuzzy
+from wikiapi.fuzzy import FuzzyTitleIndex, levenshtein
+
+# Every string of up to three letters over a small alphabet, plus longer ones.
+SHORT = ["".join(p) for n in range(1, 4) for p in itertools.product("abc", repeat=n)]
+LONG = ["abcd", "abcde", "Paris", "Pisa", "Rome", "Oslo", "Albert Einstein"]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def index(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(fuzzy, "np", None)
+    elif fuzzy.np is None:
+        pytest.skip("numpy is not installed")
+    return FuzzyTitleIndex.from_titles(SHORT + LONG)
+
+
+def expected(query: str, d: int) -> set[str]:
+    return {title for title in SHORT + LONG
+            if levenshtein(query.lower(), title.lower(), d) <= d}
+
+
+def test_short_titles_are_found(index):
+    rng = random.Random(3)
+    queries = ["", "a", "ab", "cab", "x", "xyz", "abca", "pari", "osl", "rom"]
+    queries += ["".join(rng.choice("abcx") for _ in range(rng.randrange(6)))
+                for _ in range(50)]
+    for query in queries:
+        for d in (0, 1, 2):
+            found = index.lookup(query, k=len(SHORT) + len(LONG), max_distance=d)
+            assert {title for title, _ in found} == expected(query, d), (query, d)
+
+
+def test_lookup_ranks_closest_first(index):
+    assert index.lookup("ab", k=3) == [("ab", 0), ("a", 1), ("aa", 1)]
+    assert index.best("Albert Einstien") == "Albert Einstein"
+
+
+def test_chunks_with_equal_hashes_count_separately(index):
+    # With a CRC seeded by chunk number and length, the chunks "db" (number 4,
+    # length 6) and "ed" (number 2, length 7) hashed alike and this was missed.
+    assert levenshtein("aadedb", "ccd db", 3) == 3
+    wide = FuzzyTitleIndex.from_titles(["ccd  db"], max_distance=3)
+    assert wide.lookup("aadedb", max_distance=3) == [("ccd  db", 3)]
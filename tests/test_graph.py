@@ -0,0 +1,110 @@
+import gzip
+
+import pytest
+
+from wikiapi import graph
+from wikiapi.graph import LinkGraph, iter_pagelinks_sql
+from wikiapi.redirects import RedirectMap
+
+TITLES = {1: "Alpha", 2: "Beta", 3: "Gamma", 4: "Talk:Alpha", 5: "Delta", 6: "Old Beta"}
+
+# The layout before MediaWiki 1.43: (pl_from, pl_namespace, pl_title, pl_from_namespace).
+PAGELINKS = (b"INSERT INTO `pagelinks` VALUES (1,0,'Beta',0),(1,0,'Gamma',0),(1,0,'Beta',0),"
+             b"(1,0,'Alpha',0),(2,0,'Gamma',0),(3,0,'Alpha',0),(3,0,'Red_link',0),"
+             b"(4,0,'Alpha',1),(2,1,'Alpha',0),(5,0,'Old_Beta',0),(6,0,'Beta',0);\n")
+# Since: (pl_from, pl_from_namespace, pl_target_id), titles in linktarget.
+PAGELINKS_TARGETS = (b"INSERT INTO `pagelinks` VALUES (1,0,10),(1,0,11),(1,0,10),(1,0,12),"
+                     b"(2,0,11),(3,0,12),(3,0,13),(4,1,12),(2,0,14),(5,0,15),(6,0,10);\n")
+LINKTARGETS = (b"INSERT INTO `linktarget` VALUES (10,0,'Beta'),(11,0,'Gamma'),(12,0,'Alpha'),"
+               b"(13,0,'Red_link'),(14,1,'Alpha'),(15,0,'Old_Beta');\n")
+
+EXPECTED = {"Alpha": ["Beta", "Gamma"], "Beta": ["Gamma"], "Gamma": ["Alpha"],
+            "Delta": ["Old Beta"], "Old Beta": ["Beta"]}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(graph, "np", None)
+    elif graph.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def adjacency(g: LinkGraph) -> dict[str, list[str]]:
+    return {g.title(node): [g.title(int(t)) for t in g.successors(node)]
+            for node in range(len(g))}
+
+
+def write_gz(path, data: bytes):
+    with gzip.open(path, "wb") as fh:
+        fh.write(data)
+    return path
+
+
+def test_csr_layout(backend):
+    edges = [("B", "C"), ("A", "C"), ("A", "B"), ("A", "C"), ("C", "C"), ("C", "A")]
+    g = LinkGraph.from_edges(edges, nodes=["D"])
+    assert [g.title(i) for i in range(len(g))] == ["A", "B", "C", "D"]
+    assert [int(x) for x in g.indptr] == [0, 2, 3, 4, 4]
+    assert [int(x) for x in g.indices] == [1, 2, 2, 0]
+    assert g.num_edges == 4
+    assert [int(x) for x in g.out_degrees()] == [2, 1, 1, 0]
+    assert sorted(g.edges()) == [(0, 1), (0, 2), (1, 2), (2, 0)]
+    assert g.id("D") == 3 and g.id("E") is None
+    assert g.links("a") == ["B", "C"] and g.links("E") == []
+
+
+def test_from_pagelinks_dump(backend, tmp_path):
+    path = write_gz(tmp_path / "pagelinks.sql.gz", PAGELINKS)
+    g = LinkGraph.from_pagelinks_dump(path, TITLES)
+    assert adjacency(g) == EXPECTED
+    assert "Talk:Alpha" not in g and "Red link" not in g
+
+
+def test_from_pagelinks_dump_with_linktargets(backend, tmp_path):
+    path = write_gz(tmp_path / "pagelinks.sql.gz", PAGELINKS_TARGETS)
+    with pytest.raises(ValueError):
+        list(iter_pagelinks_sql(path))
+    targets = write_gz(tmp_path / "linktarget.sql.gz", LINKTARGETS)
+    g = LinkGraph.from_pagelinks_dump(path, TITLES, linktargets=targets)
+    assert adjacency(g) == EXPECTED
+
+
+def test_from_pagelinks_dump_with_redirects(backend, tmp_path):
+    path = write_gz(tmp_path / "pagelinks.sql.gz", PAGELINKS)
+    g = LinkGraph.from_pagelinks_dump(path, TITLES, redirects=RedirectMap({"Old Beta": "Beta"}))
+    assert adjacency(g) == {"Alpha": ["Beta", "Gamma"], "Beta": ["Gamma"],
+                            "Gamma": ["Alpha"], "Delta": ["Beta"]}
+
+
+def test_save_and_open(backend, tmp_path):
+    g = LinkGraph.from_pagelinks_dump(write_gz(tmp_path / "pl.sql.gz", PAGELINKS), TITLES)
+    g.save(tmp_path / "graph")
+    with LinkGraph.open(tmp_path / "graph") as opened:
+        assert adjacency(opened) == adjacency(g)
+        assert opened.id("Gamma") == g.id("Gamma")
+        assert opened.nbytes == g.nbytes
+        # A mapped graph saves its sections as they are.
+        opened.save(tmp_path / "copy")
+    with LinkGraph.open(tmp_path / "copy") as copy:
+        assert adjacency(copy) == adjacency(g)
+
+
+def test_empty_graph_round_trip(backend, tmp_path):
+    g = LinkGraph.from_edges([])
+    g.save(tmp_path / "empty")
+    with LinkGraph.open(tmp_path / "empty") as opened:
+        assert len(opened) == 0 and opened.num_edges == 0
+
+
+def test_transpose(backend):
+    edges = [(f"n{i}", f"n{(i * 7 + j * 3) % 23}") for i in range(23) for j in range(4)]
+    g = LinkGraph.from_edges(edges, nodes=["lonely"])
+    reverse = g.transpose()
+    expected = {title: [] for title in adjacency(g)}
+    for source, targets in adjacency(g).items():
+        for target in targets:
+            expected[target].append(source)
+    assert adjacency(reverse) == {title: sorted(sources) for title, sources in expected.items()}
+    assert adjacency(reverse.transpose()) == adjacency(g)
@@ -0,0 +1,110 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from wikiapi import index
+from wikiapi.article import Article
+from wikiapi.index import InvertedIndex, tokenize
+
+WORDS = ["river", "delta", "city", "mountain", "lake", "bridge", "tower", "castle", "forest",
+         "valley", "island", "harbour", "station", "museum", "garden", "market"]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(index, "np", None)
+    elif index.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def corpus(size: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(size):
+        title = " ".join(rng.sample(WORDS, rng.randint(1, 2))).title() + f" {i}"
+        text = " ".join(rng.choices(WORDS, k=rng.randint(0, 60)))
+        docs.append((title, text))
+    return docs
+
+
+def bm25(docs: list[tuple[str, str]], query: str, k1: float, b: float,
+         title_weight: int = 3) -> dict[int, float]:
+    """Okapi BM25 of every matching document, straight from the definition."""
+    counts = []
+    for title, text in docs:
+        tf = Counter(tokenize(text))
+        for token in tokenize(title):
+            tf[token] += title_weight
+        counts.append(tf)
+    lengths = [sum(tf.values()) for tf in counts]
+    avg = sum(lengths) / len(lengths)
+    scores: dict[int, float] = {}
+    for term in dict.fromkeys(tokenize(query)):
+        df = sum(term in tf for tf in counts)
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for docid, tf in enumerate(counts):
+            if term in tf:
+                norm = k1 * (1 - b + b * lengths[docid] / avg)
+                scores[docid] = scores.get(docid, 0.0) + idf * tf[term] * (k1 + 1) / (
+                    tf[term] + norm)
+    return scores
+
+
+@pytest.mark.parametrize("k1,b", [(1.2, 0.75), (2.0, 0.3), (0.5, 1.0)])
+def test_matches_reference_bm25(backend, k1, b):
+    docs = corpus(150, seed=1)
+    idx = InvertedIndex(k1=k1, b=b)
+    for pageid, (title, text) in enumerate(docs):
+        idx.add(title, text, pageid + 100)
+    rng = random.Random(2)
+    queries = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(30)]
+    queries += ["River river RIVER", "castle 17", "castle unknownword"]
+    for query in queries:
+        expected = bm25(docs, query, k1, b)
+        for k in (1, 10, 1000):
+            hits = idx.search(query, k)
+            assert [hit.score for hit in hits] == pytest.approx(
+                sorted(expected.values(), reverse=True)[:k])
+            for hit in hits:
+                assert hit.score == pytest.approx(expected[hit.docid])
+                assert hit.title == docs[hit.docid][0] and hit.pageid == hit.docid + 100
+            # Equal scores are ordered by document ID.
+            ranked = [(-hit.score, hit.docid) for hit in hits]
+            assert ranked == sorted(ranked)
+
+
+def test_ties_and_edge_cases(backend):
+    idx = InvertedIndex()
+    for title in ["Gamma", "Alpha", "Beta"]:
+        idx.add(title, "same words here")
+    idx.add("Other", "nothing in common")
+    assert [hit.title for hit in idx.search("words")] == ["Gamma", "Alpha", "Beta"]
+    assert [hit.title for hit in idx.search("words", k=2)] == ["Gamma", "Alpha"]
+    assert idx.search("words", k=0) == []
+    assert idx.search("absent") == [] and idx.search("") == []
+    assert idx.search("words")[0].pageid is None
+    assert InvertedIndex().search("words") == []
+
+
+def test_ties_at_the_cut(backend):
+    # More equal scores than k: the lowest document IDs win, in order.
+    idx = InvertedIndex()
+    for i in range(1000):
+        idx.add(f"T{i}", "same words" if i % 3 else "same words words")
+    assert [hit.docid for hit in idx.search("words", 5)] == [0, 3, 6, 9, 12]
+    assert [hit.docid for hit in idx.search("same", 5)] == [1, 2, 4, 5, 7]
+
+
+def test_from_articles_save_and_load(backend, tmp_path):
+    articles = [Article("River", 1, text="a long river"), Article("Lake", 2, text="a lake"),
+                Article("Stream", 3, redirect="River"), Article("Gone", missing=True)]
+    idx = InvertedIndex.from_articles(articles, b=0.5)
+    assert len(idx) == 2 and idx.b == 0.5
+    idx.save(tmp_path / "index.pickle")
+    loaded = InvertedIndex.load(tmp_path / "index.pickle")
+    assert [hit.as_dict() for hit in loaded.search("river lake")] == [
+        hit.as_dict() for hit in idx.search("river lake")]
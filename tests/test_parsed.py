@@ -0,0 +1,17 @@
+from wikiapi.parsed import ParsedArticle
+
+TEXT = ("Intro.\n=x+1 is an equation\nMore.\n"
+        "== History ==<!-- c -->\nBody.\n"
+        "== Legacy ==\nSee [[Sex: The Annabel Chong Story]] and [[Paris]].[[fr:Paris]]")
+
+
+def test_lines_starting_with_equals_are_not_sections():
+    article = ParsedArticle(TEXT)
+    assert article.titles == ("History", "Legacy")
+    assert [section.level for section in article] == [0, 2, 2]
+    assert article.lead.wikitext == "Intro.\n=x+1 is an equation\nMore.\n"
+    assert article.find("History").wikitext == "== History ==<!-- c -->\nBody.\n"
+
+
+def test_only_language_prefixes_are_interlanguage_links():
+    assert ParsedArticle(TEXT)["Legacy"].links == ["Sex: The Annabel Chong Story", "Paris"]
@@ -0,0 +1,122 @@
+import asyncio
+import random
+from collections import deque
+
+import pytest
+
+from benchmarks.mockwiki import MockWiki
+from wikiapi import WikiClient, graph, paths
+from wikiapi.graph import LinkGraph
+from wikiapi.paths import PathFinder
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(paths, "np", None)
+        monkeypatch.setattr(graph, "np", None)
+    elif paths.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+def random_edges(n: int, m: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    return [(f"N{rng.randrange(n)}", f"N{rng.randrange(n)}") for _ in range(m)]
+
+
+def all_shortest_paths(edges: list[tuple[str, str]], source: str,
+                       target: str) -> set[tuple[str, ...]]:
+    """Every shortest path, by a plain breadth-first search and enumeration."""
+    succ: dict[str, set[str]] = {}
+    for a, b in edges:
+        if a != b:
+            succ.setdefault(a, set()).add(b)
+    dist = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for other in succ.get(node, ()):
+            if other not in dist:
+                dist[other] = dist[node] + 1
+                queue.append(other)
+    if target not in dist:
+        return set()
+    found = set()
+
+    def extend(path: list[str]) -> None:
+        node = path[-1]
+        if node == target:
+            found.add(tuple(path))
+            return
+        for other in succ.get(node, ()):
+            if dist.get(other) == dist[node] + 1 and dist[other] <= dist[target]:
+                extend([*path, other])
+
+    extend([source])
+    return {path for path in found if len(path) == dist[target] + 1}
+
+
+def test_shortest_paths_match_reference(backend):
+    edges = random_edges(60, 120, seed=1)
+    finder = PathFinder(LinkGraph.from_edges(edges))
+    rng = random.Random(2)
+    nodes = sorted({title for edge in edges for title in edge})
+    checked = 0
+    for _ in range(200):
+        source, target = rng.choice(nodes), rng.choice(nodes)
+        expected = all_shortest_paths(edges, source, target)
+        found = finder.shortest_paths(source, target, limit=10_000)
+        assert len(found) == len(set(map(tuple, found)))
+        assert set(map(tuple, found)) == expected
+        one = finder.shortest_path(source, target)
+        assert (one is None) if not expected else tuple(one) in expected
+        checked += len(expected) > 1
+    assert checked  # some pairs have several shortest paths
+
+
+def test_limit(backend):
+    # Four shortest paths from A to Z, through B or C and then D or E.
+    edges = [("A", "B"), ("A", "C"), ("B", "D"), ("B", "E"), ("C", "D"), ("C", "E"),
+             ("D", "Z"), ("E", "Z")]
+    finder = PathFinder(LinkGraph.from_edges(edges))
+    assert len(finder.shortest_paths("A", "Z")) == 4
+    two = finder.shortest_paths("A", "Z", limit=2)
+    assert len(two) == 2 and len({tuple(path) for path in two}) == 2
+    assert all(len(path) == 4 and path[0] == "A" and path[-1] == "Z" for path in two)
+
+
+def test_no_path_and_trivial_path(backend):
+    finder = PathFinder(LinkGraph.from_edges([("A", "B"), ("B", "C"), ("D", "A")],
+                                             nodes=["Lonely"]))
+    assert finder.shortest_paths("C", "A") == []
+    assert finder.shortest_path("A", "Lonely") is None
+    assert finder.shortest_paths("A", "Unknown") == []
+    assert finder.shortest_paths("B", "B") == [["B"]]
+    assert finder.shortest_paths("D", "C") == [["D", "A", "B", "C"]]
+    assert finder.shortest_paths("D", "C", max_depth=2) == []
+    # Distances are reset between searches.
+    assert finder.shortest_paths("D", "C") == [["D", "A", "B", "C"]]
+
+
+def test_live_find_matches_local_graph():
+    async def run():
+        async with MockWiki(300, links_per_page=4) as wiki:
+            edges = [(f"Page {i}", f"Page {t}") for i in range(wiki.pages)
+                     for t in wiki.link_targets(i)]
+            local = PathFinder(LinkGraph.from_edges(edges))
+            results = []
+            async with WikiClient(wiki.endpoint) as client:
+                live = PathFinder(client=client)
+                for source, target in [(0, 1), (5, 77), (10, 250), (42, 42), (299, 3)]:
+                    source, target = f"Page {source}", f"Page {target}"
+                    expected = local.shortest_paths(source, target)
+                    found = await live.find(source, target, all_paths=True, max_depth=10)
+                    one = await live.find(source, target, max_depth=10)
+                    results.append((expected, found, one))
+            return results
+
+    for expected, found, one in asyncio.run(run()):
+        assert expected and len(expected[0]) <= 11
+        assert sorted(found) == sorted(expected)
+        assert len(one) == 1 and one[0] in expected
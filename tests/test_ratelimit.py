@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from benchmarks.mockwiki import MockWiki
+from wikiapi import WikiClient
+from wikiapi.ratelimit import RateLimiter
+
+
+class RecordingLimiter(RateLimiter):
+    """Logs when requests go out and when throttles come back."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent: list[float] = []
+        self.throttled: list[tuple[float, float | None]] = []
+
+    async def acquire(self) -> None:
+        await super().acquire()
+        self.sent.append(self._clock())
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        self.throttled.append((self._clock(), retry_after))
+        super().on_throttle(retry_after)
+
+
+async def crawl(throttle: str) -> tuple[MockWiki, RecordingLimiter, float]:
+    limiter = RecordingLimiter(rate=20.0)
+    async with MockWiki(100, throttle_rate=2.0, throttle=throttle, retry_after=1) as wiki:
+        async with WikiClient(wiki.endpoint, rate_limiter=limiter, max_retries=10) as client:
+            await asyncio.gather(*(client.api(action="query", titles=f"Page {i}")
+                                   for i in range(6)))
+            lowered = limiter.rate
+            wiki.throttle_rate = None
+            for i in range(6, 26):
+                await client.api(action="query", titles=f"Page {i}")
+    return wiki, limiter, lowered
+
+
+@pytest.mark.parametrize("throttle", ["maxlag", "429", "503"])
+def test_limiter_backs_off_and_recovers(throttle):
+    wiki, limiter, lowered = asyncio.run(crawl(throttle))
+    assert wiki.throttled > 0
+    assert len(limiter.throttled) == wiki.throttled
+    assert all(retry_after == 1.0 for _, retry_after in limiter.throttled)
+    assert lowered < 20.0
+    # No request leaves before the Retry-After of every throttle seen so far.
+    for when, retry_after in limiter.throttled:
+        assert all(sent >= when + retry_after for sent in limiter.sent if sent > when)
+    assert limiter.throttles == wiki.throttled
+    assert limiter.rate > lowered
@@ -0,0 +1,106 @@
+import asyncio
+import gzip
+
+import pytest
+
+from benchmarks.mockwiki import MockWiki
+from wikiapi import WikiClient
+from wikiapi.errors import RedirectLoopError
+from wikiapi.redirects import RedirectMap, normalize_title
+
+# (rd_from, rd_namespace, rd_title, rd_interwiki, rd_fragment)
+REDIRECTS = (b"INSERT INTO `redirect` VALUES (1,0,'United_States','',''),"
+             b"(2,0,'USA','','History'),(3,14,'Mammals','',''),(4,0,'Main_Page','en',''),"
+             b"(5,0,'O\\'Brien','','');\n")
+TITLES = {1: "USA", 2: "US", 3: "Category:Mammalia", 4: "Elsewhere", 5: "OBrien"}
+
+
+def test_normalize_title():
+    assert normalize_title("united_states  of__America") == "United states of America"
+    assert normalize_title(" talk : foo_bar#History") == "Talk:Foo bar"
+    assert normalize_title("image:x.png") == "File:X.png"
+    assert normalize_title(":category:Dogs") == "Category:Dogs"
+    assert normalize_title("ßtraße") == "ßtraße"
+    assert normalize_title("notanamespace:word") == "Notanamespace:word"
+    assert normalize_title("iPhone", capitalize=False) == "iPhone"
+
+
+def test_chains_and_loops():
+    redirects = RedirectMap([("us", "USA"), ("USA", "United_States"), ("A", "B"),
+                             ("B", "C"), ("C", "A"), ("Same", "same")])
+    assert redirects.chain("us") == ["Us", "USA", "United States"]
+    assert redirects.resolve("us") == "United States" and redirects.resolve("Other") == "Other"
+    assert (redirects.hits, redirects.misses) == (1, 1)
+    assert "USA" in redirects and "usa" not in redirects
+    assert "Same" not in redirects and len(redirects) == 5
+    with pytest.raises(RedirectLoopError) as caught:
+        redirects.chain("b")
+    assert caught.value.titles == ["B", "C", "A", "B"]
+    assert redirects.resolve("B") == "B"
+    assert sorted(redirects.loops()) == ["A", "B", "C"]
+    # A redirect turned into an article ends the chain there.
+    redirects.discard("USA")
+    assert redirects.resolve("us") == "USA" and len(redirects) == 4
+
+
+def test_learn_from_a_query():
+    redirects = RedirectMap()
+    redirects.learn({
+        "normalized": [{"from": "wp:About", "to": "Wikipedia:About"},
+                       {"from": "foo:Bar", "to": "Foo Bar"}],
+        "redirects": [{"from": "Wikipedia:About", "to": "Help:About"},
+                      {"from": "Elsewhere", "to": "Main Page", "tointerwiki": "en"}],
+    })
+    # "foo:Bar" → "Foo Bar" is not a rule normalize_title knows; it is kept as an alias.
+    assert redirects.normalize("foo:Bar") == "Foo Bar"
+    assert redirects.resolve("wp:About") == "Help:About"
+    assert "Elsewhere" not in redirects
+
+
+def test_dump_save_and_open(tmp_path):
+    sql = tmp_path / "redirect.sql.gz"
+    with gzip.open(sql, "wb") as fh:
+        fh.write(REDIRECTS)
+    redirects = RedirectMap.from_redirect_dump(sql, TITLES)
+    assert dict(redirects.items()) == {"USA": "United States", "US": "USA",
+                                       "Category:Mammalia": "Category:Mammals",
+                                       "OBrien": "O'Brien"}
+    redirects.save(tmp_path / "redirects.bin")
+    with RedirectMap.open(tmp_path / "redirects.bin") as opened:
+        # Saved chains are flattened.
+        assert dict(opened.items())["US"] == "United States"
+        assert opened.resolve("US") == "United States"
+        # New entries and discards go on top of the mapped table.
+        opened.add("America", "US")
+        opened.discard("USA")
+        assert opened.resolve("America") == "United States"
+        assert opened.resolve("USA") == "USA" and len(opened) == 4
+
+
+def test_preload_and_resolve_against_the_mock_wiki():
+    titles = [f"Redirect {i}" for i in range(120)] + ["Page 5", "page_7", "Redirect 3"]
+
+    async def run():
+        async with MockWiki(200) as wiki:
+            redirects = RedirectMap([("Alias 3", "Redirect 3"), ("Old alias", "Alias 3")])
+            async with WikiClient(wiki.endpoint, batch_size=50, redirects=redirects) as client:
+                found = await client.preload_redirects(titles)
+                preloaded = wiki.requests
+                # Known redirects are fetched as their targets, duplicates once.
+                articles = await client.fetch_articles(["Old alias", "Redirect 3", "Page 3",
+                                                        "redirect_4"])
+                learned = RedirectMap()
+                async with WikiClient(wiki.endpoint, redirects=learned) as fresh:
+                    await fresh.fetch_article("Redirect 11")
+            return found, preloaded, wiki.requests, articles, redirects, learned
+
+    found, preloaded, requests, articles, redirects, learned = asyncio.run(run())
+    assert found == 120 and preloaded == 3  # 122 unique titles, 50 per request
+    assert [a.title for a in articles] == ["Page 3", "Page 3", "Page 3", "Page 4"]
+    assert articles[0] == articles[2]
+    assert requests == preloaded + 2
+    assert redirects.chain("Old alias") == ["Old alias", "Alias 3", "Redirect 3", "Page 3"]
+    assert redirects.resolve("redirect_119") == "Page 119"
+    assert len(redirects) == 122
+    # Every response teaches the map.
+    assert learned.resolve("Redirect 11") == "Page 11"
@@ -0,0 +1,55 @@
+import random
+import threading
+import time
+
+import pytest
+
+from wikiapi.segments import SegmentedIndex
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_full_merge_races_background_merges(tmp_path, seed):
+    index = SegmentedIndex(tmp_path, flush_docs=5, merge_factor=2)
+    live: dict[str, str] = {}
+    rng = random.Random(seed)
+    done = threading.Event()
+    errors = []
+
+    def writer():
+        try:
+            write()
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            done.set()
+
+    def write():
+        for i in range(400):
+            title = f"Page {rng.randrange(120)}"
+            if rng.random() < 0.2:
+                index.delete(title)
+                live.pop(title, None)
+            else:
+                text = f"common word{i} {title.replace(' ', '')}"
+                index.add(title, text)
+                live[title] = text
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        index.merge(full=True)
+        time.sleep(0.001)  # let the writer take the lock between merges
+    thread.join()
+    assert not errors
+    index.merge(full=True)
+    try:
+        hits = index.search("common", k=1000)
+        titles = [hit.title for hit in hits]
+        assert len(titles) == len(set(titles))
+        assert sorted(titles) == sorted(live)
+        assert len(index) == len(live)
+        for title in live:
+            found = index.search(title.replace(" ", ""), k=10)
+            assert [hit.title for hit in found] == [title]
+    finally:
+        index.close()
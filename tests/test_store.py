@@ -0,0 +1,108 @@
+import pytest
+
+from wikiapi import store
+from wikiapi.article import Article
+from wikiapi.store import ArticleStore
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(store, "np", None)
+    elif store.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+@pytest.fixture(params=["zstd", "zlib"])
+def codec(request):
+    if request.param == "zstd" and store.zstd is None:
+        pytest.skip("zstandard is not installed")
+    return request.param
+
+
+def page(i: int, version: int = 1) -> Article:
+    text = (f"{{{{Infobox settlement|name=Page {i}|population={i * 37}}}}}\n"
+            f"'''Page {i}''' is a page of the test wiki, revision {version}.\n"
+            "== History ==\nIt was founded long ago. [[Category:Pages]]\n" * (1 + i % 3))
+    return Article(title=f"Page {i}", pageid=i + 1, revid=1000 * version + i, text=text,
+                   links=[f"Page {i + 1}", f"Page {i * 2}"],
+                   redirect="Page 0" if i % 10 == 9 else None)
+
+
+def test_round_trip(backend, codec, tmp_path):
+    pages = [page(i) for i in range(200)]
+    with ArticleStore(tmp_path, codec=codec, block_size=4096, train_bytes=8000) as s:
+        for article in pages[:100]:
+            s.add(article)
+        # Trained on the first records; the rest go straight into blocks.
+        assert s.dictionary and s.codec == codec
+        s.add_articles(pages[100:] + [Article("Missing", missing=True)])
+        assert len(s) == 200 and s.nbytes > 0
+        assert s.get(51) == pages[50] and s.get(200) == pages[199]  # sealed and open block
+        assert s.get(999) is None and 999 not in s and 1 in s
+        with pytest.raises(ValueError):
+            s.add(Article("No ID"))
+    with ArticleStore(tmp_path, cache_blocks=1) as s:
+        assert s.codec == codec and len(s) == 200 and s.dead == 0
+        # Each block is decompressed once for all the pages it holds.
+        assert s.get_many(range(200, 0, -1)) == pages[::-1]
+        assert 1 < s.misses == len(s._offsets) - 1
+        assert [s.get(i + 1) for i in range(200)] == pages
+        assert s.get_many([5, 999, 1, 150]) == [pages[4], None, pages[0], pages[149]]
+        assert list(s) == pages
+    with pytest.raises(ValueError):
+        ArticleStore(tmp_path, codec="zlib" if codec == "zstd" else "zstd")
+
+
+def test_pages_before_training(backend, codec, tmp_path):
+    with ArticleStore(tmp_path, codec=codec) as s:
+        s.add(page(1))
+        s.add(page(1, version=2))  # still waiting for the dictionary: replaced in place
+        assert s.get(2) == page(1, version=2) and len(s) == 1 and s.dead == 0
+        assert list(s) == [page(1, version=2)]
+    with ArticleStore(tmp_path) as s:
+        assert s.get(2) == page(1, version=2) and len(s) == 1 and s.dead == 0
+
+
+def test_replace_before_and_after_flush(backend, codec, tmp_path):
+    with ArticleStore(tmp_path, codec=codec, dictionary=b"", block_size=256) as s:
+        for i in range(10):
+            s.add(page(i))
+        s.add(page(3, version=2))
+        assert s.get(4) == page(3, version=2) and len(s) == 10 and s.dead == 1
+        s.flush()
+        assert s.get(4) == page(3, version=2) and s.dead == 1
+        s.add(page(3, version=3))
+        s.add(page(7, version=2))
+        assert s.get(4) == page(3, version=3) and s.get(8) == page(7, version=2)
+        assert len(s) == 10 and s.dead == 3
+        expected = [page(i) for i in range(10) if i not in (3, 7)] + [page(3, version=3),
+                                                                     page(7, version=2)]
+        assert list(s) == expected
+    with ArticleStore(tmp_path) as s:
+        assert len(s) == 10 and s.dead == 3
+        assert s.get(4) == page(3, version=3) and s.get(8) == page(7, version=2)
+        assert list(s) == expected
+
+
+def test_crash_drops_blocks_after_flush(backend, codec, tmp_path):
+    s = ArticleStore(tmp_path, codec=codec, dictionary=b"", block_size=256)
+    for i in range(20):
+        s.add(page(i))
+    s.flush()
+    flushed = s.nbytes
+    for i in range(20, 50):
+        s.add(page(i))
+    s.add(page(5, version=2))
+    # Blocks were sealed and written, but the index was not: a crash.
+    s._data.close()
+    assert (tmp_path / "articles.dat").stat().st_size > flushed
+
+    with ArticleStore(tmp_path) as s:
+        assert (tmp_path / "articles.dat").stat().st_size == s.nbytes == flushed
+        assert len(s) == 20 and s.dead == 0
+        assert s.get(6) == page(5) and s.get(21) is None and s.get(50) is None
+        s.add(page(20))
+    with ArticleStore(tmp_path) as s:
+        assert list(s) == [page(i) for i in range(21)]
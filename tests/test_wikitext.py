@@ -0,0 +1,13 @@
+from wikiapi.wikitext import Section, to_plaintext
+
+
+def test_lines_starting_with_equals_are_text():
+    result = to_plaintext("Intro.\n=x+1 is an equation\nMore.\n== History ==<!-- c -->\nBody.")
+    assert result.text == "Intro.\n=x+1 is an equation\nMore.\n\nHistory\nBody."
+    assert [(s.title, s.level) for s in result.sections] == [("", 0), ("History", 2)]
+    assert isinstance(result.sections[1], Section)
+
+
+def test_only_language_prefixes_are_interlanguage_links():
+    text = to_plaintext("See [[Sex: The Annabel Chong Story]].[[de:Berlin]][[zh-yue:Berlin]]").text
+    assert text == "See Sex: The Annabel Chong Story."
@@ -0,0 +1,84 @@
+"""Search and crawl articles from Wikipedia."""
+
+from .article import Article
+from .backlinks import BacklinkIndex
+from .cache import ResponseCache
+from .categories import CategoryMember, CategoryWalker
+from .centrality import PageRank, pagerank
+from .client import DEFAULT_ENDPOINT, WikiClient
+from .complete import TitleCompleter
+from .crawler import Crawler, crawl
+from .diskindex import DiskIndex, write_index
+from .dump import DumpReader, MultistreamIndex
+from .errors import APIError, HTTPError, RedirectLoopError, WikiAPIError
+from .frontier import Frontier
+from .fuzzy import FuzzyTitleIndex
+from .graph import LinkGraph
+from .http import HTTPClient
+from .index import InvertedIndex, SearchHit, tokenize
+from .parsed import ArticleSection, ParsedArticle
+from .paths import PathFinder
+from .ratelimit import RateLimiter, RateLimiters
+from .redirects import RedirectMap, normalize_title
+from .segments import SegmentedIndex
+from .store import ArticleStore
+from .streaming import iter_list, iter_search
+from .templates import (Template, TemplateParser, extract_infobox, extract_templates,
+                        iter_infoboxes, iter_templates)
+from .visited import PageIdBitmap, ScalableBloomFilter, VisitedSet
+from .wikitext import PlainText, Section, to_plaintext
+
+__all__ = [
+    "APIError",
+    "Article",
+    "ArticleSection",
+    "ArticleStore",
+    "BacklinkIndex",
+    "CategoryMember",
+    "CategoryWalker",
+    "Crawler",
+    "DEFAULT_ENDPOINT",
+    "DiskIndex",
+    "DumpReader",
+    "Frontier",
+    "FuzzyTitleIndex",
+    "HTTPClient",
+    "HTTPError",
+    "InvertedIndex",
+    "LinkGraph",
+    "MultistreamIndex",
+    "PageIdBitmap",
+    "PageRank",
+    "ParsedArticle",
+    "PathFinder",
+    "PlainText",
+    "RateLimiter",
+    "RateLimiters",
+    "RedirectLoopError",
+    "RedirectMap",
+    "ResponseCache",
+    "ScalableBloomFilter",
+    "SearchHit",
+    "Section",
+    "SegmentedIndex",
+    "Template",
+    "TemplateParser",
+    "TitleCompleter",
+    "VisitedSet",
+    "WikiAPIError",
+    "WikiClient",
+    "crawl",
+    "extract_infobox",
+    "extract_templates",
+    "iter_infoboxes",
+    "iter_list",
+    "iter_search",
+    "iter_templates",
+    "normalize_title",
+    "pagerank",
+    "to_plaintext",
+    "tokenize",
+    "write_index",
+]
+
+__version__ = "0.1.0"
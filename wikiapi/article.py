@@ -0,0 +1,43 @@
+"""Article objects returned by the fetch and crawl paths."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(slots=True)
+class Article:
+    """A single wiki page together with its latest wikitext."""
+
+    title: str
+    pageid: int | None = None
+    ns: int = 0
+    revid: int | None = None
+    text: str = ""
+    links: list[str] = field(default_factory=list)
+    missing: bool = False
+    #: Target title when the page is a redirect (dump pages only; the live
+    #: fetch path resolves redirects instead).
+    redirect: str | None = None
+
+    @classmethod
+    def from_page(cls, page: dict[str, Any]) -> Article:
+        """Build an article from a ``formatversion=2`` ``query.pages`` entry."""
+        text = ""
+        revid = page.get("lastrevid")
+        revisions = page.get("revisions")
+        if revisions:
+            rev = revisions[0]
+            revid = rev.get("revid", revid)
+            slot = rev.get("slots", {}).get("main", rev)
+            text = slot.get("content", "")
+        return cls(
+            title=page["title"],
+            pageid=page.get("pageid"),
+            ns=page.get("ns", 0),
+            revid=revid,
+            text=text,
+            links=[link["title"] for link in page.get("links", ())],
+            missing=bool(page.get("missing") or page.get("invalid")),
+        )
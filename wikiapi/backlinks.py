@@ -0,0 +1,415 @@
+"""What links here, answered locally from the link graph.
+
+``list=backlinks`` pages through at most 500 linking titles per request,
+so listing the pages that link to a popular article takes hundreds of
+requests.  :class:`BacklinkIndex` keeps the transpose of a
+:class:`~wikiapi.graph.LinkGraph` instead: row ``i`` of the reverse CSR
+lists the nodes linking to node ``i``, so the backlinks of an article are
+one slice of a mapped array and its in-degree is one subtraction.
+
+For a saved graph the transpose is built out of core, as a distribution
+sort.  A first pass over the forward links counts the in-degrees, which
+give the reverse row pointers.  They also split the targets into ranges
+of about ``block_links`` links each.  A second pass scatters packed
+``(target, source)`` pairs into one temporary file per range.  Each file
+is then sorted in memory and appended to the reverse indices.  Memory
+stays at one block of pairs plus the node-sized pointers, however many
+links the graph has.  The result is stored next to the graph::
+
+    backlinks_indptr.npy   uint64[n+1] into backlinks_indices
+    backlinks_indices.npy  uint32[m] linking nodes, row by row, sorted
+
+Recrawled pages are applied with :meth:`BacklinkIndex.update`.  It
+replaces a page's outgoing links and records the difference per target
+in small in-memory overlays, so queries see the change at once.
+:meth:`BacklinkIndex.compact` folds the overlays into new forward and
+reverse arrays, numbering any new titles in.
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import os
+import tempfile
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+
+from .article import Article
+from .graph import (LinkGraph, _namespace, _npy_header, _read_npy, _row_blocks, _write,
+                    _write_npy)
+from .index import np
+from .parsed import _links
+from .redirects import RedirectMap, normalize_title
+
+__all__ = ["BacklinkIndex"]
+
+_INDPTR = "backlinks_indptr.npy"
+_INDICES = "backlinks_indices.npy"
+_LOW = 0xFFFFFFFF
+
+
+def _transpose_to(graph: LinkGraph, directory: Path, block_links: int,
+                  tmp_dir: str | os.PathLike | None) -> None:
+    """Write the reverse CSR of ``graph`` into ``directory`` by an external sort."""
+    n = len(graph)
+    indptr = np.asarray(graph.indptr)
+    indices = graph.indices
+    blocks = _row_blocks(indptr, block_links)
+    counts = np.zeros(n, dtype=np.int64)
+    for lo, hi in zip(blocks, blocks[1:]):
+        targets = np.asarray(indices[int(indptr[lo]):int(indptr[hi])])
+        counts += np.bincount(targets, minlength=n)
+    rindptr = np.zeros(n + 1, dtype=np.uint64)
+    np.cumsum(counts, out=rindptr[1:])
+    del counts
+    # Target ranges holding about block_links links each, one run file apiece.
+    ranges = _row_blocks(rindptr, block_links)
+    cuts = np.asarray(ranges, dtype=np.uint64) << np.uint64(32)
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        runs = [open(Path(tmp) / f"run-{i}", "w+b") for i in range(len(ranges) - 1)]
+        try:
+            for lo, hi in zip(blocks, blocks[1:]):
+                start, stop = int(indptr[lo]), int(indptr[hi])
+                if start == stop:
+                    continue
+                # (target << 32 | source), sorted, then cut at the range boundaries.
+                pairs = np.asarray(indices[start:stop]).astype(np.uint64) << np.uint64(32)
+                pairs |= np.repeat(np.arange(lo, hi, dtype=np.uint64),
+                                   np.diff(indptr[lo:hi + 1]).astype(np.int64))
+                pairs.sort()
+                edges = np.searchsorted(pairs, cuts).tolist()
+                for i, run in enumerate(runs):
+                    if edges[i] < edges[i + 1]:
+                        run.write(pairs[edges[i]:edges[i + 1]].tobytes())
+                del pairs
+
+            def sorted_runs():
+                for run in runs:
+                    run.seek(0)
+                    pairs = np.fromfile(run, dtype=np.uint64)
+                    pairs.sort()
+                    yield (pairs & np.uint64(_LOW)).astype("<u4")
+
+            _write(directory / _INDICES, itertools.chain(
+                [_npy_header("<u4", int(rindptr[-1]))], sorted_runs()))
+        finally:
+            for run in runs:
+                run.close()
+    _write_npy(directory / _INDPTR, rindptr, "<u8", n + 1)
+
+
+class BacklinkIndex:
+    """Pages linking to each page: the reverse of a link graph, plus recent updates.
+
+    ``graph`` is the forward :class:`~wikiapi.graph.LinkGraph` and
+    ``reverse`` its transpose over the same titles.  Build one with
+    :meth:`build`, or map a saved one with :meth:`open`.
+    """
+
+    def __init__(self, graph: LinkGraph, reverse: LinkGraph, *,
+                 directory: str | os.PathLike | None = None):
+        self.graph = graph
+        self.reverse = reverse
+        self.directory = None if directory is None else Path(directory)
+        # Titles not in the graph yet, numbered from len(graph) on.
+        self._extra: dict[str, int] = {}
+        self._extra_titles: list[str] = []
+        # Current links of updated pages, and per target the linking nodes
+        # gained and lost relative to the arrays.
+        self._out: dict[int, list[int]] = {}
+        self._added: dict[int, set[int]] = {}
+        self._removed: dict[int, set[int]] = {}
+
+    @classmethod
+    def build(cls, source: LinkGraph | str | os.PathLike, *, block_links: int = 1 << 23,
+              tmp_dir: str | os.PathLike | None = None) -> BacklinkIndex:
+        """Transpose a graph: in memory, or out of core for a saved one.
+
+        ``source`` is a graph, transposed in memory with
+        :meth:`LinkGraph.transpose`, or the directory of a saved graph.
+        For a directory, the reverse arrays are sorted in blocks of
+        ``block_links`` links through run files in ``tmp_dir`` and written
+        next to the graph.  The index is then mapped from that directory.
+        """
+        if isinstance(source, LinkGraph):
+            return cls(source, source.transpose())
+        directory = Path(source)
+        with LinkGraph.open(directory) as graph:
+            if np is not None:
+                _transpose_to(graph, directory, block_links, tmp_dir)
+            else:
+                reverse = graph.transpose()
+                _write_npy(directory / _INDPTR, reverse.indptr, "<u8", len(graph) + 1)
+                _write_npy(directory / _INDICES, reverse.indices, "<u4", graph.num_edges)
+        return cls.open(directory)
+
+    @classmethod
+    def open(cls, directory: str | os.PathLike) -> BacklinkIndex:
+        """Map a graph and its backlinks written by :meth:`build` or :meth:`save`."""
+        directory = Path(directory)
+        graph = LinkGraph.open(directory)
+        maps: list = []
+        reverse = LinkGraph(graph._titles, _read_npy(directory / _INDPTR, maps),
+                            _read_npy(directory / _INDICES, maps), _maps=maps)
+        return cls(graph, reverse, directory=directory)
+
+    def save(self, directory: str | os.PathLike) -> None:
+        """Compact and write the graph and its backlinks into ``directory``."""
+        self.compact()
+        directory = Path(directory)
+        self.graph.save(directory)
+        _write_npy(directory / _INDPTR, self.reverse.indptr, "<u8", len(self.graph) + 1)
+        _write_npy(directory / _INDICES, self.reverse.indices, "<u4", self.reverse.num_edges)
+
+    def close(self) -> None:
+        self.reverse.close()
+        self.graph.close()
+
+    def __enter__(self) -> BacklinkIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- queries -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.graph) + len(self._extra_titles)
+
+    def id(self, title: str) -> int | None:
+        """Node number of ``title`` (normalized first), or ``None``."""
+        node = self.graph.id(title)
+        if node is None and self._extra:
+            node = self._extra.get(normalize_title(title))
+        return node
+
+    def __contains__(self, title: str) -> bool:
+        return self.id(title) is not None
+
+    def title(self, node: int) -> str:
+        n = len(self.graph)
+        return self.graph.title(node) if node < n else self._extra_titles[node - n]
+
+    def sources(self, node: int):
+        """Node numbers of the pages linking to ``node``, sorted.
+
+        An array view of the reverse CSR, or a list for a node whose
+        backlinks changed since the last :meth:`compact`.
+        """
+        row = self.reverse.successors(node) if node < len(self.graph) else []
+        added = self._added.get(node)
+        removed = self._removed.get(node)
+        if not added and not removed:
+            return row
+        linking = set(row.tolist() if not isinstance(row, list) else row)
+        return sorted(linking.difference(removed or ()).union(added or ()))
+
+    def in_degree(self, node: int) -> int:
+        """Number of pages linking to ``node``."""
+        count = self.reverse.out_degree(node) if node < len(self.graph) else 0
+        added = self._added.get(node)
+        removed = self._removed.get(node)
+        return count + (len(added) if added else 0) - (len(removed) if removed else 0)
+
+    def in_degrees(self):
+        """Links into each node: an array of ``len(self)`` counts."""
+        degrees = self.reverse.out_degrees()
+        if np is not None:
+            degrees = np.concatenate((degrees.astype(np.int64),
+                                      np.zeros(len(self._extra_titles), dtype=np.int64)))
+        else:
+            degrees = array("q", degrees)
+            degrees.extend(itertools.repeat(0, len(self._extra_titles)))
+        for node, added in self._added.items():
+            degrees[node] += len(added)
+        for node, removed in self._removed.items():
+            degrees[node] -= len(removed)
+        return degrees
+
+    def backlinks(self, title: str) -> list[str]:
+        """Titles of the pages linking to ``title`` (empty if it is unknown)."""
+        node = self.id(title)
+        if node is None:
+            return []
+        return [self.title(int(v)) for v in self.sources(node)]
+
+    def count(self, title: str) -> int:
+        """Number of pages linking to ``title`` (0 if it is unknown)."""
+        node = self.id(title)
+        return 0 if node is None else self.in_degree(node)
+
+    # -- updates -----------------------------------------------------------
+
+    @property
+    def pending(self) -> int:
+        """Pages updated since the last :meth:`compact`."""
+        return len(self._out)
+
+    def _node(self, title: str) -> int:
+        node = self.id(title)
+        if node is None:
+            title = normalize_title(title)
+            node = self._extra[title] = len(self)
+            self._extra_titles.append(title)
+        return node
+
+    def _successors(self, node: int) -> list[int]:
+        links = self._out.get(node)
+        if links is not None:
+            return links
+        return self.graph.successors(node).tolist() if node < len(self.graph) else []
+
+    def update(self, title: str, links: Iterable[str]) -> None:
+        """Make ``links`` the outgoing links of ``title``, e.g. after a recrawl.
+
+        Titles new to the graph become nodes.  An empty ``links`` removes
+        the page's links (a deleted page).
+        """
+        source = self._node(title)
+        new = {self._node(link) for link in links}
+        new.discard(source)
+        old = set(self._successors(source))
+        for target in old - new:
+            added = self._added.get(target)
+            if added is not None and source in added:
+                added.discard(source)
+            else:
+                self._removed.setdefault(target, set()).add(source)
+        for target in new - old:
+            removed = self._removed.get(target)
+            if removed is not None and source in removed:
+                removed.discard(source)
+            else:
+                self._added.setdefault(target, set()).add(source)
+        self._out[source] = sorted(new)
+
+    def update_articles(self, articles: Iterable[Article], *, namespace: int = 0,
+                        redirects: RedirectMap | None = None) -> int:
+        """Apply recrawled articles; filtering as :meth:`LinkGraph.from_articles`.
+
+        Returns the number of pages updated.
+        """
+        count = 0
+        for article in articles:
+            if article.missing or article.redirect or article.ns != namespace:
+                continue
+            title = normalize_title(article.title)
+            links = article.links or _links(article.text)
+            if redirects is not None:
+                title = redirects.resolve(title)
+                links = [redirects.resolve(link) for link in links]
+            self.update(title, [link for link in links if _namespace(link) == namespace])
+            count += 1
+        return count
+
+    def compact(self) -> None:
+        """Fold the updates into new forward and reverse arrays.
+
+        An index opened from a directory is rewritten there (the reverse
+        arrays by the external sort of :meth:`build`) and mapped again.
+        """
+        if not self._out:
+            return
+        graph = self._merged()
+        self._extra, self._extra_titles = {}, []
+        self._out, self._added, self._removed = {}, {}, {}
+        if self.directory is None:
+            self.graph, self.reverse = graph, graph.transpose()
+            return
+        directory = self.directory
+        graph.save(directory)
+        self.close()
+        fresh = BacklinkIndex.build(directory)
+        self.graph, self.reverse = fresh.graph, fresh.reverse
+
+    def _merged(self) -> LinkGraph:
+        """The forward graph with updated rows and new titles numbered in."""
+        graph = self.graph
+        n, k = len(graph), len(self._extra_titles)
+        old_titles = graph._titles
+        # Rank of each new title among them, and how many old titles sort before it.
+        extra = sorted((title.encode("utf-8"), n + i)
+                       for i, title in enumerate(self._extra_titles))
+        before = [bisect.bisect_left(old_titles, key) for key, _ in extra]
+        renumber: dict[int, int] = {node: at + rank
+                                    for rank, ((_, node), at) in enumerate(zip(extra, before))}
+        if k:
+            titles: list[bytes] = []
+            merged = iter(extra)
+            pending = next(merged, None)
+            for title in old_titles:
+                while pending is not None and pending[0] < title:
+                    titles.append(pending[0])
+                    pending = next(merged, None)
+                titles.append(bytes(title))
+            if pending is not None:
+                titles.append(pending[0])
+            titles.extend(key for key, _ in merged)
+        else:
+            titles = old_titles
+        total = n + k
+        if np is not None:
+            return LinkGraph(titles, *self._merge_np(before, renumber, total))
+        return LinkGraph(titles, *self._merge_py(before, renumber, total))
+
+    def _merge_np(self, before: list[int], renumber: dict[int, int], total: int):
+        graph = self.graph
+        n = len(graph)
+        indptr = np.asarray(graph.indptr)
+        indices = graph.indices
+        # Old node i moves up by the number of new titles sorting before it.
+        remap = np.arange(n, dtype=np.int64)
+        if before:
+            remap += np.searchsorted(np.asarray(before), remap, side="right")
+        changed = np.zeros(n, dtype=bool)
+        changed[[s for s in self._out if s < n]] = True
+        degrees = np.zeros(total, dtype=np.int64)
+        degrees[remap] = np.diff(indptr).astype(np.int64)
+
+        def new_id(v: int) -> int:
+            return renumber[v] if v >= n else int(remap[v])
+
+        rows = {new_id(s): sorted(new_id(t) for t in links) for s, links in self._out.items()}
+        for node, row in rows.items():
+            degrees[node] = len(row)
+        new_indptr = np.zeros(total + 1, dtype=np.uint64)
+        np.cumsum(degrees, out=new_indptr[1:])
+        new_indices = np.empty(int(new_indptr[-1]), dtype=np.uint32)
+        blocks = _row_blocks(indptr, 1 << 22)
+        for lo, hi in zip(blocks, blocks[1:]):
+            start, stop = int(indptr[lo]), int(indptr[hi])
+            if start == stop:
+                continue
+            owner = np.repeat(np.arange(lo, hi), np.diff(indptr[lo:hi + 1]).astype(np.int64))
+            keep = ~changed[owner]
+            owner = owner[keep]
+            offset = np.arange(start, stop)[keep] - indptr[owner].astype(np.int64)
+            dest = new_indptr[remap[owner]].astype(np.int64) + offset
+            # Renumbering keeps the order, so rows stay sorted.
+            new_indices[dest] = remap[np.asarray(indices[start:stop])[keep]]
+        for node, row in rows.items():
+            new_indices[int(new_indptr[node]):int(new_indptr[node + 1])] = row
+        return new_indptr, new_indices
+
+    def _merge_py(self, before: list[int], renumber: dict[int, int], total: int):
+        n = len(self.graph)
+
+        def new_id(v: int) -> int:
+            return renumber[v] if v >= n else v + bisect.bisect_right(before, v)
+
+        rows: list[list[int]] = [[] for _ in range(total)]
+        for node in range(n):
+            links = self._out.get(node)
+            rows[new_id(node)] = ([new_id(v) for v in self.graph.successors(node)]
+                                  if links is None else sorted(map(new_id, links)))
+        for node, links in self._out.items():
+            if node >= n:
+                rows[new_id(node)] = sorted(map(new_id, links))
+        new_indptr = array("Q", [0])
+        new_indices = array("I")
+        for row in rows:
+            new_indices.extend(row)
+            new_indptr.append(len(new_indices))
+        return new_indptr, new_indices
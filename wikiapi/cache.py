@@ -0,0 +1,206 @@
+"""Persistent on-disk cache of API responses.
+
+Repeated crawls and searches ask for the same, mostly unchanged pages.
+:class:`ResponseCache` keeps the raw JSON body of each response in its own
+file, named by a hash of the endpoint and the request parameters sorted by
+name (and the titles or IDs of a multi-page query sorted too), so the
+same request always finds the same entry however it was ordered.
+``maxlag`` is left out of the key, since it does not change the answer.
+
+Entries older than ``ttl`` seconds are stale: :meth:`ResponseCache.get`
+no longer returns them, but they stay on disk for revalidation.
+:class:`~wikiapi.client.WikiClient` checks a stale batch of pages with one
+cheap ``prop=info`` query and reuses the cached content when every
+``lastrevid`` still matches, instead of downloading all of it again.
+Revisions never change, so fetches by revision ID are reused no matter
+their age.
+
+The files take at most ``max_bytes`` on disk; past that the least
+recently used ones are deleted.  Recency is the file's modification time,
+updated on every hit, so it survives restarts.  Each file is::
+
+    header      magic, time stored (float64)
+    body        zlib-compressed response body
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+__all__ = ["ResponseCache"]
+
+MAGIC = b"WIKIRC01"
+_HEADER = struct.Struct("<8sd")
+#: Parameters that do not change the response.
+_UNKEYED = frozenset({"maxlag"})
+#: Multi-value parameters naming a set of pages, whose order does not matter.
+_PAGE_SETS = frozenset({"titles", "pageids", "revids"})
+
+
+class ResponseCache:
+    """Response bodies on disk, bounded by age (``ttl``) and size (``max_bytes``)."""
+
+    def __init__(self, directory: str | os.PathLike, *, ttl: float = 86400.0,
+                 max_bytes: int = 1 << 30):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.revalidations = 0
+        self.expirations = 0
+        self.evictions = 0
+        #: Entry name → file size, least recently used first.
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self.nbytes = 0
+        found = []
+        for path in self.directory.glob("??/*"):
+            if path.name.endswith(".tmp"):
+                path.unlink(missing_ok=True)
+                continue
+            st = path.stat()
+            found.append((st.st_mtime, path.name, st.st_size))
+        for _, name, size in sorted(found):
+            self._sizes[name] = size
+            self.nbytes += size
+        self._evict()
+
+    @staticmethod
+    def key(endpoint: str, params: dict[str, Any]) -> str:
+        """The entry name for a request: a hash of its normalized form."""
+        items = sorted((k, "|".join(sorted(str(v).split("|"))) if k in _PAGE_SETS else str(v))
+                       for k, v in params.items() if k not in _UNKEYED)
+        return hashlib.sha256(f"{endpoint}?{urlencode(items)}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _read(self, key: str) -> tuple[float, bytes] | None:
+        try:
+            raw = self._path(key).read_bytes()
+            magic, stored = _HEADER.unpack_from(raw, 0)
+            if magic != MAGIC:
+                raise ValueError("not a cache entry")
+            return stored, zlib.decompress(raw[_HEADER.size:])
+        except (OSError, ValueError, struct.error, zlib.error):
+            self._remove(key)
+            return None
+
+    def _remove(self, key: str) -> None:
+        size = self._sizes.pop(key, None)
+        if size is not None:
+            self.nbytes -= size
+        self._path(key).unlink(missing_ok=True)
+
+    def _touch(self, key: str) -> None:
+        self._sizes.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str, *, revalidated: bool = False) -> bytes | None:
+        """The cached body for ``key`` if it is fresh, else ``None``.
+
+        With ``revalidated=True`` the caller has checked that the content is
+        still current, so a stale entry is returned too and made fresh again.
+        A stale entry that was not revalidated is deleted.
+        """
+        if key not in self._sizes:
+            self.misses += 1
+            return None
+        entry = self._read(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored, body = entry
+        if time.time() - stored > self.ttl:
+            if not revalidated:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.revalidations += 1
+            self.put(key, body, count=False)
+        else:
+            self._touch(key)
+        self.hits += 1
+        return body
+
+    def stale(self, key: str) -> bytes | None:
+        """The body for ``key`` if it is cached but past its ``ttl``.
+
+        Nothing is counted or reordered; this is for revalidation.
+        """
+        if key not in self._sizes:
+            return None
+        entry = self._read(key)
+        if entry is None or time.time() - entry[0] <= self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, key: str, body: bytes, *, count: bool = True) -> None:
+        """Store ``body`` under ``key``, evicting old entries past ``max_bytes``."""
+        data = _HEADER.pack(MAGIC, time.time()) + zlib.compress(body)
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self.nbytes += len(data) - self._sizes.pop(key, 0)
+        self._sizes[key] = len(data)
+        if count:
+            self.stores += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.nbytes > self.max_bytes:
+            key = next(iter(self._sizes))
+            self._remove(key)
+            self.evictions += 1
+
+    def purge(self) -> int:
+        """Delete every stale entry now; returns how many were deleted."""
+        limit = time.time() - self.ttl
+        removed = 0
+        for key in list(self._sizes):
+            entry = self._read(key)
+            if entry is not None and entry[0] < limit:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+        return removed
+
+    def clear(self) -> None:
+        for key in list(self._sizes):
+            self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "revalidations": self.revalidations,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "entries": len(self._sizes),
+            "bytes": self.nbytes,
+        }
@@ -0,0 +1,331 @@
+"""Walking category trees: every page under ``Category:X``, live or offline.
+
+The category graph is not a tree: subcategories have several parents and
+cycles are common ("Category:Mathematics" → ... → "Category:Mathematics").
+:class:`CategoryWalker` visits each category once and hands out each page
+once, with its depth (0 for direct members of the start category, 1 for
+members of its subcategories, ...), the category it was found in and its
+namespace.  ``max_depth`` limits how far subcategories are followed and
+``namespaces`` which members are yielded; subcategories are always walked.
+
+Live, :meth:`CategoryWalker.walk` lists each category with
+``list=categorymembers`` at the API's maximum batch size, following
+continuation, and restricted server-side to the wanted namespaces plus
+categories.  ``concurrency`` workers expand categories at the same time,
+shallowest first, and pages are streamed out as their batch arrives.
+When ``max_depth`` cuts the walk, a category first reached on a long path
+and later on a shorter one is expanded again, so the limit counts
+shortest paths as an offline walk does.
+
+Offline, the walker answers from a :class:`~wikiapi.graph.LinkGraph` whose
+links run from each category to its members, built from the
+``categorylinks.sql.gz`` table dump (:meth:`CategoryWalker.from_dump`) and
+saved and mapped like any link graph.  No network is used at all.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import re
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+
+from .client import WikiClient
+from .dump import iter_index
+from .errors import WikiAPIError
+from .graph import LinkGraph, _Builder, _linktargets, _namespace, _qualify
+from .redirects import _open_dump, _unescape, normalize_title
+from .visited import PageIdBitmap
+
+__all__ = ["CategoryMember", "CategoryWalker", "iter_categorylinks_sql"]
+
+log = logging.getLogger(__name__)
+
+_CATEGORY = 14
+_PREFIX = b"Category:"
+_DONE = object()
+
+_COLUMN = re.compile(rb"^\s*`(\w+)`")
+_ROW = re.compile(rb"\(((?:'(?:[^'\\]|\\.)*'|[^'()])*)\)")
+_VALUE = re.compile(rb"'((?:[^'\\]|\\.)*)'|([^,']+)")
+
+
+def _category_title(name: str) -> str:
+    """``name`` normalized, with the ``Category:`` prefix added if it has none."""
+    title = normalize_title(name)
+    return title if _namespace(title) == _CATEGORY else normalize_title(f"Category:{title}")
+
+
+@dataclass(slots=True)
+class CategoryMember:
+    title: str
+    ns: int
+    pageid: int | None
+    category: str
+    depth: int
+
+
+def iter_categorylinks_sql(path: str | os.PathLike,
+                           linktargets: str | os.PathLike | None = None
+                           ) -> Iterator[tuple[int, str, str]]:
+    """Yield ``(cl_from, category title, cl_type)`` from a ``categorylinks.sql`` dump.
+
+    ``cl_type`` is ``"page"``, ``"subcat"`` or ``"file"``.  Columns are
+    located through the dump's ``CREATE TABLE`` statement, so both the
+    layout with the category name in ``cl_to`` and the newer one with a
+    ``cl_target_id`` into the ``linktarget`` table work; the latter needs
+    that table's dump as ``linktargets``.
+    """
+    columns: list[bytes] = []
+    in_create = False
+    targets: dict[int, str] | None = None
+    with _open_dump(path) as fh:
+        for line in fh:
+            if line.startswith(b"CREATE TABLE"):
+                in_create, columns = True, []
+                continue
+            if in_create:
+                if line.startswith(b")"):
+                    in_create = False
+                elif m := _COLUMN.match(line):
+                    columns.append(m[1])
+                continue
+            if not line.startswith(b"INSERT INTO"):
+                continue
+            if not columns:
+                raise ValueError(f"{path} has no CREATE TABLE statement for categorylinks")
+            source, kind = columns.index(b"cl_from"), columns.index(b"cl_type")
+            if b"cl_to" in columns:
+                name = columns.index(b"cl_to")
+            else:
+                name = columns.index(b"cl_target_id")
+                if targets is None:
+                    if linktargets is None:
+                        raise ValueError("this categorylinks dump refers to the linktarget "
+                                         "table; pass its dump as linktargets")
+                    targets = _linktargets(linktargets, _CATEGORY)
+            for row in _ROW.finditer(line, line.index(b"VALUES")):
+                values = [m[1] if m[1] is not None else m[2]
+                          for m in _VALUE.finditer(row[1])]
+                if targets is None:
+                    category = _qualify(_CATEGORY, values[name])
+                else:
+                    category = targets.get(int(values[name]))
+                    if category is None:
+                        continue
+                yield int(values[source]), category, _unescape(values[kind])
+
+
+class CategoryWalker:
+    """Breadth-first walker over category trees, with cycle detection.
+
+    Live, it reads through ``client`` (a new
+    :class:`~wikiapi.client.WikiClient` if none is given, closed by
+    :meth:`close`); with ``graph`` (see :meth:`from_dump`) it never touches
+    the network.  ``namespaces`` are the namespaces of the members to yield
+    (``None`` for all) and ``max_depth`` the number of subcategory levels to
+    descend (``None`` for no limit); both can be overridden per walk.
+    """
+
+    def __init__(self, client: WikiClient | None = None, *, graph: LinkGraph | None = None,
+                 namespaces: Iterable[int] | None = (0,), max_depth: int | None = None,
+                 concurrency: int = 8, batch: int | str = "max"):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.client = client
+        self.graph = graph
+        self.namespaces = None if namespaces is None else frozenset(namespaces)
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.batch = batch
+        self._own_client = False
+        #: Categories listed by the last walk (live or offline), and failed requests.
+        self.categories = 0
+        self.errors = 0
+
+    @classmethod
+    def from_dump(cls, categorylinks_path: str | os.PathLike,
+                  titles: Mapping[int, str] | str | os.PathLike, *,
+                  linktargets: str | os.PathLike | None = None, **options) -> CategoryWalker:
+        """An offline walker over the ``categorylinks.sql.gz`` table dump.
+
+        ``titles`` maps page IDs to titles: a mapping or the path of the
+        multistream index.  Links from pages missing from it are dropped.
+        The graph is built in memory (8 bytes per category link at the
+        peak); save it with ``walker.graph.save(directory)`` and pass
+        ``graph=LinkGraph.open(directory)`` next time.  See
+        :func:`iter_categorylinks_sql` for ``linktargets``.
+        """
+        builder = _Builder()
+        pages: dict[int, int] = {}
+        items = (titles.items() if isinstance(titles, Mapping)
+                 else ((pageid, title) for _, pageid, title in iter_index(titles)))
+        for pageid, title in items:
+            pages[pageid] = builder.node(title)
+        node = builder.node
+        pairs = builder.pairs
+        for pageid, category, _kind in iter_categorylinks_sql(categorylinks_path, linktargets):
+            member = pages.get(pageid)
+            if member is not None:
+                pairs.append(node(category) << 32 | member)
+        del pages
+        return cls(graph=builder.build(), **options)
+
+    def _options(self, namespaces, max_depth) -> tuple[frozenset[int] | None, int | None]:
+        if namespaces is ...:
+            namespaces = self.namespaces
+        elif namespaces is not None:
+            namespaces = frozenset(namespaces)
+        return namespaces, self.max_depth if max_depth is ... else max_depth
+
+    # -- offline -----------------------------------------------------------
+
+    def walk_local(self, category: str, *, namespaces: Iterable[int] | None = ...,
+                   max_depth: int | None = ...) -> Iterator[CategoryMember]:
+        """Yield the members under ``category`` from the local graph, breadth first."""
+        if self.graph is None:
+            raise ValueError("no local category graph; use walk() to read the wiki")
+        namespaces, max_depth = self._options(namespaces, max_depth)
+        graph = self.graph
+        titles = graph._titles
+        self.categories = 0
+        root = graph.id(_category_title(category))
+        if root is None:
+            return
+        expanded = {root}
+        emitted: set[int] = set()
+        queue = deque([(root, 0)])
+        while queue:
+            parent, depth = queue.popleft()
+            self.categories += 1
+            name = graph.title(parent)
+            for member in graph.successors(parent).tolist():
+                is_category = titles[member].startswith(_PREFIX)
+                if is_category and member not in expanded and (
+                        max_depth is None or depth < max_depth):
+                    expanded.add(member)
+                    queue.append((member, depth + 1))
+                if member in emitted:
+                    continue
+                title = graph.title(member)
+                ns = _CATEGORY if is_category else _namespace(title)
+                if namespaces is None or ns in namespaces:
+                    emitted.add(member)
+                    yield CategoryMember(title, ns, None, name, depth)
+
+    # -- live --------------------------------------------------------------
+
+    async def walk(self, category: str, *, namespaces: Iterable[int] | None = ...,
+                   max_depth: int | None = ...) -> AsyncIterator[CategoryMember]:
+        """Stream the members under ``category`` as they are found.
+
+        With a local graph this is :meth:`walk_local`.  Requests that fail
+        are logged and counted in :attr:`errors`; the walk goes on without
+        that category.
+        """
+        if self.graph is not None:
+            for member in self.walk_local(category, namespaces=namespaces,
+                                          max_depth=max_depth):
+                yield member
+            return
+        namespaces, max_depth = self._options(namespaces, max_depth)
+        if self.client is None:
+            self.client = WikiClient()
+            self._own_client = True
+        params = {"cmlimit": self.batch, "cmprop": "ids|title"}
+        if namespaces is not None:
+            wanted = namespaces if max_depth == 0 else namespaces | {_CATEGORY}
+            params["cmnamespace"] = "|".join(map(str, sorted(wanted)))
+        self.categories = self.errors = 0
+        root = _category_title(category)
+        depths = {root: 0}
+        todo: list[tuple[int, int, str]] = [(0, 0, root)]
+        seq = itertools.count(1)
+        emitted = PageIdBitmap()
+        # Bounded, so workers stop listing while the consumer lags behind.
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 500)
+        ready = asyncio.Condition()
+        active = 0
+
+        def discover(title: str, depth: int) -> bool:
+            known = depths.get(title)
+            # Without a depth limit a shorter path changes nothing worth a refetch.
+            if known is not None and (known <= depth or max_depth is None):
+                return False
+            depths[title] = depth
+            if max_depth is None or depth <= max_depth:
+                heapq.heappush(todo, (depth, next(seq), title))
+                return True
+            return False
+
+        async def expand(title: str, depth: int) -> None:
+            self.categories += 1
+            async for item in self.client.iter_list("categorymembers", cmtitle=title,
+                                                    **params):
+                ns = item["ns"]
+                if ns == _CATEGORY and discover(item["title"], depth + 1):
+                    async with ready:
+                        ready.notify()
+                if namespaces is None or ns in namespaces:
+                    await results.put(CategoryMember(item["title"], ns, item.get("pageid"),
+                                                     title, depth))
+
+        async def worker() -> None:
+            nonlocal active
+            while True:
+                async with ready:
+                    while not todo:
+                        if active == 0:
+                            ready.notify_all()
+                            return
+                        await ready.wait()
+                    depth, _, title = heapq.heappop(todo)
+                    active += 1
+                try:
+                    if depths[title] == depth:  # else queued again, shallower
+                        await expand(title, depth)
+                except (WikiAPIError, OSError, asyncio.TimeoutError, ValueError) as exc:
+                    self.errors += 1
+                    log.warning("failed to list %r: %s", title, exc)
+                finally:
+                    async with ready:
+                        active -= 1
+                        ready.notify_all()
+
+        async def work() -> None:
+            try:
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            finally:
+                # After a cancel nobody reads the queue, and a put could block.
+                if not asyncio.current_task().cancelling():
+                    await results.put(_DONE)
+
+        runner = asyncio.create_task(work())
+        try:
+            while (member := await results.get()) is not _DONE:
+                if member.pageid is None or emitted.add(member.pageid):
+                    yield member
+            await runner
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+    async def members(self, category: str, **options) -> list[CategoryMember]:
+        """Every member under ``category`` (see :meth:`walk`), as a list."""
+        return [member async for member in self.walk(category, **options)]
+
+    async def close(self) -> None:
+        if self._own_client and self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def __aenter__(self) -> CategoryWalker:
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
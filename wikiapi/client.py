@@ -0,0 +1,539 @@
+"""Asynchronous client for the MediaWiki action API."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+from urllib.parse import urlencode
+
+from .article import Article
+from .cache import ResponseCache
+from .complete import TitleCompleter
+from .diskindex import DiskIndex
+from .errors import APIError, HTTPError
+from .fuzzy import FuzzyTitleIndex
+from .http import HTTPClient
+from .index import InvertedIndex
+from .ratelimit import RateLimiter, parse_retry_after
+from .redirects import RedirectMap
+from .segments import SegmentedIndex
+
+DEFAULT_ENDPOINT = "https://en.wikipedia.org/w/api.php"
+DEFAULT_USER_AGENT = "WikiAPI/0.1 (https://github.com/lohex/WikiAPI)"
+
+#: Values per multi-value parameter the API accepts from ordinary clients.
+BATCH_SIZE = 50
+#: The limit for accounts with the ``apihighlimits`` right (bots, admins).
+HIGH_BATCH_SIZE = 500
+#: Longest query string sent with GET; longer ones, such as a batch of 500
+#: long titles, are POSTed, since servers refuse long URLs (HTTP 414).
+MAX_GET_QUERY = 4096
+
+_THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def _encode(params: dict[str, Any]) -> dict[str, str]:
+    """Flatten API parameters: lists become ``a|b``, booleans become flags."""
+    out = {}
+    for key, value in params.items():
+        if value is None or value is False:
+            continue
+        if value is True:
+            out[key] = "1"
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            out[key] = "|".join(str(v) for v in value)
+        else:
+            out[key] = str(value)
+    return out
+
+
+class WikiClient:
+    """Talks to one wiki's ``api.php``.
+
+    Several clients may share an :class:`~wikiapi.http.HTTPClient` so that all
+    of them reuse the same pooled keep-alive connections.  ``batch_size`` is
+    the number of titles, page IDs or revision IDs sent per request; raise it
+    to :data:`HIGH_BATCH_SIZE` when the account has ``apihighlimits``.
+
+    ``rate_limiter`` paces requests (share one between clients of the same
+    host), and ``maxlag`` is sent with every request so that the wiki can
+    ask us to slow down while its replicas lag.  With a local ``index``,
+    :meth:`search` answers from it instead of the network, and likewise
+    :meth:`complete` with a ``completer`` and :meth:`suggest` with ``fuzzy``.
+
+    Titles are resolved through ``redirects`` before they are sent, and the
+    map learns from every response; by default each client starts an empty
+    :class:`~wikiapi.redirects.RedirectMap` of its own.
+
+    With a ``cache``, article fetches and :meth:`search_articles` answer
+    from a :class:`~wikiapi.cache.ResponseCache` while its entries are
+    fresh; stale article batches are revalidated by ``lastrevid``.
+
+    Identical requests in flight at the same time are sent once and share
+    the response, which callers must therefore treat as read-only.  Single
+    :meth:`fetch_article` calls made within ``batch_window`` seconds of
+    each other (by default, in the same event loop iteration) are merged
+    into one multi-title query.
+    """
+
+    def __init__(self, endpoint: str = DEFAULT_ENDPOINT, *, http: HTTPClient | None = None,
+                 max_connections: int = 8, user_agent: str = DEFAULT_USER_AGENT,
+                 timeout: float = 30.0, batch_size: int = BATCH_SIZE,
+                 rate_limiter: RateLimiter | None = None, maxlag: int | None = None,
+                 max_retries: int = 5,
+                 index: InvertedIndex | DiskIndex | SegmentedIndex | None = None,
+                 completer: TitleCompleter | None = None,
+                 fuzzy: FuzzyTitleIndex | None = None,
+                 redirects: RedirectMap | None = None,
+                 cache: ResponseCache | None = None, batch_window: float = 0.0):
+        if not 1 <= batch_size <= HIGH_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {HIGH_BATCH_SIZE}")
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self._owns_http = http is None
+        self.http = http or HTTPClient(max_connections_per_host=max_connections,
+                                       timeout=timeout)
+        self.headers = {"User-Agent": user_agent}
+        self.rate_limiter = rate_limiter
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.index = index
+        self.completer = completer
+        self.fuzzy = fuzzy
+        self.redirects = redirects if redirects is not None else RedirectMap()
+        self.cache = cache
+        self.batch_window = batch_window
+        #: Requests answered by joining an identical one already in flight.
+        self.coalesced = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        #: Single-title fetches waiting for their batch, by ``links``.
+        self._waiting: dict[bool, dict[str, asyncio.Future]] = {}
+        self._timers: dict[bool, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def api(self, **params: Any) -> dict[str, Any]:
+        """Call the API and return the decoded JSON, raising on errors.
+
+        HTTP 429/503 responses and ``maxlag`` errors are retried up to
+        ``max_retries`` times, waiting as long as ``Retry-After`` asks (or an
+        exponential backoff); the rate limiter, if any, is told about every
+        throttled and every clean response.
+        """
+        return await self._request(params)
+
+    def _query(self, params: dict[str, Any]) -> dict[str, str]:
+        return _encode({"format": "json", "formatversion": 2, "maxlag": self.maxlag,
+                        **params})
+
+    async def _request(self, params: dict[str, Any], *, cached: bool = False,
+                       revalidated: bool = False) -> dict[str, Any]:
+        """:meth:`api`, answered from and stored in the cache if ``cached``.
+
+        A request identical to one in flight waits for that one's response.
+        """
+        query = self._query(params)
+        key = ResponseCache.key(self.endpoint, query)
+        cache = self.cache if cached else None
+        if cache is not None:
+            body = cache.get(key, revalidated=revalidated)
+            if body is not None:
+                return json.loads(body)
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = asyncio.ensure_future(self._send(query, key, cache))
+
+            def landed(done: asyncio.Future) -> None:
+                del self._inflight[key]
+                if not done.cancelled():
+                    done.exception()  # retrieved even if every caller went away
+
+            flight.add_done_callback(landed)
+        else:
+            self.coalesced += 1
+        # One caller giving up must not cancel the request for the others.
+        return await asyncio.shield(flight)
+
+    async def _send(self, query: dict[str, str], key: str,
+                    cache: ResponseCache | None) -> dict[str, Any]:
+        limiter = self.rate_limiter
+        send = self.http.post if len(urlencode(query)) > MAX_GET_QUERY else self.http.get
+        for attempt in range(self.max_retries + 1):
+            if limiter is not None:
+                await limiter.acquire()
+            resp = await send(self.endpoint, query, headers=self.headers)
+            retry_after = parse_retry_after(resp.headers.get("retry-after"))
+            if resp.status in _THROTTLE_STATUSES:
+                error: Exception = HTTPError(resp.status, self.endpoint, resp.headers)
+            elif resp.status >= 400:
+                raise HTTPError(resp.status, self.endpoint, resp.headers)
+            else:
+                data = resp.json()
+                if "error" not in data:
+                    if limiter is not None:
+                        limiter.on_success()
+                    if cache is not None:
+                        cache.put(key, resp.body)
+                    return data
+                err = data["error"]
+                error = APIError(err.get("code", "unknown"), err.get("info", ""))
+                if error.code != "maxlag":
+                    raise error
+            if attempt == self.max_retries:
+                raise error
+            if limiter is not None:
+                limiter.on_throttle(retry_after)
+            else:
+                await asyncio.sleep(retry_after if retry_after is not None else 2 ** attempt)
+        raise AssertionError("unreachable")
+
+    async def fetch_article(self, title: str, *, links: bool = False) -> Article:
+        """Fetch the current wikitext of ``title`` (following redirects).
+
+        With ``links=True`` the article's outgoing main-namespace links are
+        fetched too, following ``plcontinue`` until complete.  Concurrent
+        calls are collected for ``batch_window`` seconds and fetched together.
+        """
+        title = self.redirects.resolve(title)
+        waiting = self._waiting.get(links)
+        if waiting is None:
+            waiting = self._waiting[links] = {}
+            loop = asyncio.get_running_loop()
+            if self.batch_window > 0:
+                self._timers[links] = loop.call_later(self.batch_window, self._flush, links)
+            else:
+                self._timers[links] = loop.call_soon(self._flush, links)
+        future = waiting.get(title)
+        if future is None:
+            future = waiting[title] = asyncio.get_running_loop().create_future()
+            if len(waiting) >= self.batch_size:
+                self._timers[links].cancel()
+                self._flush(links)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _flush(self, links: bool) -> None:
+        """Start fetching the single-title requests collected so far."""
+        waiting = self._waiting.pop(links)
+        del self._timers[links]
+        task = asyncio.ensure_future(self._fetch_waiting(waiting, links))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_waiting(self, waiting: dict[str, asyncio.Future], links: bool) -> None:
+        try:
+            articles = await self.fetch_articles(list(waiting), links=links)
+        except asyncio.CancelledError:
+            for future in waiting.values():
+                future.cancel()
+            raise
+        except Exception as exc:
+            for future in waiting.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, article in zip(waiting.values(), articles):
+            if not future.done():
+                future.set_result(article)
+
+    async def fetch_articles(self, titles: Iterable[str] | None = None, *,
+                             pageids: Iterable[int] | None = None,
+                             revids: Iterable[int] | None = None,
+                             links: bool = False) -> list[Article]:
+        """Fetch many articles with as few requests as possible.
+
+        Exactly one of ``titles``, ``pageids`` or ``revids`` must be given.
+        The values are sent ``batch_size`` at a time as one multi-value
+        ``action=query`` call each, the batches run concurrently, and the
+        result is a list aligned with the input: one :class:`Article` per
+        requested value, with ``missing=True`` where the wiki has no page.
+        Titles are first resolved through :attr:`redirects`, so known
+        redirects are fetched as their target and titles that resolve alike
+        are fetched once.  The rest are matched back through the API's
+        normalization and redirect tables, so
+        ``"python_(programming_language)"`` gets the right page either way.
+        """
+        given = [(k, v) for k, v in (("titles", titles), ("pageids", pageids),
+                                     ("revids", revids)) if v is not None]
+        if len(given) != 1:
+            raise ValueError("pass exactly one of titles, pageids or revids")
+        kind, values = given[0]
+        values = list(values)
+        if kind == "titles":
+            resolve = self.redirects.resolve
+            sent = {title: resolve(title) for title in values}
+            unique = list(dict.fromkeys(sent.values()))
+        else:
+            unique = list(dict.fromkeys(values))
+        if self.cache is not None:
+            # The same pages then form the same batches, and cache keys, every time.
+            unique.sort()
+        chunks = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        found: dict[Any, Article] = {}
+        for part in await asyncio.gather(*(self._fetch_batch(kind, c, links) for c in chunks)):
+            found.update(part)
+        if kind == "titles":
+            return [found.get(sent[v]) or Article(title=v, missing=True) for v in values]
+        return [found.get(v) or Article(title="", missing=True,
+                                        **{"pageid" if kind == "pageids" else "revid": v})
+                for v in values]
+
+    async def _fetch_batch(self, kind: str, values: list, links: bool) -> dict[Any, Article]:
+        """Run one multi-value query and map every requested value to its page."""
+        params: dict[str, Any] = {
+            "action": "query", kind: values, "redirects": True,
+            "prop": ["info", "revisions"], "rvprop": ["ids", "content"], "rvslots": "main",
+        }
+        if links:
+            params["prop"].append("links")
+            params.update(pllimit="max", plnamespace=0)
+        cached = self.cache is not None
+        # A revision never changes, so a cached one is always good.
+        revalidated = cached and (kind == "revids" or await self._unchanged(params))
+        pages: dict[Any, dict[str, Any]] = {}
+        aliases: dict[str, str] = {}
+        cont: dict[str, Any] = {}
+        while True:
+            data = await self._request({**params, **cont}, cached=cached,
+                                       revalidated=revalidated)
+            query = data.get("query", {})
+            self.redirects.learn(query)
+            for entry in [*query.get("normalized", ()), *query.get("redirects", ())]:
+                aliases[entry["from"]] = entry["to"]
+            for page in query.get("pages", ()):
+                # Copied before merging: the response may be shared (see _request).
+                key = page.get("pageid") or page["title"]
+                merged = pages.get(key)
+                if merged is None:
+                    pages[key] = dict(page)
+                    continue
+                if "revisions" not in merged and "revisions" in page:
+                    merged["revisions"] = page["revisions"]
+                if "links" in page:
+                    merged["links"] = [*merged.get("links", ()), *page["links"]]
+            cont = data.get("continue")
+            if not cont:
+                break
+
+        found: dict[Any, Article] = {}
+        if kind == "titles":
+            by_title = {page["title"]: page for page in pages.values()}
+            for title in values:
+                target, seen = title, set()
+                while target in aliases and target not in seen:
+                    seen.add(target)
+                    target = aliases[target]
+                if target in by_title:
+                    found[title] = Article.from_page(by_title[target])
+        elif kind == "pageids":
+            wanted = set(values)
+            for page in pages.values():
+                if page.get("pageid") in wanted:
+                    found[page["pageid"]] = Article.from_page(page)
+        else:
+            for page in pages.values():
+                for rev in page.get("revisions", ()):
+                    found[rev["revid"]] = Article.from_page({**page, "revisions": [rev]})
+        return found
+
+    async def _unchanged(self, params: dict[str, Any]) -> bool:
+        """Whether a stale cached answer to ``params`` still has the current revisions.
+
+        Costs one ``prop=info`` request for the same pages, and only when
+        there is such an answer.
+        """
+        stale = self.cache.stale(self.cache.key(self.endpoint, self._query(params)))
+        if stale is None:
+            return False
+        check = {k: v for k, v in params.items() if k in ("titles", "pageids", "redirects")}
+        current = await self.api(action="query", prop="info", **check)
+
+        def revisions(data: dict[str, Any]) -> dict[Any, Any]:
+            return {page.get("pageid") or page["title"]: page.get("lastrevid")
+                    for page in data.get("query", {}).get("pages", ())}
+
+        return revisions(json.loads(stale)) == revisions(current)
+
+    async def preload_redirects(self, titles: Iterable[str]) -> int:
+        """Resolve many titles with bare ``redirects`` queries, filling the map.
+
+        Titles go ``batch_size`` per request and the batches run
+        concurrently; no page content is downloaded.  Returns how many of the
+        titles turned out to be redirects.
+        """
+        resolve = self.redirects.resolve
+        unique = list(dict.fromkeys(resolve(title) for title in titles))
+        chunks = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        responses = await asyncio.gather(*(self.api(action="query", titles=chunk,
+                                                    redirects=True) for chunk in chunks))
+        count = 0
+        for data in responses:
+            query = data.get("query", {})
+            self.redirects.learn(query)
+            count += len(query.get("redirects", ()))
+        return count
+
+    async def query_continue(self, *, prefetch: bool = False,
+                             **params: Any) -> AsyncIterator[dict[str, Any]]:
+        """Yield successive ``action=query`` responses, following ``continue``.
+
+        The next batch is requested only when the consumer asks for it.  With
+        ``prefetch=True`` it is requested as soon as the current batch
+        arrives, so it downloads while the consumer works on the current one.
+        """
+        params = {"action": "query", **params}
+        cont: dict[str, Any] | None = {}
+        ahead: asyncio.Future | None = None
+        try:
+            while cont is not None:
+                data = await (ahead if ahead is not None else self.api(**params, **cont))
+                ahead = None
+                cont = data.get("continue")
+                if cont is not None and prefetch:
+                    ahead = asyncio.ensure_future(self.api(**params, **cont))
+                yield data
+        finally:
+            if ahead is not None:
+                ahead.cancel()
+
+    async def iter_list(self, name: str, *, prefetch: bool = False,
+                        **params: Any) -> AsyncIterator[dict[str, Any]]:
+        """Stream the items of ``list=name`` across all continuation batches."""
+        async for data in self.query_continue(list=name, prefetch=prefetch, **params):
+            for item in data.get("query", {}).get(name, ()):
+                yield item
+
+    def iter_search(self, query: str, *, namespace: int = 0, batch: int | str = "max",
+                    prefetch: bool = False) -> AsyncIterator[dict[str, Any]]:
+        """Stream every ``list=search`` hit, ``batch`` hits per request."""
+        return self.iter_list("search", prefetch=prefetch, srsearch=query,
+                              srlimit=batch, srnamespace=namespace)
+
+    async def search(self, query: str, *, limit: int = 10, namespace: int = 0,
+                     backend: str = "auto") -> list[dict[str, Any]]:
+        """Full-text search; returns up to ``limit`` ``list=search``-shaped hits.
+
+        ``backend`` is ``"remote"`` (the wiki's search endpoint), ``"local"``
+        (the :class:`~wikiapi.index.InvertedIndex`, memory-mapped
+        :class:`~wikiapi.diskindex.DiskIndex` or updatable
+        :class:`~wikiapi.segments.SegmentedIndex` given as ``index``) or
+        ``"auto"``, which uses the local index when there is one.  Local hits
+        carry a BM25 ``score`` and only cover namespace 0.
+        """
+        if backend not in ("auto", "local", "remote"):
+            raise ValueError(f"unknown search backend {backend!r}")
+        if backend == "local" or (backend == "auto" and self.index is not None):
+            if self.index is None:
+                raise ValueError("the local search backend needs an index")
+            return [hit.as_dict() for hit in self.index.search(query, limit)]
+        hits: list[dict[str, Any]] = []
+        if limit <= 0:
+            return hits
+        stream = self.iter_search(query, namespace=namespace, batch=min(limit, 500))
+        try:
+            async for hit in stream:
+                hits.append(hit)
+                if len(hits) >= limit:
+                    break
+        finally:
+            await stream.aclose()
+        return hits
+
+    async def complete(self, prefix: str, *, limit: int = 10, namespace: int = 0,
+                       backend: str = "auto") -> list[str]:
+        """Titles starting with ``prefix``, most relevant first (type-ahead).
+
+        ``backend`` is ``"remote"`` (``list=prefixsearch``), ``"local"`` (the
+        :class:`~wikiapi.complete.TitleCompleter` given as ``completer``,
+        ranked by its popularity weights) or ``"auto"``.
+        """
+        if backend not in ("auto", "local", "remote"):
+            raise ValueError(f"unknown completion backend {backend!r}")
+        if backend == "local" or (backend == "auto" and self.completer is not None):
+            if self.completer is None:
+                raise ValueError("the local completion backend needs a completer")
+            return self.completer.complete(prefix, limit)
+        if limit <= 0:
+            return []
+        data = await self.api(action="query", list="prefixsearch", pssearch=prefix,
+                              pslimit=min(limit, 500), psnamespace=namespace)
+        return [hit["title"] for hit in data.get("query", {}).get("prefixsearch", ())]
+
+    async def suggest(self, title: str, *, limit: int = 5, namespace: int = 0,
+                      backend: str = "auto") -> list[str]:
+        """Titles close to a possibly misspelled ``title``, best first.
+
+        ``backend`` is ``"remote"`` (a ``list=search`` for ``title``), ``"local"``
+        (the :class:`~wikiapi.fuzzy.FuzzyTitleIndex` given as ``fuzzy``, up to
+        its edit distance) or ``"auto"``.
+        """
+        if backend not in ("auto", "local", "remote"):
+            raise ValueError(f"unknown suggestion backend {backend!r}")
+        if backend == "local" or (backend == "auto" and self.fuzzy is not None):
+            if self.fuzzy is None:
+                raise ValueError("the local suggestion backend needs a fuzzy index")
+            return [match for match, _ in self.fuzzy.lookup(title, limit)]
+        if limit <= 0:
+            return []
+        data = await self.api(action="query", list="search", srsearch=title,
+                              srlimit=min(limit, 500), srnamespace=namespace, srprop="",
+                              srinfo="suggestion")
+        query = data.get("query", {})
+        titles = [hit["title"] for hit in query.get("search", ())]
+        suggestion = query.get("searchinfo", {}).get("suggestion")
+        if not titles and suggestion:
+            titles.append(suggestion)
+        return titles
+
+    async def search_articles(self, query: str, *, limit: int = 10, namespace: int = 0,
+                              links: bool = False) -> list[Article]:
+        """Search and fetch the matching articles in the same request.
+
+        Uses ``generator=search`` so the hits' wikitext comes back with the
+        search itself instead of costing one fetch per hit.  ``limit`` is
+        capped at ``batch_size``.
+        """
+        params: dict[str, Any] = {
+            "action": "query", "generator": "search", "gsrsearch": query,
+            "gsrlimit": min(limit, self.batch_size), "gsrnamespace": namespace,
+            "prop": ["info", "revisions"], "rvprop": ["ids", "content"], "rvslots": "main",
+        }
+        if links:
+            params["prop"].append("links")
+            params.update(pllimit="max", plnamespace=0)
+        pages: dict[int, dict[str, Any]] = {}
+        cont: dict[str, Any] = {}
+        while True:
+            data = await self._request({**params, **cont}, cached=self.cache is not None)
+            for page in data.get("query", {}).get("pages", ()):
+                merged = pages.get(page["pageid"])
+                if merged is None:
+                    pages[page["pageid"]] = dict(page)
+                    continue
+                if "revisions" not in merged and "revisions" in page:
+                    merged["revisions"] = page["revisions"]
+                merged["links"] = [*merged.get("links", ()), *page.get("links", ())]
+            cont = data.get("continue")
+            # gsroffset means the next page of hits, which the caller did not ask for.
+            if not cont or set(cont) <= {"gsroffset", "continue"}:
+                break
+            cont = {k: v for k, v in cont.items() if k != "gsroffset"}
+        ordered = sorted(pages.values(), key=lambda p: p.get("index", 0))
+        return [Article.from_page(page) for page in ordered]
+
+    async def close(self) -> None:
+        for links in list(self._timers):
+            self._timers[links].cancel()
+            self._flush(links)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._owns_http:
+            await self.http.close()
+
+    async def __aenter__(self) -> WikiClient:
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
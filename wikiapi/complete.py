@@ -0,0 +1,258 @@
+"""Type-ahead title completion from a compact, memory-mappable table.
+
+:class:`TitleCompleter` answers "the ``k`` most popular titles starting
+with this prefix" locally instead of a ``prefixsearch`` round trip per
+keystroke.  Titles are kept in one array sorted by their normalized form
+(lower case, underscores as spaces), so the titles sharing a prefix form one
+contiguous range found by binary search.  The range is usually small and
+its best entries are picked directly.  Short prefixes such as ``"a"`` cover
+huge ranges, so their answers are precomputed: every prefix matching more
+than ``threshold`` titles (the heavy nodes of the implied trie) stores its
+top ``k`` title numbers.  A heavy node only exists where the trie branches
+over many titles, so the table stays small, and no query ever looks at
+more than ``threshold`` weights.
+
+Lookups compare raw UTF-8 bytes, whose order matches code point order,
+so a binary search step costs one slice of the buffer.
+
+The whole structure is a handful of flat sections in one buffer, with the
+same layout in memory and on disk.  :meth:`TitleCompleter.save` writes it
+out, and :meth:`TitleCompleter.open` maps the file read-only, so start-up
+is immediate and processes share the pages::
+
+    header      magic, version, counts, k, threshold, section offsets
+    key_offs    uint64[n+1] into key_blob
+    key_blob    UTF-8 normalized titles, sorted
+    title_offs  uint64[n+1] into title_blob
+    title_blob  UTF-8 titles in the same order
+    weights     float32[n]
+    pfx_offs    uint64[m+1] into pfx_blob
+    pfx_blob    UTF-8 heavy prefixes (normalized), sorted
+    pfx_top     uint32[m*k] best title numbers per prefix, 0xFFFFFFFF pads
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+
+from .index import _top_k, np
+
+__all__ = ["TitleCompleter", "normalize_prefix"]
+
+MAGIC = b"WIKIAC\x00\x00"
+VERSION = 1
+_SECTIONS = ("key_offs", "key_blob", "title_offs", "title_blob", "weights", "pfx_offs",
+             "pfx_blob", "pfx_top")
+_HEADER = struct.Struct("<8sIIQQII" + "Q" * len(_SECTIONS))
+_NONE = 0xFFFFFFFF
+
+
+def normalize_prefix(text: str) -> str:
+    """The form titles are compared in: lower case, single spaces."""
+    return " ".join(text.replace("_", " ").split()).lower()
+
+
+def _upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class _Strings:
+    """Sequence of the byte strings of a blob cut at ``offsets``."""
+
+    __slots__ = ("_buf", "_offs", "_start")
+
+    def __init__(self, buf: memoryview, offsets, start: int):
+        self._buf = buf
+        self._offs = offsets
+        self._start = start
+
+    def __len__(self) -> int:
+        return len(self._offs) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        start = self._start
+        return bytes(self._buf[start + int(self._offs[i]):start + int(self._offs[i + 1])])
+
+
+def _top(weights, lo: int, hi: int, k: int) -> list[int]:
+    """Indices of the ``k`` largest weights in ``[lo, hi)``, best first.
+
+    Ties go to the earlier (alphabetically smaller) title.
+    """
+    if np is not None and hi - lo > k:
+        return [lo + int(i) for i in _top_k(np.asarray(weights[lo:hi]), k)]
+    return heapq.nsmallest(k, range(lo, hi), key=lambda i: (-weights[i], i))
+
+
+def _pack_strings(strings: list[bytes]) -> tuple[bytes, bytes]:
+    offsets = array("Q", [0])
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    return offsets.tobytes(), b"".join(strings)
+
+
+class TitleCompleter:
+    """Top-``k`` prefix completion over titles ranked by popularity."""
+
+    def __init__(self, data: bytes | mmap.mmap):
+        self._data = data
+        self._buf = memoryview(data)
+        (magic, version, _flags, n, m, self.k, self.threshold,
+         *offsets) = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a WikiAPI title completion table")
+        if version != VERSION:
+            raise ValueError(f"unsupported completion table version {version}")
+        off = dict(zip(_SECTIONS, offsets))
+        self._keys = _Strings(self._buf, self._view(off["key_offs"], "Q", n + 1),
+                              off["key_blob"])
+        self._titles = _Strings(self._buf, self._view(off["title_offs"], "Q", n + 1),
+                                off["title_blob"])
+        self._prefixes = _Strings(self._buf, self._view(off["pfx_offs"], "Q", m + 1),
+                                  off["pfx_blob"])
+        self.weights = self._view(off["weights"], "f", n)
+        self._top = self._view(off["pfx_top"], "I", m * self.k)
+
+    def _view(self, start: int, fmt: str, count: int):
+        if np is not None:
+            return np.frombuffer(self._data, dtype=np.dtype(fmt).newbyteorder("<"),
+                                 count=count, offset=start)
+        return self._buf[start:start + count * struct.calcsize(fmt)].cast(fmt)
+
+    @classmethod
+    def from_titles(cls, titles: Iterable[str | tuple[str, float]], *, k: int = 10,
+                    threshold: int = 256) -> TitleCompleter:
+        """Build from titles or ``(title, weight)`` pairs.
+
+        Bare titles weigh 1.  Weights are popularity scores such as page
+        views, in-link counts or PageRank; the best ``k`` per heavy prefix
+        are precomputed, ``threshold`` sets which prefixes are heavy.
+        """
+        if threshold < k:
+            raise ValueError("threshold must be at least k")
+        entries = []
+        for item in titles:
+            title, weight = (item, 1.0) if isinstance(item, str) else item
+            title = title.replace("_", " ")
+            entries.append((normalize_prefix(title), title, float(weight)))
+        entries.sort(key=lambda e: (e[0], e[1]))
+        keys = [e[0] for e in entries]
+        weights = array("f", (e[2] for e in entries))
+        np_weights = np.frombuffer(weights, dtype=np.float32) if np is not None else weights
+
+        # Walk the heavy nodes of the implied trie: each node is a prefix
+        # and the range of keys that start with it.
+        heavy: list[tuple[str, list[int]]] = []
+        stack = [("", 0, len(keys))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            if hi - lo <= threshold:
+                continue
+            heavy.append((prefix, _top(np_weights, lo, hi, k)))
+            depth = len(prefix)
+            # Keys equal to the prefix sort first; the rest split by next char.
+            i = bisect.bisect_right(keys, prefix, lo, hi)
+            while i < hi:
+                child = prefix + keys[i][depth]
+                j = bisect.bisect_left(keys, _upper_bound(child), i, hi)
+                stack.append((child, i, j))
+                i = j
+        heavy.sort()
+        del np_weights
+
+        key_offs, key_blob = _pack_strings([key.encode("utf-8") for key in keys])
+        title_offs, title_blob = _pack_strings([e[1].encode("utf-8") for e in entries])
+        pfx_offs, pfx_blob = _pack_strings([p.encode("utf-8") for p, _ in heavy])
+        top = array("I")
+        for _, best in heavy:
+            top.extend(best + [_NONE] * (k - len(best)))
+        sections = [key_offs, key_blob, title_offs, title_blob, weights.tobytes(), pfx_offs,
+                    pfx_blob, top.tobytes()]
+        offsets = []
+        pos = _HEADER.size
+        for section in sections:
+            pos += -pos % 8
+            offsets.append(pos)
+            pos += len(section)
+        data = bytearray(pos)
+        _HEADER.pack_into(data, 0, MAGIC, VERSION, 0, len(entries), len(heavy), k,
+                          threshold, *offsets)
+        for start, section in zip(offsets, sections):
+            data[start:start + len(section)] = section
+        return cls(bytes(data))
+
+    def save(self, path: str | os.PathLike) -> None:
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(self._buf)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: str | os.PathLike) -> TitleCompleter:
+        """Map a table written by :meth:`save` without reading it."""
+        with open(path, "rb") as fh:
+            return cls(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def title(self, i: int) -> str:
+        return self._titles[i].decode("utf-8")
+
+    def complete(self, prefix: str, k: int | None = None) -> list[str]:
+        """The ``k`` (default: the table's ``k``) most popular titles for ``prefix``."""
+        return [self.title(i) for i in self._complete(prefix, k)]
+
+    def complete_weighted(self, prefix: str, k: int | None = None) -> list[tuple[str, float]]:
+        return [(self.title(i), float(self.weights[i])) for i in self._complete(prefix, k)]
+
+    def _complete(self, prefix: str, k: int | None) -> list[int]:
+        k = self.k if k is None else k
+        if k <= 0:
+            return []
+        key = normalize_prefix(prefix)
+        if key and (prefix[-1:].isspace() or prefix[-1:] == "_"):
+            key += " "  # "new " and "new_" must not match "newton"
+        key = key.encode("utf-8")
+        prefixes = self._prefixes
+        i = bisect.bisect_left(prefixes, key)
+        heavy = i < len(prefixes) and prefixes[i] == key
+        if heavy and k <= self.k:
+            start = i * self.k
+            return [int(t) for t in self._top[start:start + k] if t != _NONE]
+        keys = self._keys
+        if not key:
+            return _top(self.weights, 0, len(keys), k)
+        lo = bisect.bisect_left(keys, key)
+        # A prefix that is not heavy matches at most ``threshold`` titles.
+        # 0xFF never occurs in UTF-8, so key + 0xFF bounds its matches.
+        end = len(keys) if heavy else min(len(keys), lo + self.threshold + 1)
+        hi = bisect.bisect_left(keys, key + b"\xff", lo, end)
+        return _top(self.weights, lo, hi, k)
+
+    def close(self) -> None:
+        self._titles = self._keys = self._prefixes = None
+        self.weights = self._top = None
+        self._buf.release()
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:  # views still held elsewhere; freed on collection
+                pass
+
+    def __enter__(self) -> TitleCompleter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,306 @@
+"""Breadth-first asyncio crawler over wiki articles.
+
+A fixed set of worker coroutines (``concurrency``) pulls titles from a shared
+frontier, so at most that many requests are outstanding at any time.  A second
+limit, ``per_host``, caps how many of them may target the same wiki.  The
+actual sockets are multiplexed by :class:`~wikiapi.http.HTTPClient`, which
+keeps only ``max_connections`` keep-alive connections per host open.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator, Iterable
+from typing import TYPE_CHECKING
+from urllib.parse import unquote, urlsplit
+
+from .article import Article
+from .cache import ResponseCache
+from .client import BATCH_SIZE, DEFAULT_ENDPOINT, DEFAULT_USER_AGENT, WikiClient
+from .errors import WikiAPIError
+from .frontier import Frontier, FrontierEntry
+from .http import HTTPClient
+from .ratelimit import RateLimiters
+
+if TYPE_CHECKING:
+    from .centrality import PageRank
+
+__all__ = ["Crawler", "crawl"]
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _split_seed(seed: str, default_endpoint: str) -> tuple[str, str]:
+    """Turn a title or an article URL into ``(api endpoint, title)``."""
+    if "://" not in seed:
+        return default_endpoint, seed
+    parts = urlsplit(seed)
+    path = parts.path
+    title = path.split("/wiki/", 1)[1] if "/wiki/" in path else path.rsplit("/", 1)[-1]
+    endpoint = f"{parts.scheme}://{parts.netloc}/w/api.php"
+    return endpoint, unquote(title).replace("_", " ")
+
+
+class Crawler:
+    """Crawl articles and the articles they link to.
+
+    ``concurrency`` is the global number of requests in flight, ``per_host``
+    the number that may target one wiki at a time and ``max_connections`` the
+    number of pooled sockets per wiki.  ``max_pages`` and ``max_depth`` bound
+    the crawl; ``follow_links=False`` fetches only the seeds.  Each worker
+    drains up to ``batch_size`` queued titles and fetches them in one
+    multi-title query, so the request count grows with pages / batch size.
+
+    ``rate`` switches on adaptive rate limiting, starting at that many
+    requests per second per host; all workers share one limiter per host
+    (pass ``rate_limits`` to share them with other crawlers too).  Its state
+    is available from :meth:`metrics`.
+
+    Pages wait in a :class:`~wikiapi.frontier.Frontier`.  Give ``state_dir``
+    to make it durable: the crawl checkpoints into that directory and a new
+    crawler on the same directory resumes where the previous one stopped.
+    ``visited_error_rate`` swaps the frontier's exact visited sets for Bloom
+    filters with that false-positive rate, for crawls too large for ``set``.
+    A ``cache`` is shared by the clients of every wiki, so a repeated crawl
+    only downloads the pages that changed.
+
+    ``priors`` (a :class:`~wikiapi.centrality.PageRank` of ``endpoint``'s link
+    graph, e.g. from an earlier crawl) reorders the frontier: a page on
+    ``endpoint`` is queued as if it were its PageRank boost levels
+    shallower, so important pages are fetched first.  Depth limits still
+    count real link steps.
+
+    A batch whose fetch fails is queued again, up to ``max_retries`` times;
+    after that its pages are given up on and counted in :attr:`errors`.
+    """
+
+    def __init__(self, endpoint: str = DEFAULT_ENDPOINT, *, concurrency: int = 100,
+                 per_host: int | None = None, max_connections: int = 8,
+                 max_pages: int | None = None, max_depth: int | None = None,
+                 follow_links: bool = True, user_agent: str = DEFAULT_USER_AGENT,
+                 timeout: float = 30.0, batch_size: int = BATCH_SIZE,
+                 rate: float | None = None, maxlag: int | None = 5,
+                 rate_limits: RateLimiters | None = None,
+                 state_dir: str | os.PathLike | None = None, frontier: Frontier | None = None,
+                 visited_error_rate: float | None = None,
+                 http: HTTPClient | None = None, cache: ResponseCache | None = None,
+                 priors: PageRank | None = None, max_retries: int = 3):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.per_host = per_host or concurrency
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.follow_links = follow_links
+        self.user_agent = user_agent
+        self.batch_size = batch_size
+        self.maxlag = maxlag
+        if rate_limits is None and rate is not None:
+            rate_limits = RateLimiters(rate=rate)
+        self.rate_limits = rate_limits
+        self.cache = cache
+        self.priors = priors
+        self.max_retries = max_retries
+        self._attempts: dict[tuple[str, str], int] = {}
+        #: ``(endpoint, page ID)`` of fetched articles the consumer has not taken yet.
+        self._pending: set[tuple[str, int]] = set()
+        self._owns_http = http is None
+        self.http = http or HTTPClient(max_connections_per_host=max_connections,
+                                       timeout=timeout)
+        self._clients: dict[str, WikiClient] = {}
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._owns_frontier = frontier is None
+        self.frontier = frontier if frontier is not None else Frontier(
+            state_dir, error_rate=visited_error_rate)
+        self._active = 0
+        self.scheduled = 0
+        self.fetched = 0
+        self.retried = 0
+        self.errors = 0
+
+    def client(self, endpoint: str) -> WikiClient:
+        client = self._clients.get(endpoint)
+        if client is None:
+            client = self._clients[endpoint] = WikiClient(
+                endpoint, http=self.http, user_agent=self.user_agent,
+                batch_size=self.batch_size, maxlag=self.maxlag, cache=self.cache,
+                rate_limiter=self.rate_limits.for_url(endpoint) if self.rate_limits else None)
+        return client
+
+    def metrics(self) -> dict:
+        """Crawl counters plus the rate limiter state of every host."""
+        return {
+            "scheduled": self.scheduled,
+            "queued": len(self.frontier),
+            "fetched": self.fetched,
+            "retried": self.retried,
+            "errors": self.errors,
+            "rate_limits": self.rate_limits.metrics() if self.rate_limits else {},
+            "cache": self.cache.stats if self.cache is not None else {},
+        }
+
+    def _schedule(self, endpoint: str, title: str, depth: int) -> None:
+        if self.max_pages is not None and len(self.frontier.seen) >= self.max_pages:
+            return
+        # Known redirects are queued as their target, so they are seen once.
+        title = self.client(endpoint).redirects.resolve(title)
+        priority = None
+        if self.priors is not None and endpoint == self.endpoint:
+            priority = depth - self.priors.boost(title)
+        if self.frontier.add(endpoint, title, depth, priority):
+            self.scheduled += 1
+
+    def _follows(self, entry: FrontierEntry) -> bool:
+        return self.follow_links and (self.max_depth is None or entry.depth < self.max_depth)
+
+    async def _fetch(self, endpoint: str, entries: list[FrontierEntry],
+                     links: bool) -> list[Article]:
+        host = urlsplit(endpoint).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        async with limit:
+            return await self.client(endpoint).fetch_articles(
+                [entry.title for entry in entries], links=links)
+
+    def _failed(self, entries: list[FrontierEntry]) -> None:
+        """Queue the pages of a failed fetch again, or give up on them."""
+        for entry in entries:
+            attempts = self._attempts.get(entry.key, 0) + 1
+            if attempts > self.max_retries:
+                self._attempts.pop(entry.key, None)
+                self.errors += 1
+                self.frontier.complete(entry)
+            else:
+                self._attempts[entry.key] = attempts
+                self.retried += 1
+                self.frontier.retry(entry)
+
+    async def _next_batch(self, wakeup: asyncio.Condition) -> list[FrontierEntry]:
+        """Wait for queued pages; an empty list means the crawl is over."""
+        async with wakeup:
+            while not (batch := self.frontier.pop_batch(self.batch_size)):
+                if self._active == 0:
+                    wakeup.notify_all()
+                    return batch
+                await wakeup.wait()
+            self._active += 1
+            return batch
+
+    async def _worker(self, wakeup: asyncio.Condition, results: asyncio.Queue) -> None:
+        while batch := await self._next_batch(wakeup):
+            groups: dict[tuple[str, bool], list[FrontierEntry]] = {}
+            for entry in batch:
+                groups.setdefault((entry.endpoint, self._follows(entry)), []).append(entry)
+            try:
+                for (endpoint, links), entries in groups.items():
+                    try:
+                        articles = await self._fetch(endpoint, entries, links)
+                    except (WikiAPIError, OSError, asyncio.TimeoutError, ValueError) as exc:
+                        log.warning("failed to fetch %d titles (%r, ...): %s",
+                                    len(entries), entries[0].title, exc)
+                        self._failed(entries)
+                        continue
+                    delivered = set()
+                    for entry, article in zip(entries, articles):
+                        if article.missing:
+                            continue
+                        if article.pageid is not None:
+                            claim = (endpoint, article.pageid)
+                            if claim in self._pending or self.frontier.has_pageid(*claim):
+                                continue  # reached before under another title
+                            self._pending.add(claim)
+                        self.fetched += 1
+                        if article.title != entry.title:
+                            self.frontier.mark_seen(endpoint, article.title)
+                        for link in article.links:
+                            self._schedule(endpoint, link, entry.depth + 1)
+                        # The consumer completes it once it has taken the article.
+                        await results.put((entry, article))
+                        delivered.add(entry)
+                    for entry in entries:
+                        self._attempts.pop(entry.key, None)
+                        if entry not in delivered:
+                            self.frontier.complete(entry)
+                self.frontier.maybe_checkpoint()
+            finally:
+                async with wakeup:
+                    self._active -= 1
+                    wakeup.notify_all()
+
+    async def crawl(self, seeds: Iterable[str]) -> AsyncIterator[Article]:
+        """Yield articles as they are fetched, starting from ``seeds``.
+
+        Seeds are titles on ``endpoint`` or full article URLs on any wiki.
+        When the frontier was resumed from disk, seeds that were already
+        seen are skipped and the crawl carries on where it stopped.  Delivery
+        is at-least-once: an article the consumer had not moved past when the
+        crawl stopped is delivered again on resume.
+        """
+        # Bounded, so workers stop fetching while the consumer lags behind.
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * self.batch_size)
+        wakeup = asyncio.Condition()
+        self._active = 0
+        self._pending.clear()
+        for seed in seeds:
+            endpoint, title = _split_seed(seed, self.endpoint)
+            self._schedule(endpoint, title, 0)
+
+        async def work() -> None:
+            try:
+                await asyncio.gather(*(self._worker(wakeup, results)
+                                       for _ in range(self.concurrency)))
+            finally:
+                # After a cancel nobody reads the queue, and a put could block.
+                if not asyncio.current_task().cancelling():
+                    await results.put(_DONE)
+
+        runner = asyncio.create_task(work())
+        try:
+            while (item := await results.get()) is not _DONE:
+                entry, article = item
+                yield article
+                # Pages count as done once the consumer asked for the next
+                # one, so an interrupted crawl re-delivers what it had not
+                # handed over yet instead of losing it.
+                self.frontier.complete(entry, article.pageid)
+                self._pending.discard((entry.endpoint, article.pageid))
+            await runner
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+            self.frontier.checkpoint()
+
+    def run(self, seeds: Iterable[str]) -> list[Article]:
+        """Blocking wrapper around :meth:`crawl` for scripts."""
+        async def collect() -> list[Article]:
+            try:
+                return [article async for article in self.crawl(seeds)]
+            finally:
+                await self.close()
+        return asyncio.run(collect())
+
+    async def close(self) -> None:
+        if self._owns_frontier:
+            self.frontier.close()
+        if self._owns_http:
+            await self.http.close()
+
+    async def __aenter__(self) -> Crawler:
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+def crawl(seeds: Iterable[str], **options) -> list[Article]:
+    """Crawl from ``seeds`` and return every fetched article.
+
+    Synchronous convenience for scripts; ``options`` go to :class:`Crawler`.
+    """
+    return Crawler(**options).run(seeds)
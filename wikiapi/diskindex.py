@@ -0,0 +1,338 @@
+"""Persistent, memory-mapped search index.
+
+:func:`write_index` serializes an :class:`~wikiapi.index.InvertedIndex` into
+one file; :class:`DiskIndex` opens it with ``mmap`` and answers the same
+queries without loading it.  Opening only reads the fixed-size header, so it
+takes the same few microseconds for any index size, and every process that
+opens the file shares its pages through the OS page cache.
+
+Layout (little-endian, sections 8-byte aligned, offsets in the header)::
+
+    header      magic, version, counts, avg length, k1, b, section offsets
+    terms       num_terms x (term_off u64, post_off u64, term_len u32,
+                              post_len u32, df u32), sorted by term bytes
+    term_blob   UTF-8 term strings
+    postings    per term: varint(docid delta), varint(tf), ...
+    norms       float32[num_docs]  BM25 length norms k1*(1-b+b*dl/avgdl)
+    lengths     uint32[num_docs]
+    pageids     int64[num_docs]    (-1 when unknown)
+    title_offs  uint64[num_docs+1] into title_blob
+    title_order uint32[num_docs]   doc IDs sorted by title, for lookups
+    title_blob  UTF-8 titles
+
+Fixed-width sections are read as zero-copy ``memoryview`` casts (or NumPy
+views when available).  Postings are delta/varint compressed, so a term's
+list is decoded on demand from its mapped bytes, vectorized with NumPy.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .index import InvertedIndex, SearchHit, np, rank_bm25, tokenize
+
+if TYPE_CHECKING:
+    from .centrality import PageRank
+
+__all__ = ["DiskIndex", "write_columns", "write_index"]
+
+MAGIC = b"WIKIIDX\x00"
+VERSION = 2
+_SECTIONS = ("terms", "term_blob", "postings", "norms", "lengths", "pageids",
+             "title_offs", "title_order", "title_blob")
+_HEADER = struct.Struct("<8sIIQQddd" + "Q" * len(_SECTIONS))
+_TERM = struct.Struct("<QQIII")
+
+
+def encode_varints(values, out: bytearray) -> None:
+    """Append LEB128 varints of non-negative ``values`` to ``out``."""
+    for v in values:
+        while v >= 0x80:
+            out.append((v & 0x7F) | 0x80)
+            v >>= 7
+        out.append(v)
+
+
+def decode_varints(buf) -> list[int]:
+    """Decode a run of LEB128 varints (pure-Python fallback)."""
+    out = []
+    value = shift = 0
+    for byte in buf:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            out.append(value)
+            value = shift = 0
+    return out
+
+
+def _decode_varints_np(raw):
+    """Vectorized LEB128 decoding of a uint8 array."""
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    position = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    parts = (raw & 0x7F).astype(np.uint64) << (7 * position).astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+def _encode_varints_np(values) -> bytes:
+    """Vectorized LEB128 encoding of non-negative integers."""
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        sizes += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(sizes) - sizes
+    position = np.arange(int(sizes.sum())) - np.repeat(starts, sizes)
+    out = ((np.repeat(values, sizes) >> (7 * position).astype(np.uint64))
+           & np.uint64(0x7F)).astype(np.uint8)
+    out[position < np.repeat(sizes, sizes) - 1] |= 0x80
+    return out.tobytes()
+
+
+def _encode_postings(docids, tfs) -> bytes:
+    """Delta-encode ``docids`` and interleave them with ``tfs`` as varints."""
+    if np is not None and len(docids) > 32:
+        ids = np.asarray(docids, dtype=np.int64)
+        pairs = np.empty(2 * len(ids), dtype=np.uint64)
+        pairs[0::2] = np.diff(ids, prepend=0)
+        pairs[1::2] = np.asarray(tfs, dtype=np.uint64)
+        return _encode_varints_np(pairs)
+    buf = bytearray()
+    prev = 0
+    pairs = []
+    for d, tf in zip(docids, tfs):
+        pairs.append(d - prev)
+        pairs.append(tf)
+        prev = d
+    encode_varints(pairs, buf)
+    return bytes(buf)
+
+
+def _align(fh) -> int:
+    pos = fh.tell()
+    pad = -pos % 8
+    if pad:
+        fh.write(b"\0" * pad)
+    return pos + pad
+
+
+def write_index(index: InvertedIndex, path: str | os.PathLike) -> None:
+    """Write ``index`` to ``path`` in the memory-mappable format."""
+    write_columns(path, index.titles, index.pageids, index.lengths,
+                  ((term, *index.postings[term]) for term in sorted(index.postings)),
+                  k1=index.k1, b=index.b)
+
+
+def write_columns(path: str | os.PathLike, titles: list[str], pageids, lengths,
+                  postings: Iterable[tuple[str, Any, Any]], *, k1: float = 1.2,
+                  b: float = 0.75) -> None:
+    """Write an index file from its raw columns.
+
+    ``postings`` yields ``(term, docids, tfs)`` in ascending term order (code
+    point order equals UTF-8 byte order); ``pageids`` uses -1 for unknown.
+    The file is written next to ``path`` and renamed into place.
+    """
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    num_docs = len(titles)
+    lengths = array("I", lengths)
+    total = sum(lengths)
+    avg = total / num_docs if num_docs else 0.0
+    offsets: dict[str, int] = {}
+    with open(tmp, "wb") as fh:
+        fh.write(b"\0" * _HEADER.size)
+
+        offsets["postings"] = _align(fh)
+        entries = []
+        blob = bytearray()
+        for term, docids, tfs in postings:
+            encoded = term.encode("utf-8")
+            buf = _encode_postings(docids, tfs)
+            entries.append((len(blob), fh.tell(), len(encoded), len(buf), len(docids)))
+            blob += encoded
+            fh.write(buf)
+
+        offsets["term_blob"] = _align(fh)
+        fh.write(blob)
+        offsets["terms"] = _align(fh)
+        for entry in entries:
+            fh.write(_TERM.pack(*entry))
+
+        scale = b / (avg or 1.0)
+        offsets["norms"] = _align(fh)
+        fh.write(array("f", (k1 * (1 - b + scale * dl) for dl in lengths)).tobytes())
+        offsets["lengths"] = _align(fh)
+        fh.write(lengths.tobytes())
+        offsets["pageids"] = _align(fh)
+        fh.write(array("q", pageids).tobytes())
+
+        encoded_titles = [t.encode("utf-8") for t in titles]
+        title_offs = array("Q", [0])
+        for t in encoded_titles:
+            title_offs.append(title_offs[-1] + len(t))
+        offsets["title_offs"] = _align(fh)
+        fh.write(title_offs.tobytes())
+        offsets["title_order"] = _align(fh)
+        fh.write(array("I", sorted(range(num_docs), key=titles.__getitem__)).tobytes())
+        offsets["title_blob"] = _align(fh)
+        fh.write(b"".join(encoded_titles))
+
+        fh.seek(0)
+        fh.write(_HEADER.pack(MAGIC, VERSION, 0, num_docs, len(entries), avg, k1, b,
+                              *(offsets[name] for name in _SECTIONS)))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class DiskIndex:
+    """Read-only BM25 index served straight from a memory-mapped file."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        (magic, version, _flags, self.num_docs, self.num_terms, self.avg_length,
+         self.k1, self.b, *offsets) = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a WikiAPI index")
+        if version != VERSION:
+            raise ValueError(f"unsupported index version {version}")
+        self._off = dict(zip(_SECTIONS, offsets))
+        n = self.num_docs
+        self.norms = self._view("norms", "f", n)
+        self.lengths = self._view("lengths", "I", n)
+        self.pageids = self._view("pageids", "q", n)
+        self._title_offs = self._view("title_offs", "Q", n + 1)
+        self._title_order = self._view("title_order", "I", n)
+
+    def _view(self, section: str, fmt: str, count: int):
+        start = self._off[section]
+        if np is not None:
+            return np.frombuffer(self._mm, dtype=np.dtype(fmt).newbyteorder("<"),
+                                 count=count, offset=start)
+        return self._buf[start:start + count * struct.calcsize(fmt)].cast(fmt)
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def title(self, docid: int) -> str:
+        start = self._off["title_blob"]
+        lo, hi = int(self._title_offs[docid]), int(self._title_offs[docid + 1])
+        return bytes(self._buf[start + lo:start + hi]).decode("utf-8")
+
+    def find(self, title: str) -> int | None:
+        """Document ID of ``title``, by binary search over the title order."""
+        order = self._title_order
+        lo, hi = 0, self.num_docs
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.title(int(order[mid])) < title:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_docs and self.title(int(order[lo])) == title:
+            return int(order[lo])
+        return None
+
+    def _term(self, i: int) -> tuple[bytes, int, int, int]:
+        term_off, post_off, term_len, post_len, df = _TERM.unpack_from(
+            self._buf, self._off["terms"] + i * _TERM.size)
+        start = self._off["term_blob"] + term_off
+        return bytes(self._buf[start:start + term_len]), post_off, post_len, df
+
+    def lookup(self, term: str) -> tuple[int, int, int] | None:
+        """Binary-search the term dictionary; ``(offset, length, df)`` or None."""
+        key = term.encode("utf-8")
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = self._term(mid)[0]
+            if candidate < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_terms:
+            candidate, post_off, post_len, df = self._term(lo)
+            if candidate == key:
+                return post_off, post_len, df
+        return None
+
+    def _decode(self, post_off: int, post_len: int):
+        if np is not None:
+            raw = np.frombuffer(self._mm, dtype=np.uint8, count=post_len, offset=post_off)
+            values = _decode_varints_np(raw)
+            docids = np.cumsum(values[0::2]).astype(np.uint32)
+            return docids, values[1::2].astype(np.uint32)
+        values = decode_varints(self._buf[post_off:post_off + post_len])
+        docids = array("I")
+        prev = 0
+        for delta in values[0::2]:
+            prev += delta
+            docids.append(prev)
+        return docids, array("I", values[1::2])
+
+    def postings(self, term: str):
+        """Decoded ``(docids, tfs)`` of ``term``, or ``None`` if absent."""
+        found = self.lookup(term)
+        if found is None:
+            return None
+        return self._decode(*found[:2])
+
+    def iter_terms(self) -> Iterator[tuple[str, Any, Any]]:
+        """Yield ``(term, docids, tfs)`` for every term in term order."""
+        for i in range(self.num_terms):
+            term, post_off, post_len, _df = self._term(i)
+            yield (term.decode("utf-8"), *self._decode(post_off, post_len))
+
+    def search(self, query: str, k: int = 10, *, priors: PageRank | None = None
+               ) -> list[SearchHit]:
+        """Return the ``k`` best documents for ``query`` by BM25 score.
+
+        With ``priors``, each document's PageRank boost is added to its score.
+        """
+        postings = [p for t in dict.fromkeys(tokenize(query))
+                    if (p := self.postings(t)) is not None]
+        if not postings or k <= 0:
+            return []
+        best = rank_bm25(postings, self.norms, self.num_docs, k, self.k1,
+                         None if priors is None else priors.column(self))
+        hits = []
+        for score, docid in best:
+            pageid = int(self.pageids[docid])
+            hits.append(SearchHit(docid, self.title(docid), None if pageid < 0 else pageid,
+                                  score))
+        return hits
+
+    def close(self) -> None:
+        views = [self.norms, self.lengths, self.pageids, self._title_offs, self._title_order]
+        self.norms = self.lengths = self.pageids = self._title_offs = self._title_order = None
+        for view in views:
+            if isinstance(view, memoryview):
+                view.release()
+        del views
+        self._buf.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # NumPy views handed out to callers still pin the mapping; it
+            # is unmapped when the last of them is garbage collected.
+            pass
+
+    def __enter__(self) -> DiskIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
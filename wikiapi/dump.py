@@ -0,0 +1,336 @@
+"""Offline access to ``pages-articles-multistream.xml.bz2`` dumps.
+
+A multistream dump is a concatenation of independent bzip2 streams, each
+holding about 100 ``<page>`` elements (the first one holds the
+``<siteinfo>`` header).  The companion ``...-multistream-index.txt.bz2``
+lists ``offset:pageid:title`` for every page, where ``offset`` is the byte
+position of the stream containing it.
+
+:class:`DumpReader` streams the whole dump through an incremental XML parser
+in constant memory, or, given the index, seeks straight to one stream and
+decompresses only that (~100 pages) to fetch a single article.  Because the
+streams are independent, :meth:`DumpReader.iter_pages_parallel` can also
+decompress and parse them on every core.  All paths yield the same
+:class:`~wikiapi.article.Article` objects as the live API.
+"""
+
+from __future__ import annotations
+
+import bisect
+import bz2
+import os
+import xml.etree.ElementTree as ET
+from collections import deque
+from collections.abc import Collection, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from .article import Article
+
+if TYPE_CHECKING:
+    from .redirects import RedirectMap
+
+__all__ = ["DumpReader", "MultistreamIndex", "find_stream_offsets", "iter_index"]
+
+_CHUNK = 1 << 16
+# "BZh9" stream header followed by the block magic (BCD digits of pi).
+_STREAM_MAGIC = b"BZh91AY&SY"
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _open_text(path: str | os.PathLike) -> BinaryIO:
+    path = Path(path)
+    return bz2.open(path, "rb") if path.suffix == ".bz2" else open(path, "rb")
+
+
+def iter_index(path: str | os.PathLike) -> Iterator[tuple[int, int, str]]:
+    """Yield ``(offset, pageid, title)`` from a (possibly bz2) index file."""
+    with _open_text(path) as fh:
+        for raw in fh:
+            line = raw.decode("utf-8").rstrip("\n")
+            if not line:
+                continue
+            offset, pageid, title = line.split(":", 2)
+            yield int(offset), int(pageid), title
+
+
+class MultistreamIndex:
+    """The multistream index, loaded for lookups by title or page ID."""
+
+    def __init__(self, entries: Iterable[tuple[int, int, str]] = ()):
+        self.by_title: dict[str, tuple[int, int]] = {}
+        self.by_pageid: dict[int, int] = {}
+        offsets = set()
+        for offset, pageid, title in entries:
+            self.by_title[title] = (offset, pageid)
+            self.by_pageid[pageid] = offset
+            offsets.add(offset)
+        #: Start of every stream that holds pages, ascending.
+        self.offsets: list[int] = sorted(offsets)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> MultistreamIndex:
+        return cls(iter_index(path))
+
+    def __len__(self) -> int:
+        return len(self.by_title)
+
+    def __contains__(self, title: str) -> bool:
+        return title in self.by_title
+
+    def stream_end(self, offset: int, file_size: int) -> int:
+        """Byte position where the stream starting at ``offset`` ends."""
+        i = bisect.bisect_right(self.offsets, offset)
+        return self.offsets[i] if i < len(self.offsets) else file_size
+
+
+def _text(elem: ET.Element | None) -> str:
+    return elem.text or "" if elem is not None else ""
+
+
+def page_to_article(page: ET.Element) -> Article:
+    """Convert a ``<page>`` element into an :class:`Article`."""
+    fields: dict[str, ET.Element] = {}
+    revision = None
+    for child in page:
+        name = _local(child.tag)
+        if name == "revision":
+            revision = child
+        else:
+            fields[name] = child
+    revid = None
+    text = ""
+    if revision is not None:
+        for child in revision:
+            name = _local(child.tag)
+            if name == "id":
+                revid = int(child.text)
+            elif name == "text":
+                text = child.text or ""
+    redirect = fields.get("redirect")
+    return Article(
+        title=_text(fields.get("title")),
+        pageid=int(fields["id"].text) if "id" in fields else None,
+        ns=int(_text(fields.get("ns")) or 0),
+        revid=revid,
+        text=text,
+        redirect=redirect.get("title") if redirect is not None else None,
+    )
+
+
+def parse_pages(chunks: Iterable[bytes],
+                namespaces: Collection[int] | None = None) -> Iterator[Article]:
+    """Incrementally parse XML ``chunks`` and yield one article per page.
+
+    Finished pages are dropped from the tree right away, so memory stays at
+    one page however long the input is.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if _local(elem.tag) != "page":
+                continue
+            article = page_to_article(elem)
+            root.clear()
+            if namespaces is None or article.ns in namespaces:
+                yield article
+    parser.close()
+
+
+def _read_stream(fh: BinaryIO, offset: int) -> bytes:
+    """Decompress the single bzip2 stream starting at ``offset``."""
+    fh.seek(offset)
+    decompressor = bz2.BZ2Decompressor()
+    out = []
+    while not decompressor.eof:
+        chunk = fh.read(_CHUNK)
+        if not chunk:
+            break
+        out.append(decompressor.decompress(chunk))
+    return b"".join(out)
+
+
+def find_stream_offsets(path: str | os.PathLike) -> list[int]:
+    """Locate every bzip2 stream in a multistream dump without its index.
+
+    Scans for the stream header magic, which is 80 bits long and therefore
+    practically never occurs inside compressed data by accident.
+    """
+    offsets = []
+    overlap = len(_STREAM_MAGIC) - 1
+    with open(path, "rb") as fh:
+        base = 0
+        tail = b""
+        while chunk := fh.read(1 << 22):
+            data = tail + chunk
+            start = 0
+            while (pos := data.find(_STREAM_MAGIC, start)) >= 0:
+                offsets.append(base - len(tail) + pos)
+                start = pos + 1
+            tail = data[-overlap:]
+            base += len(chunk)
+    return offsets
+
+
+def _parse_range(path: str, start: int, end: int,
+                 namespaces: Collection[int] | None) -> list[Article]:
+    """Worker: decompress and parse the streams in ``[start, end)``."""
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        raw = fh.read(end - start)
+    data = bz2.decompress(raw)
+    return list(parse_pages([_page_fragment(data)], namespaces))
+
+
+def _page_fragment(data: bytes) -> bytes:
+    """Wrap one stream's pages in a root element, dropping header/footer."""
+    start = data.find(b"<page>")
+    end = data.rfind(b"</page>")
+    if start < 0 or end < 0:
+        return b"<pages/>"
+    return b"<pages>" + data[start:end + len(b"</page>")] + b"</pages>"
+
+
+class DumpReader:
+    """Read articles from a multistream XML dump.
+
+    ``index`` may be a :class:`MultistreamIndex` or the path of the index
+    file; it is only needed for random access (:meth:`get`,
+    :meth:`read_stream`).  With a :class:`~wikiapi.redirects.RedirectMap`
+    as ``redirects``, titles not in the index are looked up as their
+    normalized redirect target.
+    """
+
+    def __init__(self, path: str | os.PathLike,
+                 index: MultistreamIndex | str | os.PathLike | None = None, *,
+                 redirects: RedirectMap | None = None):
+        self.path = Path(path)
+        if index is not None and not isinstance(index, MultistreamIndex):
+            index = MultistreamIndex.load(index)
+        self.index = index
+        self.redirects = redirects
+        self._fh: BinaryIO | None = None
+
+    def __iter__(self) -> Iterator[Article]:
+        return self.iter_pages()
+
+    def iter_pages(self, namespaces: Collection[int] | None = (0,)) -> Iterator[Article]:
+        """Stream every page of the dump in file order.
+
+        Only pages in ``namespaces`` are yielded; pass ``None`` for all.
+        """
+        with bz2.open(self.path, "rb") as fh:
+            yield from parse_pages(iter(lambda: fh.read(_CHUNK), b""), namespaces)
+
+    def stream_ranges(self, streams_per_task: int = 16) -> list[tuple[int, int]]:
+        """Byte ranges covering the dump, each spanning whole bzip2 streams."""
+        if self.index is not None and self.index.offsets:
+            offsets = self.index.offsets
+        else:
+            offsets = find_stream_offsets(self.path)
+        size = self.path.stat().st_size
+        starts = offsets[::streams_per_task]
+        ends = starts[1:] + [size]
+        return list(zip(starts, ends))
+
+    def iter_pages_parallel(self, workers: int | None = None, *, ordered: bool = True,
+                            namespaces: Collection[int] | None = (0,),
+                            streams_per_task: int = 16) -> Iterator[Article]:
+        """Decompress and parse the dump on ``workers`` processes.
+
+        The dump is cut at multistream boundaries (from the index if there
+        is one, else by scanning for stream headers) into tasks of
+        ``streams_per_task`` streams.  With ``ordered=True`` articles come out
+        in file (page) order; otherwise each task's articles are yielded as
+        soon as it finishes.  At most ``2 * workers`` tasks are pending at a
+        time, so memory stays bounded on dumps of any size.
+        """
+        workers = workers or os.cpu_count() or 1
+        ranges = iter(self.stream_ranges(streams_per_task))
+        path = str(self.path)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            def submit() -> Future | None:
+                task = next(ranges, None)
+                if task is None:
+                    return None
+                return pool.submit(_parse_range, path, task[0], task[1], namespaces)
+
+            pending: deque[Future] = deque()
+            for _ in range(2 * workers):
+                if (future := submit()) is None:
+                    break
+                pending.append(future)
+            if ordered:
+                while pending:
+                    articles = pending.popleft().result()
+                    if (future := submit()) is not None:
+                        pending.append(future)
+                    yield from articles
+            else:
+                running = set(pending)
+                while running:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for finished in done:
+                        if (future := submit()) is not None:
+                            running.add(future)
+                        yield from finished.result()
+
+    def read_stream(self, offset: int) -> list[Article]:
+        """Decompress and parse the ~100 pages of the stream at ``offset``."""
+        if self._fh is None:
+            self._fh = open(self.path, "rb")
+        data = _read_stream(self._fh, offset)
+        return list(parse_pages([_page_fragment(data)], None))
+
+    def _entry(self, title: str) -> tuple[int, int] | None:
+        by_title = self.index.by_title
+        entry = by_title.get(title)
+        if entry is None and self.redirects is not None:
+            entry = by_title.get(self.redirects.resolve(title))
+        return entry
+
+    def get(self, title: str) -> Article | None:
+        """Fetch one article by title without decompressing the whole dump."""
+        if self.index is None:
+            raise ValueError("random access needs the multistream index")
+        entry = self._entry(title)
+        if entry is None:
+            return None
+        offset, pageid = entry
+        for article in self.read_stream(offset):
+            if article.pageid == pageid:
+                return article
+        return None
+
+    def get_many(self, titles: Iterable[str]) -> list[Article | None]:
+        """Fetch several articles, decompressing each needed stream once."""
+        if self.index is None:
+            raise ValueError("random access needs the multistream index")
+        wanted = [self._entry(t) for t in titles]
+        pages: dict[int, Article] = {}
+        for offset in sorted({e[0] for e in wanted if e is not None}):
+            for article in self.read_stream(offset):
+                if article.pageid is not None:
+                    pages[article.pageid] = article
+        return [pages.get(e[1]) if e is not None else None for e in wanted]
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> DumpReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,34 @@
+"""Exception types raised by WikiAPI."""
+
+from __future__ import annotations
+
+
+class WikiAPIError(Exception):
+    """Base class for every error raised by this package."""
+
+
+class HTTPError(WikiAPIError):
+    """The server answered with a non-success HTTP status."""
+
+    def __init__(self, status: int, url: str, headers: dict[str, str] | None = None):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+        self.headers = headers or {}
+
+
+class APIError(WikiAPIError):
+    """The MediaWiki API returned an ``error`` object."""
+
+    def __init__(self, code: str, info: str = ""):
+        super().__init__(f"{code}: {info}" if info else code)
+        self.code = code
+        self.info = info
+
+
+class RedirectLoopError(WikiAPIError):
+    """A chain of redirects leads back to a title it already passed."""
+
+    def __init__(self, titles: list[str]):
+        super().__init__("redirect loop: " + " -> ".join(titles))
+        self.titles = titles
@@ -0,0 +1,357 @@
+"""Crawl frontier that spills to disk and survives restarts.
+
+The frontier is a priority queue (lowest ``priority`` first) whose hot part
+is an in-memory heap of at most ``hot_size`` entries.  When the heap grows
+past that, its worse half is appended to an on-disk segment file and read
+back in chunks once the heap runs low, so ordering across spills is
+approximate while memory stays bounded.
+
+With a ``directory`` the frontier is also durable:
+
+``segment.jsonl``
+    append-only spill file; a read cursor marks how far it has been consumed.
+``journal-<generation>.jsonl``
+    every push, completed page and crawled page ID since the last checkpoint.
+``checkpoint.pickle``
+    the seen and done sets, the page-ID bitmaps, the heap, the entries handed out but not yet
+    completed, and the segment cursors, written atomically.
+
+Reopening a directory loads the checkpoint, cuts the segment back to its
+checkpointed length, replays the journal and puts in-flight entries back in
+the queue, so pages that were completed are never fetched again.  The
+journal is flushed every ``flush_interval`` seconds; a hard crash can lose
+at most that much progress.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any, NamedTuple
+
+from .visited import PageIdBitmap, VisitedSet
+
+__all__ = ["Frontier", "FrontierEntry"]
+
+_CHECKPOINT = "checkpoint.pickle"
+_SEGMENT = "segment.jsonl"
+
+
+class FrontierEntry(NamedTuple):
+    """A page waiting to be crawled; tuples order by priority, then age."""
+
+    priority: float
+    seq: int
+    endpoint: str
+    title: str
+    depth: int
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return (self.endpoint, self.title)
+
+
+class Frontier:
+    """Priority queue of pages to crawl plus the set of pages already seen.
+
+    By default the seen and done sets are exact ``set`` objects.  With
+    ``error_rate`` they become :class:`~wikiapi.visited.VisitedSet` Bloom
+    filters that use a few bytes per page instead of a few hundred, at the
+    price of skipping a never-seen page with probability ``error_rate``.
+    Page IDs of crawled pages are always kept exactly, in one
+    :class:`~wikiapi.visited.PageIdBitmap` per wiki.
+    """
+
+    def __init__(self, directory: str | os.PathLike | None = None, *, hot_size: int = 100_000,
+                 checkpoint_interval: float = 60.0, flush_interval: float = 1.0,
+                 error_rate: float | None = None):
+        if hot_size < 2:
+            raise ValueError("hot_size must be at least 2")
+        self.directory = Path(directory) if directory is not None else None
+        self.hot_size = hot_size
+        self.checkpoint_interval = checkpoint_interval
+        self.flush_interval = flush_interval
+        self.seen: set[tuple[str, str]] | VisitedSet = set()
+        self.done: set[tuple[str, str]] | VisitedSet = set()
+        if error_rate is not None:
+            self.seen = VisitedSet(error_rate)
+            self.done = VisitedSet(error_rate)
+        self.pageids: dict[str, PageIdBitmap] = {}
+        self._heap: list[FrontierEntry] = []
+        self._in_flight: dict[tuple[str, str], FrontierEntry] = {}
+        self._seq = itertools.count()
+        self._spilled = 0
+        self._segment: IO[bytes] | None = None
+        self._segment_read = 0
+        self._journal: IO[str] | None = None
+        self._generation = 0
+        self._last_checkpoint = self._last_flush = time.monotonic()
+        self.resumed = False
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._open()
+
+    # -- queue -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._heap) + self._spilled
+
+    def add(self, endpoint: str, title: str, depth: int = 0,
+            priority: float | None = None) -> bool:
+        """Queue a page unless it was seen before; return whether it was queued."""
+        key = (endpoint, title)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        entry = FrontierEntry(depth if priority is None else priority, next(self._seq),
+                              endpoint, title, depth)
+        self._log(["p", entry.priority, endpoint, title, depth])
+        self._push(entry)
+        return True
+
+    def mark_seen(self, endpoint: str, title: str) -> None:
+        """Remember a page (e.g. a redirect target) without queueing it."""
+        key = (endpoint, title)
+        if key not in self.seen:
+            self.seen.add(key)
+            self._log(["s", endpoint, title])
+
+    def add_pageid(self, endpoint: str, pageid: int) -> bool:
+        """Record a crawled page ID; ``False`` means the page was crawled before.
+
+        Different titles (redirects, alternative spellings) can lead to the
+        same page, which only its ID reveals.
+        """
+        bitmap = self.pageids.get(endpoint)
+        if bitmap is None:
+            bitmap = self.pageids[endpoint] = PageIdBitmap()
+        if not bitmap.add(pageid):
+            return False
+        self._log(["i", endpoint, pageid])
+        return True
+
+    def has_pageid(self, endpoint: str, pageid: int) -> bool:
+        """Whether a page with this ID was completed on ``endpoint``."""
+        bitmap = self.pageids.get(endpoint)
+        return bitmap is not None and pageid in bitmap
+
+    def pop(self) -> FrontierEntry | None:
+        """Hand out the best queued entry, or ``None`` if the queue is empty."""
+        while True:
+            if not self._heap and self._spilled:
+                self._refill()
+            if not self._heap:
+                return None
+            entry = heapq.heappop(self._heap)
+            if entry.key not in self.done:
+                self._in_flight[entry.key] = entry
+                return entry
+
+    def pop_batch(self, size: int) -> list[FrontierEntry]:
+        batch = []
+        while len(batch) < size and (entry := self.pop()) is not None:
+            batch.append(entry)
+        return batch
+
+    def complete(self, entry: FrontierEntry, pageid: int | None = None) -> None:
+        """Record that ``entry`` was crawled (or given up on) for good.
+
+        ``pageid`` is the ID of the page it was crawled as, if any; it is only
+        recorded now, so a page fetched but not yet completed when the crawl
+        stops is fetched again on resume instead of being taken for a
+        duplicate.
+        """
+        if pageid is not None:
+            self.add_pageid(entry.endpoint, pageid)
+        self._in_flight.pop(entry.key, None)
+        self.done.add(entry.key)
+        self._log(["d", entry.endpoint, entry.title])
+
+    def retry(self, entry: FrontierEntry) -> None:
+        """Queue a handed-out ``entry`` again, e.g. after its fetch failed."""
+        self._in_flight.pop(entry.key, None)
+        # Not journaled: handing out an entry is not journaled either, so a
+        # restore already queues it again, and a record here would queue it twice.
+        self._push(entry._replace(seq=next(self._seq)))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def _push(self, entry: FrontierEntry) -> None:
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > self.hot_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Move the worse half of the heap to the segment file."""
+        self._heap.sort()
+        keep = self.hot_size // 2
+        cold = self._heap[keep:]
+        del self._heap[keep:]
+        segment = self._segment_file()
+        segment.seek(0, os.SEEK_END)
+        segment.write(b"".join(_encode(e) for e in cold))
+        self._spilled += len(cold)
+
+    def _refill(self) -> None:
+        segment = self._segment_file()
+        segment.flush()
+        segment.seek(self._segment_read)
+        for _ in range(min(self._spilled, max(1, self.hot_size // 2))):
+            line = segment.readline()
+            self._spilled -= 1
+            entry = _decode(line, next(self._seq))
+            self._heap.append(entry)
+        self._segment_read = segment.tell()
+        heapq.heapify(self._heap)
+
+    def _segment_file(self) -> IO[bytes]:
+        if self._segment is None:
+            if self.directory is not None:
+                path = self.directory / _SEGMENT
+                self._segment = open(path, "r+b" if path.exists() else "w+b")
+            else:
+                self._segment = tempfile.TemporaryFile()
+        return self._segment
+
+    # -- durability --------------------------------------------------------
+
+    def _log(self, record: list[Any]) -> None:
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._journal.flush()
+            self._last_flush = now
+
+    def _journal_path(self, generation: int) -> Path:
+        assert self.directory is not None
+        return self.directory / f"journal-{generation}.jsonl"
+
+    def _open(self) -> None:
+        assert self.directory is not None
+        checkpoint = self.directory / _CHECKPOINT
+        if checkpoint.exists():
+            with open(checkpoint, "rb") as fh:
+                state = pickle.load(fh)
+            self._restore(state)
+            self.resumed = True
+        self._journal = open(self._journal_path(self._generation), "a", encoding="utf-8")
+        if not checkpoint.exists():
+            # Checkpoint immediately so that the journal always has a base.
+            self.checkpoint()
+
+    def _restore(self, state: dict[str, Any]) -> None:
+        self._generation = state["generation"]
+        self.seen = state["seen"]
+        self.done = state["done"]
+        self.pageids = state["pageids"]
+        self._seq = itertools.count(state["seq"])
+        segment = self._segment_file()
+        # Anything spilled after the checkpoint is also in the heap or journal.
+        segment.truncate(state["segment_end"])
+        self._segment_read = state["segment_read"]
+        self._spilled = state["spilled"]
+        for entry in itertools.chain(state["heap"], state["in_flight"]):
+            self._push(FrontierEntry(*entry))
+        journal = self._journal_path(self._generation)
+        if journal.exists():
+            for record in _read_journal(journal):
+                kind = record[0]
+                if kind == "p":
+                    _, priority, endpoint, title, depth = record
+                    self.seen.add((endpoint, title))
+                    self._push(FrontierEntry(priority, next(self._seq), endpoint, title, depth))
+                elif kind == "s":
+                    self.seen.add((record[1], record[2]))
+                elif kind == "d":
+                    self.done.add((record[1], record[2]))
+                elif kind == "i":
+                    self.pageids.setdefault(record[1], PageIdBitmap()).add(record[2])
+
+    def checkpoint(self) -> None:
+        """Persist the full frontier state and start a fresh journal."""
+        if self.directory is None:
+            return
+        segment = self._segment_file()
+        segment.flush()
+        os.fsync(segment.fileno())
+        segment_end = segment.seek(0, os.SEEK_END)
+        state = {
+            "generation": self._generation + 1,
+            "seen": self.seen,
+            "done": self.done,
+            "pageids": self.pageids,
+            "seq": next(self._seq),
+            "heap": [tuple(e) for e in self._heap],
+            "in_flight": [tuple(e) for e in self._in_flight.values()],
+            "segment_read": self._segment_read,
+            "segment_end": segment_end,
+            "spilled": self._spilled,
+        }
+        tmp = self.directory / (_CHECKPOINT + ".tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.directory / _CHECKPOINT)
+        old = self._generation
+        self._generation += 1
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self._journal_path(self._generation), "a", encoding="utf-8")
+        self._journal_path(old).unlink(missing_ok=True)
+        self._last_checkpoint = time.monotonic()
+
+    def maybe_checkpoint(self) -> bool:
+        """Checkpoint if ``checkpoint_interval`` seconds have passed."""
+        if self.directory is None:
+            return False
+        if time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return False
+        self.checkpoint()
+        return True
+
+    def close(self) -> None:
+        self.checkpoint()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def __enter__(self) -> Frontier:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _encode(entry: FrontierEntry) -> bytes:
+    record = [entry.priority, entry.endpoint, entry.title, entry.depth]
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _decode(line: bytes, seq: int) -> FrontierEntry:
+    priority, endpoint, title, depth = json.loads(line)
+    return FrontierEntry(priority, seq, endpoint, title, depth)
+
+
+def _read_journal(path: Path) -> Iterator[list[Any]]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-write.
+                return
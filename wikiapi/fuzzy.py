@@ -0,0 +1,314 @@
+"""Typo-tolerant title lookup.
+
+:class:`FuzzyTitleIndex` finds the titles within a small edit distance of a
+misspelled query, locally and in well under a millisecond, instead of
+relying on the remote search's "did you mean".
+
+Candidate generation is a pigeonhole partition filter, a relative of the
+symmetric-delete (SymSpell) scheme that needs a fixed number of entries
+per title instead of one per deletion variant.  A title of length ``L`` is
+cut into ``max_distance + 2`` chunks at fixed positions, and each chunk is
+indexed under a BLAKE2b hash of ``(chunk, chunk number, L)``.  ``d`` edits
+can touch at most ``d`` chunks, so a title within distance ``d`` of the
+query has at least two chunks that occur verbatim in the query, shifted by
+at most ``d`` characters.  A query therefore probes every title length
+within ``d`` of its own, every chunk and every shift.  Titles hit by two
+or more distinct chunks are verified with a banded Levenshtein distance.
+Transpositions count as two edits.
+
+Titles shorter than ``max_distance + 2`` characters cannot be cut into
+that many chunks.  They are indexed the symmetric-delete way instead: every
+string left after deleting up to ``max_distance`` of their characters is
+indexed under its hash, and a query short enough to be near one of them
+probes its own deletion variants.  Two strings within ``d`` edits always
+share a variant with at most ``d`` deletions from each.
+
+The entries are ``hash << 32 | title number`` in one sorted ``uint64``
+array: eight bytes per chunk, four chunks per title at distance 2.  Like
+:class:`~wikiapi.complete.TitleCompleter`, the index is one flat buffer
+that :meth:`~FuzzyTitleIndex.save` writes and :meth:`~FuzzyTitleIndex.open`
+maps back::
+
+    header      magic, version, counts, max_distance, section offsets
+    entries     uint64[e] sorted chunk hashes with title numbers
+    deletes     uint64[s] sorted deletion-variant hashes of titles too short to chunk
+    title_offs  uint64[n+1] into title_blob
+    title_blob  UTF-8 titles
+    weights     float32[n]
+"""
+
+from __future__ import annotations
+
+import bisect
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Iterable
+from hashlib import blake2b
+from pathlib import Path
+
+from .complete import normalize_prefix
+from .index import np
+
+__all__ = ["FuzzyTitleIndex", "levenshtein"]
+
+MAGIC = b"WIKIFZ\x00\x00"
+VERSION = 3
+_SECTIONS = ("entries", "deletes", "title_offs", "title_blob", "weights")
+_HEADER = struct.Struct("<8sIIQQQI4x" + "Q" * len(_SECTIONS))
+_CHUNK_PREFIX = struct.Struct("<BI")
+
+
+def levenshtein(a: str, b: str, limit: int) -> int:
+    """Edit distance of ``a`` and ``b``, or ``limit + 1`` if it exceeds ``limit``.
+
+    Only the diagonal band of width ``2 * limit + 1`` is computed.
+    """
+    n, m = len(a), len(b)
+    if abs(n - m) > limit:
+        return limit + 1
+    over = limit + 1
+    previous = list(range(m + 1))
+    for i in range(1, n + 1):
+        lo, hi = max(1, i - limit), min(m, i + limit)
+        current = [over] * (m + 1)
+        current[0] = i if i <= limit else over
+        ca = a[i - 1]
+        best = current[0]
+        for j in range(lo, hi + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return over
+        previous = current
+    return min(previous[m], over)
+
+
+def _chunk_key(chunk: str, number: int, length: int) -> int:
+    # A keyed CRC would be linear in its seed, so different triples could
+    # collide by construction; BLAKE2b mixes the three parts properly.
+    return _hash32(_CHUNK_PREFIX.pack(number, length) + chunk.encode("utf-8"))
+
+
+def _delete_key(variant: str) -> int:
+    return _hash32(variant.encode("utf-8"))
+
+
+def _hash32(data: bytes) -> int:
+    return int.from_bytes(blake2b(data, digest_size=4).digest(), "little")
+
+
+def _deletes(word: str, d: int) -> set[str]:
+    """``word`` and every string left after deleting up to ``d`` of its characters."""
+    variants = layer = {word}
+    for _ in range(d):
+        layer = {w[:i] + w[i + 1:] for w in layer for i in range(len(w))}
+        variants = variants | layer
+    return variants
+
+
+def _probe(entries, hashes: list[int]):
+    """Title numbers stored under each of ``hashes``, concatenated, and their counts."""
+    if np is not None:
+        probes = np.array(hashes, dtype=np.uint64) << np.uint64(32)
+        lo = np.searchsorted(entries, probes)
+        hi = np.searchsorted(entries, probes + np.uint64(1 << 32))
+        sizes = hi - lo
+        total = int(sizes.sum())
+        starts = np.repeat(lo - np.cumsum(sizes) + sizes, sizes)
+        return entries[starts + np.arange(total)] & np.uint64(0xFFFFFFFF), sizes
+    found, sizes = [], []
+    for h in hashes:
+        start = bisect.bisect_left(entries, h << 32)
+        end = bisect.bisect_left(entries, (h + 1) << 32, start)
+        found.extend(entries[j] & 0xFFFFFFFF for j in range(start, end))
+        sizes.append(end - start)
+    return found, sizes
+
+
+def _bounds(length: int, chunks: int) -> list[tuple[int, int]]:
+    return [(i * length // chunks, (i + 1) * length // chunks) for i in range(chunks)]
+
+
+class FuzzyTitleIndex:
+    """Titles within ``max_distance`` edits of a query, best first."""
+
+    def __init__(self, data: bytes | mmap.mmap):
+        self._data = data
+        self._buf = memoryview(data)
+        (magic, version, _flags, n, e, s, self.max_distance,
+         *offsets) = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a WikiAPI fuzzy title index")
+        if version != VERSION:
+            raise ValueError(f"unsupported fuzzy index version {version}")
+        off = dict(zip(_SECTIONS, offsets))
+        self.chunks = self.max_distance + 2
+        self._entries = self._view(off["entries"], "Q", e)
+        self._deletes = self._view(off["deletes"], "Q", s)
+        self._title_offs = self._view(off["title_offs"], "Q", n + 1)
+        self._title_start = off["title_blob"]
+        self.weights = self._view(off["weights"], "f", n)
+
+    def _view(self, start: int, fmt: str, count: int):
+        if np is not None:
+            return np.frombuffer(self._data, dtype=np.dtype(fmt).newbyteorder("<"),
+                                 count=count, offset=start)
+        return self._buf[start:start + count * struct.calcsize(fmt)].cast(fmt)
+
+    @classmethod
+    def from_titles(cls, titles: Iterable[str | tuple[str, float]], *,
+                    max_distance: int = 2) -> FuzzyTitleIndex:
+        """Build from titles or ``(title, weight)`` pairs (bare titles weigh 1).
+
+        Among matches at the same distance, heavier titles rank first.
+        """
+        if not 0 <= max_distance <= 8:
+            raise ValueError("max_distance must be between 0 and 8")
+        chunks = max_distance + 2
+        names: list[bytes] = []
+        weights = array("f")
+        deletes = array("Q")
+        entries = array("Q")
+        for item in titles:
+            title, weight = (item, 1.0) if isinstance(item, str) else item
+            title = title.replace("_", " ")
+            number = len(names)
+            names.append(title.encode("utf-8"))
+            weights.append(weight)
+            key = normalize_prefix(title)
+            length = len(key)
+            if length < chunks:
+                deletes.extend(_delete_key(variant) << 32 | number
+                               for variant in _deletes(key, max_distance))
+                continue
+            for i, (start, end) in enumerate(_bounds(length, chunks)):
+                entries.append(_chunk_key(key[start:end], i, length) << 32 | number)
+        if np is not None:
+            entries = np.sort(np.frombuffer(entries, dtype=np.uint64)).tobytes()
+            deletes = np.sort(np.frombuffer(deletes, dtype=np.uint64)).tobytes()
+        else:
+            entries = array("Q", sorted(entries)).tobytes()
+            deletes = array("Q", sorted(deletes)).tobytes()
+        title_offs = array("Q", [0])
+        for name in names:
+            title_offs.append(title_offs[-1] + len(name))
+        sections = [entries, deletes, title_offs.tobytes(), b"".join(names),
+                    weights.tobytes()]
+        offsets = []
+        pos = _HEADER.size
+        for section in sections:
+            pos += -pos % 8
+            offsets.append(pos)
+            pos += len(section)
+        data = bytearray(pos)
+        _HEADER.pack_into(data, 0, MAGIC, VERSION, 0, len(names), len(entries) // 8,
+                          len(deletes) // 8, max_distance, *offsets)
+        for start, section in zip(offsets, sections):
+            data[start:start + len(section)] = section
+        return cls(bytes(data))
+
+    def save(self, path: str | os.PathLike) -> None:
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(self._buf)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: str | os.PathLike) -> FuzzyTitleIndex:
+        """Map an index written by :meth:`save` without reading it."""
+        with open(path, "rb") as fh:
+            return cls(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return len(self._title_offs) - 1
+
+    def title(self, i: int) -> str:
+        start = self._title_start
+        lo, hi = int(self._title_offs[i]), int(self._title_offs[i + 1])
+        return bytes(self._buf[start + lo:start + hi]).decode("utf-8")
+
+    def _probes(self, key: str, d: int) -> tuple[list[int], list[int]]:
+        """Chunk hashes to look up for ``key``, with their chunk numbers.
+
+        Probes are kept as ``(hash, chunk number)`` pairs: two chunks that
+        hash alike must still count as two distinct chunks.
+        """
+        m = len(key)
+        probes: dict[tuple[int, int], None] = {}
+        for length in range(max(self.chunks, m - d), m + d + 1):
+            for i, (start, end) in enumerate(_bounds(length, self.chunks)):
+                size = end - start
+                for pos in range(max(0, start - d), min(m - size, start + d) + 1):
+                    probes[_chunk_key(key[pos:pos + size], i, length), i] = None
+        return [h for h, _ in probes], [i for _, i in probes]
+
+    def _candidates(self, key: str, d: int) -> list[int]:
+        """Title numbers sharing at least two chunks with ``key``."""
+        hashes, numbers = self._probes(key, d)
+        if not hashes:
+            return []
+        found, sizes = _probe(self._entries, hashes)
+        if np is not None:
+            if not len(found):
+                return []
+            tagged = np.unique(found << np.uint64(4) | np.repeat(
+                np.array(numbers, dtype=np.uint64), sizes))
+            ids, counts = np.unique(tagged >> np.uint64(4), return_counts=True)
+            return ids[counts >= 2].tolist()
+        tagged = set(zip(found, (i for i, size in zip(numbers, sizes) for _ in range(size))))
+        counts: dict[int, int] = {}
+        for title, _ in tagged:
+            counts[title] = counts.get(title, 0) + 1
+        return [title for title, count in counts.items() if count >= 2]
+
+    def lookup(self, query: str, k: int = 10,
+               max_distance: int | None = None) -> list[tuple[str, int]]:
+        """Up to ``k`` ``(title, distance)`` pairs, closest and heaviest first."""
+        d = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        key = normalize_prefix(query)
+        candidates = self._candidates(key, d)
+        if len(key) < self.chunks + d:
+            hashes = [_delete_key(variant) for variant in _deletes(key, d)]
+            candidates.extend({int(i) for i in _probe(self._deletes, hashes)[0]})
+        matches = []
+        for i in candidates:
+            title = self.title(i)
+            distance = levenshtein(key, normalize_prefix(title), d)
+            if distance <= d:
+                matches.append((distance, -float(self.weights[i]), title))
+        matches.sort()
+        return [(title, distance) for distance, _, title in matches[:k]]
+
+    def best(self, query: str) -> str | None:
+        """The closest title to ``query``, or ``None`` if nothing is close."""
+        found = self.lookup(query, 1)
+        return found[0][0] if found else None
+
+    def nbytes(self) -> int:
+        return len(self._buf)
+
+    def close(self) -> None:
+        self._entries = self._deletes = self._title_offs = self.weights = None
+        self._buf.release()
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:  # views still held elsewhere; freed on collection
+                pass
+
+    def __enter__(self) -> FuzzyTitleIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
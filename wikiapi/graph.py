@@ -0,0 +1,476 @@
+"""The article link graph as compressed sparse rows.
+
+:class:`LinkGraph` numbers the articles ``0 .. n-1`` in the order of their
+UTF-8 titles and keeps each article's outgoing links as one run of target
+numbers: the targets of node ``i`` are ``indices[indptr[i]:indptr[i+1]]``,
+sorted and without duplicates or self-links.  That is 4 bytes per link
+and 8 per node, plus the titles themselves, so the English Wikipedia's
+6 million articles and 150 million links take about 0.6 GB of links, and
+about 0.2 GB for titles and pointers.
+
+A saved graph is a directory of ``.npy`` arrays and one title blob::
+
+    indptr.npy      uint64[n+1] into indices
+    indices.npy     uint32[m] link targets, row by row
+    title_offs.npy  uint64[n+1] into titles.bin
+    titles.bin      UTF-8 titles, sorted
+
+:meth:`LinkGraph.open` maps the files read-only, with NumPy
+(``np.load(mmap_mode="r")``) or without it (the ``.npy`` format is read and
+written here directly), so opening is immediate and only the touched pages
+are read.  A title is found by binary search over the sorted titles; no
+dict of titles is loaded.
+
+Graphs are built from crawled or dumped articles
+(:meth:`LinkGraph.from_articles`) or from the ``pagelinks.sql.gz`` table
+dump (:meth:`LinkGraph.from_pagelinks_dump`).  Links are collected as
+packed 64-bit ``(source, target)`` pairs in an array, 8 bytes each, then
+sorted and deduplicated in place with NumPy; without NumPy the same is
+done with Python lists, which is fine for crawls but not for a full dump.
+"""
+
+from __future__ import annotations
+
+import ast
+import bisect
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+
+from .article import Article
+from .complete import _Strings
+from .dump import iter_index
+from .index import np
+from .parsed import _links
+from .redirects import (_NAMESPACE_NAMES, NAMESPACES, RedirectMap, _open_dump, _unescape,
+                        normalize_title)
+
+__all__ = ["LinkGraph", "iter_pagelinks_sql"]
+
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_LOW = 0xFFFFFFFF
+_NAMESPACE_NUMBERS = {name: number for number, name in NAMESPACES.items()}
+
+# pagelinks before MediaWiki 1.43: (pl_from, pl_namespace, pl_title, pl_from_namespace);
+# since: (pl_from, pl_from_namespace, pl_target_id) with titles in linktarget.
+_LINK_ROW_TITLE = re.compile(rb"\((\d+),(-?\d+),'((?:[^'\\]|\\.)*)',(-?\d+)\)")
+_LINK_ROW_TARGET = re.compile(rb"\((\d+),(-?\d+),(\d+)\)")
+_LINKTARGET_ROW = re.compile(rb"\((\d+),(-?\d+),'((?:[^'\\]|\\.)*)'\)")
+
+
+def _namespace(title: str) -> int:
+    """Namespace number of a normalized ``title`` (0 when it has no known prefix)."""
+    prefix, colon, _ = title.partition(":")
+    if not colon:
+        return 0
+    name = _NAMESPACE_NAMES.get(prefix.lower())
+    return 0 if name is None else _NAMESPACE_NUMBERS[name]
+
+
+def _qualify(namespace: int, title: bytes) -> str | None:
+    name = NAMESPACES.get(namespace)
+    if name is None:
+        return None
+    title = _unescape(title).replace("_", " ")
+    return sys.intern(f"{name}:{title}" if name else title)
+
+
+def iter_pagelinks_sql(path: str | os.PathLike, linktargets: str | os.PathLike | None = None,
+                       *, namespace: int = 0) -> Iterator[tuple[int, str]]:
+    """Yield ``(pl_from, target title)`` for links between pages in ``namespace``.
+
+    ``path`` is a (gzip or bzip2 compressed) ``pagelinks.sql`` table dump in
+    the old layout (target title in the row) or the new one (a
+    ``pl_target_id`` into the ``linktarget`` table, whose dump must then be
+    passed as ``linktargets``; its rows in ``namespace`` are held in memory).
+    """
+    targets: dict[int, str] | None = None
+    pattern = None
+    with _open_dump(path) as fh:
+        for line in fh:
+            if not line.startswith(b"INSERT INTO"):
+                continue
+            if pattern is None:
+                pattern = _LINK_ROW_TITLE if _LINK_ROW_TITLE.search(line) else _LINK_ROW_TARGET
+            if pattern is _LINK_ROW_TITLE:
+                for m in pattern.finditer(line):
+                    if int(m[2]) == namespace and int(m[4]) == namespace:
+                        yield int(m[1]), _qualify(namespace, m[3])
+                continue
+            if targets is None:
+                if linktargets is None:
+                    raise ValueError("this pagelinks dump refers to the linktarget table; "
+                                     "pass its dump as linktargets")
+                targets = _linktargets(linktargets, namespace)
+            for m in pattern.finditer(line):
+                if int(m[2]) == namespace:
+                    title = targets.get(int(m[3]))
+                    if title is not None:
+                        yield int(m[1]), title
+
+
+def _linktargets(path: str | os.PathLike, namespace: int) -> dict[int, str]:
+    targets = {}
+    with _open_dump(path) as fh:
+        for line in fh:
+            if line.startswith(b"INSERT INTO"):
+                for m in _LINKTARGET_ROW.finditer(line):
+                    if int(m[2]) == namespace:
+                        targets[int(m[1])] = _qualify(namespace, m[3])
+    return targets
+
+
+def _npy_header(descr: str, count: int) -> bytes:
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({count},), }}"
+    # Magic, version and length take 10 bytes; the data starts 64-byte aligned.
+    header += " " * (-(10 + len(header) + 1) % 64) + "\n"
+    return _NPY_MAGIC + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def _write_npy(path: Path, data, descr: str, count: int) -> None:
+    _write(path, [_npy_header(descr, count), memoryview(data).cast("B")])
+
+
+def _write(path: Path, chunks: Iterable) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as fh:
+        for chunk in chunks:
+            fh.write(chunk)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _map(path: Path) -> mmap.mmap | bytes:
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_npy(path: Path, maps: list):
+    """The array in ``path``, mapped read-only."""
+    if np is not None:
+        return np.load(path, mmap_mode="r")
+    data = _map(path)
+    maps.append(data)
+    if data[:8] != _NPY_MAGIC:
+        raise ValueError(f"{path} is not a version 1 .npy file")
+    (length,) = struct.unpack_from("<H", data, 8)
+    header = ast.literal_eval(data[10:10 + length].decode("latin1"))
+    descr = header["descr"]
+    fmt = {"<u8": "Q", "<u4": "I", "<f8": "d", "<f4": "f"}.get(descr)
+    if fmt is None or sys.byteorder != "little":
+        raise ValueError(f"unsupported array type {descr} in {path}")
+    view = memoryview(data)[10 + length:]
+    maps.append(view)
+    return view.cast(fmt)
+
+
+def _row_blocks(indptr, block_links: int) -> list[int]:
+    """Row boundaries cutting a CSR into blocks of about ``block_links`` entries (NumPy)."""
+    indptr = np.asarray(indptr)
+    cuts = np.searchsorted(indptr, np.arange(0, int(indptr[-1]), max(1, block_links)),
+                           side="right") - 1
+    return np.unique(np.concatenate((cuts, [len(indptr) - 1]))).tolist()
+
+
+def _release(maps: list) -> None:
+    for item in reversed(maps):
+        if isinstance(item, memoryview):
+            item.release()
+        elif isinstance(item, mmap.mmap):
+            try:
+                item.close()
+            except BufferError:  # views still held elsewhere; freed on collection
+                pass
+    maps.clear()
+
+
+class _Builder:
+    """Collects nodes and links under provisional numbers, then sorts them out."""
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.pairs = array("Q")
+
+    def node(self, title: str) -> int:
+        ids = self.ids
+        node = ids.get(title)
+        if node is None:
+            node = ids[title] = len(ids)
+        return node
+
+    def build(self) -> LinkGraph:
+        encoded = sorted((title.encode("utf-8"), node) for title, node in self.ids.items())
+        self.ids = {}
+        titles = [title for title, _ in encoded]
+        n = len(titles)
+        rank = array("I", bytes(4 * n))
+        for i, (_, node) in enumerate(encoded):
+            rank[node] = i
+        del encoded
+        pairs, self.pairs = self.pairs, array("Q")
+        if np is not None:
+            rank = np.frombuffer(rank, dtype=np.uint32)
+            packed = np.frombuffer(pairs, dtype=np.uint64)
+            sources = rank[packed >> np.uint64(32)]
+            targets = rank[packed & np.uint64(_LOW)]
+            del packed, pairs
+            keep = sources != targets
+            packed = sources[keep].astype(np.uint64)
+            packed <<= np.uint64(32)
+            packed |= targets[keep]
+            del sources, targets, keep
+            packed.sort()
+            if len(packed):
+                fresh = np.empty(len(packed), dtype=bool)
+                fresh[0] = True
+                np.not_equal(packed[1:], packed[:-1], out=fresh[1:])
+                packed = packed[fresh]
+            indices = (packed & np.uint64(_LOW)).astype(np.uint32)
+            indptr = np.zeros(n + 1, dtype=np.uint64)
+            np.cumsum(np.bincount((packed >> np.uint64(32)).astype(np.intp), minlength=n),
+                      out=indptr[1:])
+            return LinkGraph(titles, indptr, indices)
+        packed = sorted({rank[p >> 32] << 32 | rank[p & _LOW] for p in pairs})
+        indices = array("I")
+        indptr = array("Q", [0])
+        for p in packed:
+            source, target = p >> 32, p & _LOW
+            if source == target:
+                continue
+            while len(indptr) <= source:
+                indptr.append(len(indices))
+            indices.append(target)
+        while len(indptr) <= n:
+            indptr.append(len(indices))
+        return LinkGraph(titles, indptr, indices)
+
+
+class LinkGraph:
+    """Outgoing links between articles, as CSR arrays over dense node numbers.
+
+    ``titles`` are the node titles as UTF-8 bytes in sorted order (a list,
+    or the mapped blob of a saved graph); ``indptr`` and ``indices`` are
+    NumPy arrays or, without NumPy, ``array``/``memoryview`` sequences.
+    """
+
+    def __init__(self, titles: Sequence[bytes], indptr, indices, *, _maps: list | None = None):
+        self._titles = titles
+        self.indptr = indptr
+        self.indices = indices
+        self._maps = _maps or []
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the arrays and titles, as stored on disk."""
+        titles = self._titles
+        blob = sum(map(len, titles)) if isinstance(titles, list) else int(titles._offs[-1])
+        return 8 * (len(self) + 1) * 2 + 4 * self.num_edges + blob
+
+    def id(self, title: str) -> int | None:
+        """Node number of ``title`` (normalized first), or ``None``."""
+        key = normalize_title(title).encode("utf-8")
+        titles = self._titles
+        i = bisect.bisect_left(titles, key)
+        if i < len(titles) and titles[i] == key:
+            return i
+        return None
+
+    def __contains__(self, title: str) -> bool:
+        return self.id(title) is not None
+
+    def title(self, node: int) -> str:
+        return self._titles[node].decode("utf-8")
+
+    def successors(self, node: int):
+        """Target node numbers of ``node``'s links, sorted (an array view)."""
+        return self.indices[int(self.indptr[node]):int(self.indptr[node + 1])]
+
+    def out_degree(self, node: int) -> int:
+        return int(self.indptr[node + 1]) - int(self.indptr[node])
+
+    def out_degrees(self):
+        """Links per node: an array of ``len(self)`` counts."""
+        if np is not None:
+            return np.diff(np.asarray(self.indptr)).astype(np.uint32)
+        indptr = self.indptr
+        return array("I", (indptr[i + 1] - indptr[i] for i in range(len(self))))
+
+    def links(self, title: str) -> list[str]:
+        """Titles ``title`` links to (empty if it is not in the graph)."""
+        node = self.id(title)
+        if node is None:
+            return []
+        return [self.title(int(t)) for t in self.successors(node)]
+
+    def edges(self) -> Iterator[tuple[int, int]]:
+        """All ``(source, target)`` node pairs, by source."""
+        indptr = self.indptr
+        indices = self.indices
+        for source in range(len(self)):
+            for i in range(int(indptr[source]), int(indptr[source + 1])):
+                yield source, int(indices[i])
+
+    def transpose(self) -> LinkGraph:
+        """The graph with every link reversed: row ``i`` lists the nodes linking to ``i``.
+
+        It shares this graph's titles and is built in memory (with NumPy, by
+        a stable sort of the link targets; 12 bytes per link at the peak).
+        """
+        n = len(self)
+        if np is not None:
+            indices = np.asarray(self.indices)
+            order = np.argsort(indices, kind="stable")
+            sources = np.repeat(np.arange(n, dtype=np.uint32), self.out_degrees())
+            rindices = sources[order]
+            del order, sources
+            rindptr = np.zeros(n + 1, dtype=np.uint64)
+            np.cumsum(np.bincount(indices, minlength=n), out=rindptr[1:])
+            return LinkGraph(self._titles, rindptr, rindices)
+        rows: list[list[int]] = [[] for _ in range(n)]
+        for source, target in self.edges():
+            rows[target].append(source)
+        rindices = array("I")
+        rindptr = array("Q", [0])
+        for row in rows:
+            rindices.extend(row)
+            rindptr.append(len(rindices))
+        return LinkGraph(self._titles, rindptr, rindices)
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[tuple[str, str]], *, nodes: Iterable[str] = ()) -> LinkGraph:
+        """Build from ``(source, target)`` title pairs, plus any unlinked ``nodes``.
+
+        Titles are taken as they are, so normalize them first.
+        """
+        builder = _Builder()
+        for title in nodes:
+            builder.node(title)
+        pairs = builder.pairs
+        node = builder.node
+        for source, target in edges:
+            pairs.append(node(source) << 32 | node(target))
+        return builder.build()
+
+    @classmethod
+    def from_articles(cls, articles: Iterable[Article], *, namespace: int = 0,
+                      redirects: RedirectMap | None = None) -> LinkGraph:
+        """Build from crawled or dumped articles.
+
+        Fetched articles carry their links; for dump articles (no links
+        listed) they are read from the wikitext.  Every link target in
+        ``namespace`` becomes a node, crawled or not.  With ``redirects``,
+        links to redirects point at their targets and redirect pages are
+        left out.
+        """
+        builder = _Builder()
+        pairs = builder.pairs
+        for article in articles:
+            if article.missing or article.redirect or article.ns != namespace:
+                continue
+            title = normalize_title(article.title)
+            if redirects is not None:
+                title = redirects.resolve(title)
+            source = builder.node(title) << 32
+            links = article.links or _links(article.text)
+            for link in links:
+                if redirects is not None:
+                    link = redirects.resolve(link)
+                if _namespace(link) == namespace:
+                    pairs.append(source | builder.node(link))
+        return builder.build()
+
+    @classmethod
+    def from_pagelinks_dump(cls, pagelinks_path: str | os.PathLike,
+                            titles: Mapping[int, str] | str | os.PathLike, *,
+                            linktargets: str | os.PathLike | None = None, namespace: int = 0,
+                            redirects: RedirectMap | None = None) -> LinkGraph:
+        """Build from the ``pagelinks.sql.gz`` table dump.
+
+        Nodes are the pages in ``titles``: a page ID → title mapping or the
+        path of the multistream index, of which the pages in ``namespace``
+        are kept.  Links to titles that are not among them (red links) are
+        dropped.  With ``redirects``, redirect pages are left out and links
+        to them point at their targets.  See :func:`iter_pagelinks_sql` for
+        ``linktargets``.
+        """
+        builder = _Builder()
+        pages: dict[int, int] = {}
+        items = (titles.items() if isinstance(titles, Mapping)
+                 else ((pageid, title) for _, pageid, title in iter_index(titles)))
+        for pageid, title in items:
+            if _namespace(title) != namespace:
+                continue
+            if redirects is not None and redirects.resolve(title) != title:
+                continue
+            pages[pageid] = builder.node(sys.intern(title))
+        ids = builder.ids
+        pairs = builder.pairs
+        for pageid, target in iter_pagelinks_sql(pagelinks_path, linktargets,
+                                                 namespace=namespace):
+            source = pages.get(pageid)
+            if source is None:
+                continue
+            if redirects is not None:
+                target = redirects.resolve(target)
+            node = ids.get(target)
+            if node is not None:
+                pairs.append(source << 32 | node)
+        del pages
+        return builder.build()
+
+    def save(self, directory: str | os.PathLike) -> None:
+        """Write the graph as ``.npy`` arrays and a title blob into ``directory``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        titles = self._titles
+        if isinstance(titles, list):
+            offsets = array("Q", [0])
+            for title in titles:
+                offsets.append(offsets[-1] + len(title))
+            offs, blob = offsets, titles
+        else:  # a mapped graph: copy its sections as they are
+            offs, blob = titles._offs, [bytes(titles._buf[:int(titles._offs[-1])])]
+        n = len(self)
+        _write(directory / "titles.bin", blob)
+        _write_npy(directory / "title_offs.npy", offs, "<u8", n + 1)
+        _write_npy(directory / "indptr.npy", self.indptr, "<u8", n + 1)
+        _write_npy(directory / "indices.npy", self.indices, "<u4", self.num_edges)
+
+    @classmethod
+    def open(cls, directory: str | os.PathLike) -> LinkGraph:
+        """Map a graph written by :meth:`save` read-only."""
+        directory = Path(directory)
+        maps: list = []
+        offsets = _read_npy(directory / "title_offs.npy", maps)
+        blob = _map(directory / "titles.bin")
+        maps.append(blob)
+        buf = memoryview(blob)
+        maps.append(buf)
+        return cls(_Strings(buf, offsets, 0), _read_npy(directory / "indptr.npy", maps),
+                   _read_npy(directory / "indices.npy", maps), _maps=maps)
+
+    def close(self) -> None:
+        self._titles = ()
+        self.indptr = self.indices = None
+        _release(self._maps)
+
+    def __enter__(self) -> LinkGraph:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
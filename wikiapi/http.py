@@ -0,0 +1,252 @@
+"""Small asyncio HTTP/1.1 client with pooled keep-alive connections.
+
+Only what the MediaWiki API needs is implemented: ``GET``/``POST`` with
+``Content-Length`` or chunked responses and gzip/deflate decoding.  Every
+origin gets a :class:`HostPool` that keeps at most ``max_connections`` sockets
+open and hands them out in turn, so any number of coroutines can have a
+request outstanding while only a handful of TCP/TLS connections exist.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import zlib
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+__all__ = ["HTTPClient", "HostPool", "Response"]
+
+_NO_BODY_STATUSES = frozenset({204, 304})
+
+
+@dataclass
+class Response:
+    """A fully read HTTP response."""
+
+    status: int
+    reason: str
+    headers: dict[str, str]
+    body: bytes
+    url: str = ""
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class _Connection:
+    """One persistent connection to an origin."""
+
+    __slots__ = ("reader", "writer", "requests")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    @property
+    def reusable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self) -> None:
+        self.writer.close()
+
+    async def request(self, method: str, target: str, headers: dict[str, str],
+                      body: bytes | None) -> tuple[Response, bool]:
+        lines = [f"{method} {target} HTTP/1.1"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        self.writer.write(head + body if body else head)
+        await self.writer.drain()
+        self.requests += 1
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ""
+        resp_headers: dict[str, str] = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            resp_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = resp_headers.get("connection", "").lower() != "close"
+        if method == "HEAD" or status in _NO_BODY_STATUSES or 100 <= status < 200:
+            payload = b""
+        elif "chunked" in resp_headers.get("transfer-encoding", "").lower():
+            payload = await self._read_chunked()
+        elif "content-length" in resp_headers:
+            payload = await self.reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            payload = await self.reader.read()
+            keep_alive = False
+
+        encoding = resp_headers.get("content-encoding", "").lower()
+        if encoding == "gzip":
+            payload = zlib.decompress(payload, 16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            payload = zlib.decompress(payload)
+        return Response(status, reason, resp_headers, payload), keep_alive
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size_line = await self.reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # Trailers, terminated by an empty line.
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+
+class HostPool:
+    """Keep-alive connections to a single ``scheme://host:port`` origin."""
+
+    def __init__(self, scheme: str, host: str, port: int, *, max_connections: int = 8,
+                 ssl_context: ssl.SSLContext | None = None, connect_timeout: float = 10.0):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self._ssl = ssl_context if scheme == "https" else None
+        self._idle: list[_Connection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    async def _connect(self) -> _Connection:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self._ssl),
+            self.connect_timeout,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    async def request(self, method: str, target: str, headers: dict[str, str],
+                      body: bytes | None = None) -> Response:
+        async with self._slots:
+            conn = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.reusable:
+                    conn = candidate
+                    break
+                candidate.close()
+            reused = conn is not None
+            if conn is None:
+                conn = await self._connect()
+            try:
+                resp, keep_alive = await conn.request(method, target, headers, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn.close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive socket; retry once fresh.
+                conn = await self._connect()
+                resp, keep_alive = await conn.request(method, target, headers, body)
+            except BaseException:
+                conn.close()
+                raise
+            self.requests_sent += 1
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                conn.close()
+            return resp
+
+    def close(self) -> None:
+        for conn in self._idle:
+            conn.close()
+        self._idle.clear()
+
+
+class HTTPClient:
+    """Asynchronous HTTP client sharing one :class:`HostPool` per origin.
+
+    ``max_connections_per_host`` bounds the sockets opened to each origin;
+    requests beyond that wait for a free connection instead of opening more.
+    """
+
+    def __init__(self, *, max_connections_per_host: int = 8, timeout: float = 30.0,
+                 headers: dict[str, str] | None = None,
+                 ssl_context: ssl.SSLContext | None = None):
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.headers = {"Accept-Encoding": "gzip, deflate", **(headers or {})}
+        self._ssl = ssl_context
+        self._pools: dict[tuple[str, str, int], HostPool] = {}
+
+    def pool(self, url: str) -> HostPool:
+        """Return the connection pool serving ``url``'s origin."""
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        pool = self._pools.get(key)
+        if pool is None:
+            if scheme == "https" and self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            pool = self._pools[key] = HostPool(
+                scheme, key[1], port,
+                max_connections=self.max_connections_per_host, ssl_context=self._ssl,
+            )
+        return pool
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "connections_opened": sum(p.connections_opened for p in self._pools.values()),
+            "requests_sent": sum(p.requests_sent for p in self._pools.values()),
+        }
+
+    async def request(self, method: str, url: str, *, params: dict[str, Any] | None = None,
+                      data: dict[str, Any] | None = None,
+                      headers: dict[str, str] | None = None) -> Response:
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        query = parts.query
+        if params:
+            query = f"{query}&{urlencode(params)}" if query else urlencode(params)
+        if query:
+            target = f"{target}?{query}"
+        body = None
+        merged = {"Host": parts.netloc, **self.headers, **(headers or {})}
+        if data is not None:
+            body = urlencode(data).encode("ascii")
+            merged["Content-Type"] = "application/x-www-form-urlencoded"
+            merged["Content-Length"] = str(len(body))
+        resp = await asyncio.wait_for(
+            self.pool(url).request(method, target, merged, body), self.timeout
+        )
+        resp.url = url
+        return resp
+
+    async def get(self, url: str, params: dict[str, Any] | None = None, **kwargs) -> Response:
+        return await self.request("GET", url, params=params, **kwargs)
+
+    async def post(self, url: str, data: dict[str, Any] | None = None, **kwargs) -> Response:
+        return await self.request("POST", url, data=data or {}, **kwargs)
+
+    async def close(self) -> None:
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+
+    async def __aenter__(self) -> HTTPClient:
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
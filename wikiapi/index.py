@@ -0,0 +1,235 @@
+"""Local full-text index over articles with BM25 ranking.
+
+Documents get dense integer IDs in insertion order.  Each term maps to a
+postings list held in two ``array('I')`` columns, document IDs (ascending)
+and term frequencies, so an index over a million articles is a few compact
+buffers per term instead of millions of Python objects.
+
+Queries are scored term-at-a-time with Okapi BM25.  When NumPy is installed
+the postings are scored as vectors over zero-copy views of the arrays;
+otherwise a plain Python loop does the same arithmetic.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import pickle
+import re
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from .article import Article
+
+if TYPE_CHECKING:
+    from .centrality import PageRank
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+__all__ = ["InvertedIndex", "SearchHit", "rank_bm25", "tokenize"]
+
+_TOKEN = re.compile(r"\w+")
+_MAX_TOKEN = 40
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word tokens of ``text``."""
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) <= _MAX_TOKEN]
+
+
+def _top_k(values, k: int):
+    """Positions of the ``k`` largest ``values`` (a NumPy array), best first.
+
+    Ties go to the earlier position.  ``argpartition`` alone would pick
+    arbitrary members of a tie that straddles the cut.
+    """
+    n = len(values)
+    if k <= 0:
+        return np.arange(0)
+    if k < n:
+        cut = np.partition(values, n - k)[n - k]
+        better = np.flatnonzero(values > cut)
+        top = np.concatenate((better, np.flatnonzero(values == cut)[:k - len(better)]))
+    else:
+        top = np.arange(n)
+    return top[np.lexsort((top, -values[top]))]
+
+
+def rank_bm25(postings: list[tuple], norms, num_docs: int, k: int,
+              k1: float, prior=None) -> list[tuple[float, int]]:
+    """Score ``(docids, tfs)`` postings with BM25 and return the top ``k``.
+
+    ``norms`` holds each document's ``k1 * (1 - b + b*dl/avgdl)``; a posting
+    may instead carry those values as a third column aligned with its
+    documents.  ``prior``, by document ID, is added to the score of every
+    matching document (see :meth:`wikiapi.centrality.PageRank.column`).
+    Results are ``(score, docid)`` pairs, best first, ties broken by
+    document ID.
+    """
+    k1p = k1 + 1
+
+    def idf(df: int) -> float:
+        return math.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+
+    if np is not None:
+        # Work only on the matching postings, never on all N documents.
+        all_ids, all_scores = [], []
+        for posting in postings:
+            docids, tfs = posting[0], posting[1]
+            ids = np.frombuffer(docids, dtype=np.uint32) if isinstance(docids, array) else docids
+            tf = (np.frombuffer(tfs, dtype=np.uint32) if isinstance(tfs, array)
+                  else tfs).astype(np.float64)
+            norm = posting[2] if len(posting) > 2 else norms[ids]
+            all_ids.append(ids)
+            all_scores.append(idf(len(ids)) * tf * k1p / (tf + norm))
+        if len(all_ids) == 1:
+            ids, scores = all_ids[0], all_scores[0]
+        else:
+            ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+        if prior is not None:
+            scores = scores + prior[ids]
+        # ``ids`` ascend, so ties by position are ties by document ID.
+        return [(float(scores[i]), int(ids[i])) for i in _top_k(scores, k)]
+    acc: dict[int, float] = {}
+    get = acc.get
+    for posting in postings:
+        docids, tfs = posting[0], posting[1]
+        weight = idf(len(docids)) * k1p
+        norm = posting[2] if len(posting) > 2 else map(norms.__getitem__, docids)
+        for d, tf, n in zip(docids, tfs, norm):
+            acc[d] = get(d, 0.0) + weight * tf / (tf + n)
+    if prior is not None:
+        for d in acc:
+            acc[d] += prior[d]
+    return [(s, d) for d, s in heapq.nlargest(k, acc.items(),
+                                              key=lambda item: (item[1], -item[0]))]
+
+
+@dataclass(slots=True)
+class SearchHit:
+    docid: int
+    title: str
+    pageid: int | None
+    score: float
+
+    def as_dict(self) -> dict[str, Any]:
+        """The hit shaped like a remote ``list=search`` result."""
+        return {"ns": 0, "title": self.title, "pageid": self.pageid, "score": self.score}
+
+
+class InvertedIndex:
+    """In-memory inverted index with BM25 top-k retrieval."""
+
+    def __init__(self, *, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.titles: list[str] = []
+        self.pageids = array("q")
+        self.lengths = array("I")
+        self.total_length = 0
+        self.postings: dict[str, tuple[array, array]] = {}
+        self._norm_cache = None
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    @property
+    def avg_length(self) -> float:
+        return self.total_length / len(self.titles) if self.titles else 0.0
+
+    def add(self, title: str, text: str, pageid: int | None = None,
+            *, title_weight: int = 3) -> int:
+        """Index one document and return its document ID.
+
+        Title tokens count ``title_weight`` times, a cheap field boost.
+        """
+        docid = len(self.titles)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for token in tokenize(title):
+            counts[token] += title_weight
+        for term, tf in counts.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("I"))
+            entry[0].append(docid)
+            entry[1].append(tf)
+        length = sum(counts.values())
+        self.titles.append(title)
+        self.pageids.append(-1 if pageid is None else pageid)
+        self.lengths.append(length)
+        self.total_length += length
+        self._norm_cache = None
+        return docid
+
+    def add_article(self, article: Article) -> int:
+        return self.add(article.title, article.text, article.pageid)
+
+    @classmethod
+    def from_articles(cls, articles: Iterable[Article], **options: Any) -> InvertedIndex:
+        """Build an index from fetched, crawled or dump-ingested articles.
+
+        Redirect pages are skipped; their targets carry the content.
+        """
+        index = cls(**options)
+        for article in articles:
+            if not article.missing and article.redirect is None:
+                index.add_article(article)
+        return index
+
+    def _norms(self):
+        """Per-document BM25 length normalization ``k1 * (1 - b + b*dl/avgdl)``.
+
+        Cached until the next :meth:`add`.
+        """
+        if self._norm_cache is not None:
+            return self._norm_cache
+        avg = self.avg_length or 1.0
+        k1, b = self.k1, self.b
+        if np is not None:
+            lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+            norms = k1 * (1.0 - b + b * lengths / avg)
+        else:
+            norms = [k1 * (1.0 - b + b * dl / avg) for dl in self.lengths]
+        self._norm_cache = norms
+        return norms
+
+    def title(self, docid: int) -> str:
+        return self.titles[docid]
+
+    def search(self, query: str, k: int = 10, *, priors: PageRank | None = None
+               ) -> list[SearchHit]:
+        """Return the ``k`` best documents for ``query`` by BM25 score.
+
+        With ``priors``, each document's PageRank boost is added to its score.
+        """
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.postings]
+        if not terms or k <= 0:
+            return []
+        postings = [self.postings[t] for t in terms]
+        best = rank_bm25(postings, self._norms(), len(self.titles), k, self.k1,
+                         None if priors is None else priors.column(self))
+        return [self._hit(d, s) for s, d in best]
+
+    def _hit(self, docid: int, score: float) -> SearchHit:
+        pageid = self.pageids[docid]
+        return SearchHit(docid, self.titles[docid], None if pageid < 0 else pageid, score)
+
+    def save(self, path) -> None:
+        with open(path, "wb") as fh:
+            pickle.dump(self, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path) -> InvertedIndex:
+        with open(path, "rb") as fh:
+            index = pickle.load(fh)
+        if not isinstance(index, cls):
+            raise TypeError(f"{path} does not contain an {cls.__name__}")
+        return index
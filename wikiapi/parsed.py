@@ -0,0 +1,239 @@
+"""Articles that parse one section at a time, on demand.
+
+Most callers only want the lead or one named section, yet cleaning,
+link extraction and template extraction over a whole article cost time
+in proportion to all of it.  :class:`ParsedArticle` keeps the raw wikitext
+and, built on first use by one scan for heading lines, a section offset
+index: where each heading line starts and ends, its level and title.
+:class:`ArticleSection` objects are slices of that text.  Their plain
+text, links, templates and the article's infobox are worked out the first
+time they are read and kept, so a caller that reads ``article.lead.text``
+cleans only the lead, once.
+
+Both classes use ``__slots__``; an unparsed article is the wikitext plus a
+handful of pointers, and the index is two small integer arrays, a byte
+string of levels and a tuple of titles.  Sections follow MediaWiki's
+numbering (the lead is 0) and, like ``action=parse&section=N``, a section
+runs up to the next heading of the same or a higher level, so it includes
+its subsections.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator
+from typing import Any
+
+from .article import Article
+from .redirects import normalize_title
+from .templates import Template, extract_templates
+from .wikitext import _COMMENT, _DROP_LINKS, _LANGUAGES, _heading, _inline, to_plaintext
+
+__all__ = ["ArticleSection", "ParsedArticle"]
+
+
+def _headings(wikitext: str) -> tuple[array, array, bytes, tuple[str, ...]]:
+    """Heading line starts and ends, levels and titles in ``wikitext``."""
+    starts = array("I")
+    ends = array("I")
+    levels = bytearray()
+    titles = []
+    comments = ([(m.start(), m.end()) for m in _COMMENT.finditer(wikitext)]
+                if "<!--" in wikitext else ())
+    pos = 0 if wikitext.startswith("=") else wikitext.find("\n=")
+    while pos >= 0:
+        start = pos + 1 if wikitext[pos] == "\n" else pos
+        end = wikitext.find("\n", start)
+        end = len(wikitext) if end < 0 else end
+        heading = _heading(wikitext[start:end])
+        if heading is not None and not any(a <= start < b for a, b in comments):
+            level, title = heading
+            starts.append(start)
+            ends.append(end)
+            levels.append(level)
+            titles.append(_inline(title))
+        pos = wikitext.find("\n=", end)
+    return starts, ends, bytes(levels), tuple(titles)
+
+
+class ArticleSection:
+    """One section of a :class:`ParsedArticle`; attributes parse on first use."""
+
+    __slots__ = ("article", "number", "title", "level", "start", "end",
+                 "_text", "_links", "_templates")
+
+    def __init__(self, article: ParsedArticle, number: int, title: str, level: int,
+                 start: int, end: int):
+        self.article = article
+        self.number = number
+        self.title = title
+        self.level = level
+        self.start = start
+        self.end = end
+        self._text: str | None = None
+        self._links: list[str] | None = None
+        self._templates: list[Template] | None = None
+
+    def __repr__(self) -> str:
+        return f"ArticleSection({self.number}, {self.title!r}, level={self.level})"
+
+    @property
+    def wikitext(self) -> str:
+        """Wikitext of the section, heading line included."""
+        return self.article.wikitext[self.start:self.end]
+
+    @property
+    def body(self) -> str:
+        """Wikitext of the section without its heading line."""
+        if not self.level:
+            return self.wikitext
+        return self.article.wikitext[self.article._ends[self.number - 1]:self.end].lstrip("\n")
+
+    @property
+    def text(self) -> str:
+        """Plain text of the section body (see :func:`~wikiapi.wikitext.to_plaintext`)."""
+        if self._text is None:
+            self._text = to_plaintext(self.body).text
+        return self._text
+
+    @property
+    def links(self) -> list[str]:
+        """Normalized targets of the article links in the section, first occurrence order."""
+        if self._links is None:
+            self._links = _links(self.wikitext)
+        return self._links
+
+    @property
+    def templates(self) -> list[Template]:
+        """The templates in the section that are not nested in another one."""
+        if self._templates is None:
+            self._templates = extract_templates(self.wikitext)
+        return self._templates
+
+
+def _links(wikitext: str) -> list[str]:
+    if "<!--" in wikitext:
+        wikitext = _COMMENT.sub("", wikitext)
+    seen: dict[str, None] = {}
+    pos = wikitext.find("[[")
+    while pos >= 0:
+        end = wikitext.find("]]", pos)
+        target = wikitext[pos + 2:end if end >= 0 else len(wikitext)]
+        target = target.partition("|")[0].partition("#")[0].strip()
+        if target and not ("[" in target or "{" in target or "\n" in target):
+            prefix, colon, _ = target.partition(":")
+            prefix = prefix.strip().lower()
+            # Files, categories, interlanguage and leading-colon links are not article links.
+            if not colon or prefix and prefix not in _DROP_LINKS and prefix not in _LANGUAGES:
+                seen.setdefault(normalize_title(target), None)
+        # Links in file captions count too, so carry on inside the brackets.
+        pos = wikitext.find("[[", pos + 2)
+    return list(seen)
+
+
+class ParsedArticle:
+    """Wikitext of one article with a lazy section index.
+
+    Sections are numbered like MediaWiki's (0 is the lead) and can be
+    looked up by number or by title::
+
+        article = ParsedArticle.from_article(page)
+        article.lead.text
+        article["History"].links
+        article.infobox
+    """
+
+    __slots__ = ("title", "pageid", "revid", "wikitext", "_starts", "_ends", "_levels",
+                 "_titles", "_sections", "_infobox")
+
+    def __init__(self, wikitext: str, title: str = "", *, pageid: int | None = None,
+                 revid: int | None = None):
+        self.title = title
+        self.pageid = pageid
+        self.revid = revid
+        self.wikitext = wikitext
+        self._starts: array | None = None
+        self._ends: array | None = None
+        self._levels = b""
+        self._titles: tuple[str, ...] = ()
+        self._sections: list[ArticleSection | None] | None = None
+        self._infobox: dict[str, Any] | None = None
+
+    @classmethod
+    def from_article(cls, article: Article) -> ParsedArticle:
+        """Wrap a fetched or dump :class:`~wikiapi.article.Article`."""
+        return cls(article.text, article.title, pageid=article.pageid, revid=article.revid)
+
+    def __repr__(self) -> str:
+        return f"ParsedArticle({self.title!r}, {len(self.wikitext)} chars)"
+
+    def _index(self) -> None:
+        self._starts, self._ends, self._levels, self._titles = _headings(self.wikitext)
+        self._sections = [None] * (len(self._titles) + 1)
+
+    @property
+    def titles(self) -> tuple[str, ...]:
+        """Section titles in order, without the lead."""
+        if self._sections is None:
+            self._index()
+        return self._titles
+
+    def __len__(self) -> int:
+        """Number of sections, the lead included."""
+        return len(self.titles) + 1
+
+    def section(self, number: int) -> ArticleSection:
+        """Section ``number`` (0 is the lead); raises ``IndexError``."""
+        if self._sections is None:
+            self._index()
+        if number < 0:
+            number += len(self._sections)
+        section = self._sections[number]
+        if section is None:
+            if number == 0:
+                end = self._starts[0] if self._starts else len(self.wikitext)
+                section = ArticleSection(self, 0, "", 0, 0, end)
+            else:
+                level = self._levels[number - 1]
+                end = len(self.wikitext)
+                for i in range(number, len(self._levels)):
+                    if self._levels[i] <= level:
+                        end = self._starts[i]
+                        break
+                section = ArticleSection(self, number, self._titles[number - 1], level,
+                                         self._starts[number - 1], end)
+            self._sections[number] = section
+        return section
+
+    def find(self, title: str) -> ArticleSection | None:
+        """The first section called ``title`` (case-insensitive), or ``None``."""
+        folded = title.strip().casefold()
+        for number, candidate in enumerate(self.titles, 1):
+            if candidate.casefold() == folded:
+                return self.section(number)
+        return None
+
+    def __getitem__(self, key: int | str) -> ArticleSection:
+        """Section by number or title; raises ``IndexError`` or ``KeyError``."""
+        if isinstance(key, str):
+            section = self.find(key)
+            if section is None:
+                raise KeyError(key)
+            return section
+        return self.section(key)
+
+    def __iter__(self) -> Iterator[ArticleSection]:
+        for number in range(len(self)):
+            yield self.section(number)
+
+    @property
+    def lead(self) -> ArticleSection:
+        """The text before the first heading."""
+        return self.section(0)
+
+    @property
+    def infobox(self) -> dict[str, Any]:
+        """Typed arguments of the first ``{{Infobox ...}}`` in the lead (empty if none)."""
+        if self._infobox is None:
+            self._infobox = next((t.args for t in self.lead.templates if t.is_infobox), {})
+        return self._infobox
@@ -0,0 +1,330 @@
+"""Shortest link paths between articles.
+
+"How is article A connected to article B" is a breadth-first search, and
+a one-sided search from A visits every article within the path length of
+it, which on Wikipedia is most of them by depth four.
+:class:`PathFinder` searches from both ends at once over a local
+:class:`~wikiapi.graph.LinkGraph`: forward along links from the source,
+and backward along the reversed graph from the target, always growing the
+side whose next layer is cheaper (fewer links to read).  The two searches
+meet after each has covered about half the path, so far fewer articles
+are visited.
+
+A layer is expanded in a few NumPy operations: the CSR rows of all
+frontier nodes are gathered in one fancy-indexing step, and those not
+seen yet are kept.  Distances live in two ``int16`` arrays, allocated once
+per finder and reset after each query for only the nodes it touched.
+Paths are read back from the distances: a node's predecessors on a
+shortest path are its neighbours one step closer to the root.  Without
+NumPy the same search runs on dicts.
+
+Without a local graph, :meth:`PathFinder.find` runs the same
+bidirectional search live.  Forward layers are fetched with their links
+(``prop=links``) and backward layers with ``list=backlinks``, one batched
+request per layer and side.  It stops after ``max_pages`` fetched pages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from typing import Any
+
+from .client import WikiClient
+from .graph import LinkGraph
+from .index import np
+
+__all__ = ["PathFinder"]
+
+# The search does not expand beyond this; Wikipedia's diameter is far smaller.
+_MAX_DEPTH = 32
+
+
+def _row(csr: Any, node: int):
+    return csr.indices[int(csr.indptr[node]):int(csr.indptr[node + 1])]
+
+
+class PathFinder:
+    """Bidirectional breadth-first search for shortest link paths.
+
+    ``graph`` is the local link graph and ``reverse`` its transpose (built
+    with :meth:`LinkGraph.transpose` when not given; anything with CSR
+    ``indptr`` and ``indices`` over the same node numbers will do).
+    ``client`` serves :meth:`find` when there is no local graph.
+    """
+
+    def __init__(self, graph: LinkGraph | None = None, reverse: Any = None, *,
+                 client: WikiClient | None = None):
+        self.graph = graph
+        self.reverse = reverse if reverse is not None or graph is None else graph.transpose()
+        self.client = client
+        self._own_client = False
+        self._dist: tuple[Any, Any] | None = None
+        #: Nodes visited by the last local search (both sides), for tuning.
+        self.visited = 0
+
+    # -- local search ------------------------------------------------------
+
+    def _distances(self) -> tuple[Any, Any]:
+        if self._dist is None:
+            n = len(self.graph)
+            if np is not None:
+                self._dist = (np.full(n, -1, dtype=np.int16), np.full(n, -1, dtype=np.int16))
+            else:
+                self._dist = ({}, {})
+        return self._dist
+
+    def _expand(self, csr: Any, frontier, dist, depth: int):
+        """The unseen neighbours of ``frontier`` in ``csr``, marked at ``depth``."""
+        if np is None:
+            layer = []
+            for node in frontier:
+                for other in _row(csr, node):
+                    if other not in dist:
+                        dist[other] = depth
+                        layer.append(other)
+            return layer
+        starts = csr.indptr[frontier].astype(np.int64)
+        counts = csr.indptr[frontier + 1].astype(np.int64) - starts
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Positions of every link of every frontier node, in one array.
+        shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        neighbours = np.asarray(csr.indices[shift + np.arange(total)], dtype=np.int64)
+        layer = np.unique(neighbours[dist[neighbours] < 0])
+        dist[layer] = depth
+        return layer
+
+    def _cost(self, csr: Any, frontier) -> int:
+        if np is None:
+            return sum(int(csr.indptr[v + 1]) - int(csr.indptr[v]) for v in frontier)
+        return int((csr.indptr[frontier + 1] - csr.indptr[frontier]).sum())
+
+    def _meet(self, layer, other) -> list[int]:
+        if np is None:
+            return [v for v in layer if v in other]
+        return layer[other[layer] >= 0].tolist()
+
+    def _search(self, source: int, target: int, max_depth: int,
+                limit: int) -> list[list[int]]:
+        if source == target:
+            return [[source]]
+        forward, backward = self._distances()
+        layers: tuple[list, list] = ([], [])
+        try:
+            if np is not None:
+                front, back = np.array([source]), np.array([target])
+            else:
+                front, back = [source], [target]
+            forward[source] = 0
+            backward[target] = 0
+            layers[0].append(front)
+            layers[1].append(back)
+            depth_f = depth_b = 0
+            while len(front) and len(back) and depth_f + depth_b < max_depth:
+                if self._cost(self.graph, front) <= self._cost(self.reverse, back):
+                    depth_f += 1
+                    front = self._expand(self.graph, front, forward, depth_f)
+                    layers[0].append(front)
+                    meet = self._meet(front, backward)
+                else:
+                    depth_b += 1
+                    back = self._expand(self.reverse, back, backward, depth_b)
+                    layers[1].append(back)
+                    meet = self._meet(back, forward)
+                if meet:
+                    return self._paths(meet, forward, backward, limit)
+            return []
+        finally:
+            self.visited = sum(len(layer) for side in layers for layer in side)
+            for dist, side in zip((forward, backward), layers):
+                if np is not None:
+                    for layer in side:
+                        dist[layer] = -1
+                else:
+                    dist.clear()
+
+    def _steps(self, csr: Any, node: int, dist, depth: int) -> list[int]:
+        """Neighbours of ``node`` in ``csr`` at distance ``depth`` from their root."""
+        row = _row(csr, node)
+        if np is None:
+            return [int(v) for v in row if dist.get(v) == depth]
+        return row[dist[row] == depth].tolist()
+
+    def _walks(self, csr: Any, node: int, dist, limit: int,
+               memo: dict[int, list[list[int]]]) -> list[list[int]]:
+        """Up to ``limit`` shortest walks from ``node`` to the root of ``dist``."""
+        walks = memo.get(node)
+        if walks is None:
+            depth = int(dist[node])
+            if depth == 0:
+                walks = [[node]]
+            else:
+                walks = []
+                for step in self._steps(csr, node, dist, depth - 1):
+                    for walk in self._walks(csr, step, dist, limit, memo):
+                        walks.append([node, *walk])
+                        if len(walks) >= limit:
+                            break
+                    if len(walks) >= limit:
+                        break
+            memo[node] = walks
+        return walks
+
+    def _paths(self, meet: list[int], forward, backward, limit: int) -> list[list[int]]:
+        length = min(int(forward[v]) + int(backward[v]) for v in meet)
+        paths: list[list[int]] = []
+        heads: dict[int, list[list[int]]] = {}
+        tails: dict[int, list[list[int]]] = {}
+        for node in meet:
+            if int(forward[node]) + int(backward[node]) != length:
+                continue
+            # Predecessors towards the source are found through the reversed links.
+            for head in self._walks(self.reverse, node, forward, limit, heads):
+                for tail in self._walks(self.graph, node, backward, limit, tails):
+                    paths.append(head[::-1] + tail[1:])
+                    if len(paths) >= limit:
+                        return paths
+        return paths
+
+    def _nodes(self, source: str, target: str) -> tuple[int, int] | None:
+        if self.graph is None:
+            raise ValueError("no local link graph; use find() to search live")
+        start, goal = self.graph.id(source), self.graph.id(target)
+        if start is None or goal is None:
+            return None
+        return start, goal
+
+    def shortest_path(self, source: str, target: str, *,
+                      max_depth: int = _MAX_DEPTH) -> list[str] | None:
+        """One shortest path of titles from ``source`` to ``target``, or ``None``."""
+        paths = self.shortest_paths(source, target, limit=1, max_depth=max_depth)
+        return paths[0] if paths else None
+
+    def shortest_paths(self, source: str, target: str, *, limit: int = 1000,
+                       max_depth: int = _MAX_DEPTH) -> list[list[str]]:
+        """Up to ``limit`` shortest paths of titles (empty when there is none)."""
+        nodes = self._nodes(source, target)
+        if nodes is None:
+            return []
+        title = self.graph.title
+        return [[title(v) for v in path]
+                for path in self._search(*nodes, max_depth, limit)]
+
+    # -- live search -------------------------------------------------------
+
+    async def find(self, source: str, target: str, *, all_paths: bool = False,
+                   limit: int = 1000, max_depth: int = 6, max_pages: int = 5000,
+                   max_backlinks: int = 5000) -> list[list[str]]:
+        """Shortest paths from ``source`` to ``target``: one, or up to ``limit``.
+
+        With a local graph this is :meth:`shortest_paths`.  Otherwise the
+        wiki is searched live through :attr:`client` (a new
+        :class:`~wikiapi.client.WikiClient` if none was given), reading at
+        most ``max_pages`` pages' links and ``max_backlinks`` backlinks per
+        page; an empty list means no path was found within those bounds.
+        """
+        limit = limit if all_paths else 1
+        if self.graph is not None:
+            return self.shortest_paths(source, target, limit=limit, max_depth=max_depth)
+        if self.client is None:
+            self.client = WikiClient()
+            self._own_client = True
+        resolve = self.client.redirects.resolve
+        source, target = resolve(source), resolve(target)
+        if source == target:
+            return [[source]]
+        # Title -> distance, and for each visited title its neighbours one step back.
+        forward: dict[str, int] = {source: 0}
+        backward: dict[str, int] = {target: 0}
+        to_source: dict[str, list[str]] = {source: []}
+        to_target: dict[str, list[str]] = {target: []}
+        front, back = [source], [target]
+        depth_f = depth_b = fetched = 0
+        while front and back and depth_f + depth_b < max_depth and fetched < max_pages:
+            if len(front) <= len(back):
+                depth_f += 1
+                front = front[:max_pages - fetched]
+                fetched += len(front)
+                front = await self._live_links(front, forward, to_source, depth_f)
+                meet = [t for t in front if t in backward]
+            else:
+                depth_b += 1
+                back = back[:max_pages - fetched]
+                fetched += len(back)
+                back = await self._live_backlinks(back, backward, to_target, depth_b,
+                                                  max_backlinks)
+                meet = [t for t in back if t in forward]
+            if meet:
+                length = min(forward[t] + backward[t] for t in meet)
+                paths = []
+                for node in meet:
+                    if forward[node] + backward[node] != length:
+                        continue
+                    for head in _unwind(node, to_source, limit):
+                        for tail in _unwind(node, to_target, limit):
+                            paths.append(head[::-1] + tail[1:])
+                            if len(paths) >= limit:
+                                return paths
+                return paths
+        return []
+
+    async def _live_links(self, layer: list[str], dist: dict[str, int],
+                          parents: dict[str, list[str]], depth: int) -> list[str]:
+        resolve = self.client.redirects.resolve
+        found = []
+        for title, article in zip(layer, await self.client.fetch_articles(layer, links=True)):
+            for link in article.links:
+                link = resolve(link)
+                seen = dist.get(link)
+                if seen is None:
+                    dist[link] = depth
+                    parents[link] = [title]
+                    found.append(link)
+                elif seen == depth:
+                    parents[link].append(title)
+        return found
+
+    async def _live_backlinks(self, layer: list[str], dist: dict[str, int],
+                              parents: dict[str, list[str]], depth: int,
+                              limit: int) -> list[str]:
+        async def backlinks(title: str) -> list[str]:
+            titles = []
+            async for item in self.client.iter_list("backlinks", bltitle=title, blnamespace=0,
+                                                    bllimit="max"):
+                titles.append(item["title"])
+                if len(titles) >= limit:
+                    break
+            return titles
+
+        found = []
+        for title, linking in zip(layer, await asyncio.gather(*map(backlinks, layer))):
+            for other in linking:
+                seen = dist.get(other)
+                if seen is None:
+                    dist[other] = depth
+                    parents[other] = [title]
+                    found.append(other)
+                elif seen == depth:
+                    parents[other].append(title)
+        return found
+
+    async def close(self) -> None:
+        if self._own_client and self.client is not None:
+            await self.client.close()
+            self.client = None
+
+
+def _unwind(node: str, parents: dict[str, list[str]], limit: int) -> Iterator[list[str]]:
+    """Walks from ``node`` back to the root through ``parents``, at most ``limit``."""
+    stack = [[node]]
+    count = 0
+    while stack and count < limit:
+        walk = stack.pop()
+        steps = parents[walk[-1]]
+        if not steps:
+            count += 1
+            yield walk
+        else:
+            stack.extend([*walk, step] for step in reversed(steps))
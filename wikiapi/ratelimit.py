@@ -0,0 +1,151 @@
+"""Adaptive token-bucket rate limiting per wiki host.
+
+The bucket refills at ``rate`` requests per second.  The rate follows an
+AIMD policy: every throttle-free response nudges it up so that it grows by
+``increase`` requests/s per second of traffic, and every throttle signal
+(HTTP 429/503 or a ``maxlag`` error) multiplies it by ``decrease`` and pauses
+the bucket for the server's ``Retry-After`` or an exponential backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+from typing import Any
+from urllib.parse import urlsplit
+
+__all__ = ["RateLimiter", "RateLimiters", "parse_retry_after"]
+
+
+def parse_retry_after(value: str | None, *, now: float | None = None) -> float | None:
+    """Seconds to wait according to a ``Retry-After`` header, if usable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+class RateLimiter:
+    """Token bucket whose refill rate adapts to the server's throttling.
+
+    One instance is meant to be shared by every worker talking to a host.
+    ``acquire`` hands out tokens first come, first served.
+    """
+
+    def __init__(self, rate: float = 10.0, *, burst: float | None = None,
+                 min_rate: float = 0.5, max_rate: float = 200.0,
+                 increase: float = 1.0, decrease: float = 0.5,
+                 base_backoff: float = 1.0, max_backoff: float = 120.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if not min_rate <= rate <= max_rate:
+            raise ValueError("rate must lie between min_rate and max_rate")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be in (0, 1)")
+        self.rate = float(rate)
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+        self.backoff_until = 0.0
+        self._last_decrease = float("-inf")
+        self.throttle_streak = 0
+        self.acquired = 0
+        self.successes = 0
+        self.throttles = 0
+        self.waited = 0.0
+
+    @property
+    def capacity(self) -> float:
+        return self.burst if self.burst is not None else max(1.0, self.rate)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = self._clock()
+                if now < self.backoff_until:
+                    delay = self.backoff_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        self.acquired += 1
+                        return
+                    delay = (1.0 - self._tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        """Additive increase after a response that was not throttled."""
+        self.successes += 1
+        self.throttle_streak = 0
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        """Multiplicative decrease and a pause after a throttle signal.
+
+        Responses already in flight when the server started throttling all
+        report it; the rate is only cut once per backoff window so that one
+        burst of 429s does not collapse it to ``min_rate``.
+        """
+        now = self._clock()
+        self.throttles += 1
+        self.throttle_streak += 1
+        if retry_after is None:
+            retry_after = min(self.max_backoff,
+                              self.base_backoff * 2 ** (self.throttle_streak - 1))
+        if now >= self._last_decrease + max(retry_after, 1.0 / self.rate):
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._last_decrease = now
+        self.backoff_until = max(self.backoff_until, now + retry_after)
+        self._tokens = min(self._tokens, 0.0)
+
+    def metrics(self) -> dict[str, Any]:
+        now = self._clock()
+        return {
+            "rate": self.rate,
+            "tokens": self._tokens,
+            "backoff_remaining": max(0.0, self.backoff_until - now),
+            "throttle_streak": self.throttle_streak,
+            "acquired": self.acquired,
+            "successes": self.successes,
+            "throttles": self.throttles,
+            "waited": self.waited,
+        }
+
+
+class RateLimiters:
+    """One :class:`RateLimiter` per host, created on first use."""
+
+    def __init__(self, **limiter_options: Any):
+        self.options = limiter_options
+        self._limiters: dict[str, RateLimiter] = {}
+
+    def for_url(self, url: str) -> RateLimiter:
+        host = urlsplit(url).netloc
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = RateLimiter(**self.options)
+        return limiter
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        return {host: limiter.metrics() for host, limiter in self._limiters.items()}
@@ -0,0 +1,400 @@
+"""Local redirect and title normalization map.
+
+Every title fetch costs the API a normalization step and, for redirects, a
+lookup of the target, and a crawler meets the same few popular redirects
+("USA", "UK", ...) thousands of times.  :class:`RedirectMap` answers both
+locally: :func:`normalize_title` applies MediaWiki's rules (underscores,
+whitespace, namespace names, first letter) and the map follows redirect
+chains to the final target, stopping at loops.  The client resolves every
+title before it goes on the wire, so requests for known redirects go
+straight to their target and duplicate requests for the same page collapse.
+
+The map fills itself from the ``normalized`` and ``redirects`` parts of
+every query response (:meth:`RedirectMap.learn`), can be preloaded in
+bulk (:meth:`~wikiapi.client.WikiClient.preload_redirects`), or built
+offline from the ``redirect.sql.gz`` table dump
+(:meth:`RedirectMap.from_redirect_dump`) or the redirect pages of an XML
+dump (:meth:`RedirectMap.from_articles`).
+
+Learned entries live in a dict with interned strings, so the many
+redirects to one target share one string.  A map of millions of redirects
+is better saved once (:meth:`RedirectMap.save`) and mapped read-only
+(:meth:`RedirectMap.open`); the dict then only holds what was learned
+since.  The file stores chains already flattened, with every target once::
+
+    header      magic, version, counts, section offsets
+    src_offs    uint64[n+1] into src_blob
+    src_blob    UTF-8 source titles, sorted
+    src_target  uint32[n] target number per source
+    tgt_offs    uint64[t+1] into tgt_blob
+    tgt_blob    UTF-8 target titles
+"""
+
+from __future__ import annotations
+
+import bisect
+import bz2
+import gzip
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from .article import Article
+from .complete import _Strings
+from .dump import iter_index
+from .errors import RedirectLoopError
+from .index import np
+
+__all__ = ["NAMESPACES", "RedirectMap", "iter_redirect_sql", "normalize_title"]
+
+MAGIC = b"WIKIRD\x00\x00"
+VERSION = 1
+_SECTIONS = ("src_offs", "src_blob", "src_target", "tgt_offs", "tgt_blob")
+_HEADER = struct.Struct("<8sIIQQ" + "Q" * len(_SECTIONS))
+
+#: Namespace numbers and names of the English Wikipedia.
+NAMESPACES = {
+    0: "", 1: "Talk", 2: "User", 3: "User talk", 4: "Wikipedia", 5: "Wikipedia talk",
+    6: "File", 7: "File talk", 8: "MediaWiki", 9: "MediaWiki talk", 10: "Template",
+    11: "Template talk", 12: "Help", 13: "Help talk", 14: "Category", 15: "Category talk",
+    100: "Portal", 101: "Portal talk", 118: "Draft", 119: "Draft talk", 828: "Module",
+    829: "Module talk",
+}
+_NAMESPACE_NAMES = {name.lower(): name for name in NAMESPACES.values() if name}
+_NAMESPACE_NAMES.update({"image": "File", "image talk": "File talk", "wp": "Wikipedia",
+                         "project": "Wikipedia", "project talk": "Wikipedia talk"})
+
+
+def _ucfirst(text: str) -> str:
+    first = text[:1].upper()
+    # Characters such as "ß" upper-case to two; MediaWiki leaves those alone.
+    return first + text[1:] if len(first) == 1 else text
+
+
+def normalize_title(title: str, *, capitalize: bool = True) -> str:
+    """The title as MediaWiki would normalize it, without asking it.
+
+    Underscores become spaces, runs of whitespace collapse, a ``#fragment``
+    is dropped, and namespace names (and their aliases such as ``Image:``)
+    take their canonical spelling.  With ``capitalize`` (the default on
+    Wikipedia, but not on Wiktionary) the first letter of the title proper
+    is upper-cased.
+    """
+    title = " ".join(title.partition("#")[0].replace("_", " ").split())
+    title = title.removeprefix(":").lstrip()
+    prefix, colon, rest = title.partition(":")
+    namespace = _NAMESPACE_NAMES.get(prefix.rstrip().lower()) if colon else None
+    if namespace is not None:
+        rest = rest.lstrip()
+        return f"{namespace}:{_ucfirst(rest) if capitalize else rest}"
+    return _ucfirst(title) if capitalize else title
+
+
+_SQL_ROW = re.compile(rb"\((\d+),(-?\d+),'((?:[^'\\]|\\.)*)','((?:[^'\\]|\\.)*)',"
+                      rb"'((?:[^'\\]|\\.)*)'\)")
+_SQL_ESCAPE = re.compile(rb"\\(.)", re.S)
+_SQL_CHARS = {b"0": b"\x00", b"n": b"\n", b"r": b"\r", b"t": b"\t", b"Z": b"\x1a"}
+
+
+def _unescape(value: bytes) -> str:
+    if b"\\" in value:
+        value = _SQL_ESCAPE.sub(lambda m: _SQL_CHARS.get(m[1], m[1]), value)
+    return value.decode("utf-8", "replace")
+
+
+def _open_dump(path: str | os.PathLike) -> BinaryIO:
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_redirect_sql(path: str | os.PathLike) -> Iterator[tuple[int, int, str, str, str]]:
+    """Yield ``(rd_from, rd_namespace, rd_title, rd_interwiki, rd_fragment)``.
+
+    ``path`` is a (gzip or bzip2 compressed) ``redirect.sql`` table dump;
+    rows are read straight out of its ``INSERT`` statements.
+    """
+    with _open_dump(path) as fh:
+        for line in fh:
+            if not line.startswith(b"INSERT INTO"):
+                continue
+            for m in _SQL_ROW.finditer(line):
+                yield (int(m[1]), int(m[2]), _unescape(m[3]), _unescape(m[4]),
+                       _unescape(m[5]))
+
+
+class _Frozen:
+    """A redirect table written by :meth:`RedirectMap.save`, wrapped for lookups."""
+
+    def __init__(self, data: bytes | mmap.mmap):
+        self._data = data
+        self._buf = memoryview(data)
+        magic, version, _flags, n, t, *offsets = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a WikiAPI redirect table")
+        if version != VERSION:
+            raise ValueError(f"unsupported redirect table version {version}")
+        off = dict(zip(_SECTIONS, offsets))
+        self.sources = _Strings(self._buf, self._view(off["src_offs"], "Q", n + 1),
+                                off["src_blob"])
+        self.targets = _Strings(self._buf, self._view(off["tgt_offs"], "Q", t + 1),
+                                off["tgt_blob"])
+        self.target_of = self._view(off["src_target"], "I", n)
+
+    def _view(self, start: int, fmt: str, count: int):
+        if np is not None:
+            return np.frombuffer(self._data, dtype=np.dtype(fmt).newbyteorder("<"),
+                                 count=count, offset=start)
+        return self._buf[start:start + count * struct.calcsize(fmt)].cast(fmt)
+
+    def get(self, title: str) -> str | None:
+        key = title.encode("utf-8")
+        sources = self.sources
+        i = bisect.bisect_left(sources, key)
+        if i < len(sources) and sources[i] == key:
+            return self.targets[int(self.target_of[i])].decode("utf-8")
+        return None
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        targets = self.targets
+        for i in range(len(self.sources)):
+            yield (self.sources[i].decode("utf-8"),
+                   targets[int(self.target_of[i])].decode("utf-8"))
+
+    def close(self) -> None:
+        self.sources = self.targets = self.target_of = None
+        self._buf.release()
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:  # views still held elsewhere; freed on collection
+                pass
+
+
+class RedirectMap:
+    """Title → redirect target, resolved through chains without the network.
+
+    ``entries`` is an optional mapping or iterable of ``(source, target)``
+    pairs; both sides are normalized.  ``capitalize`` is passed on to
+    :func:`normalize_title` and must match the wiki.
+    """
+
+    def __init__(self, entries: Mapping[str, str] | Iterable[tuple[str, str]] = (), *,
+                 capitalize: bool = True):
+        self.capitalize = capitalize
+        #: Learned redirects; ``None`` marks a source that is no longer one.
+        self._map: dict[str, str | None] = {}
+        self._frozen: _Frozen | None = None
+        self._aliases: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        items = entries.items() if isinstance(entries, Mapping) else entries
+        for source, target in items:
+            self.add(source, target)
+
+    def normalize(self, title: str) -> str:
+        """``title`` normalized locally, or as the API last normalized it."""
+        alias = self._aliases.get(title)
+        if alias is not None:
+            return alias
+        return normalize_title(title, capitalize=self.capitalize)
+
+    def add(self, source: str, target: str) -> None:
+        """Record that ``source`` redirects to ``target``."""
+        source = self.normalize(source)
+        target = self.normalize(target)
+        if source != target:
+            self._map[sys.intern(source)] = sys.intern(target)
+
+    def discard(self, title: str) -> None:
+        """Forget that ``title`` is a redirect (it became an article)."""
+        title = self.normalize(title)
+        if self._map.get(title) is not None or (
+                self._frozen is not None and self._frozen.get(title) is not None):
+            self._map[title] = None
+
+    def learn(self, query: Mapping[str, Any]) -> None:
+        """Take the ``normalized`` and ``redirects`` entries of a query response.
+
+        Normalizations that :func:`normalize_title` would not have made
+        itself (say, a wiki-specific namespace alias) are remembered as
+        aliases.
+        """
+        for entry in query.get("normalized", ()):
+            source, target = entry["from"], entry["to"]
+            if normalize_title(source, capitalize=self.capitalize) != target:
+                self._aliases[sys.intern(source)] = sys.intern(target)
+        for entry in query.get("redirects", ()):
+            if not entry.get("tointerwiki"):
+                self.add(entry["from"], entry["to"])
+
+    def _target(self, title: str) -> str | None:
+        if title in self._map:
+            return self._map[title]
+        if self._frozen is not None:
+            return self._frozen.get(title)
+        return None
+
+    def chain(self, title: str) -> list[str]:
+        """Every title from ``title`` (normalized) to its final target.
+
+        A title that is not a redirect gives a one-element list.  Raises
+        :class:`~wikiapi.errors.RedirectLoopError` when the chain loops.
+        """
+        hops = [self.normalize(title)]
+        seen = {hops[0]}
+        while (target := self._target(hops[-1])) is not None:
+            if target in seen:
+                raise RedirectLoopError(hops + [target])
+            seen.add(target)
+            hops.append(target)
+        return hops
+
+    def resolve(self, title: str) -> str:
+        """The final target of ``title``, or ``title`` normalized if it is none.
+
+        A title caught in a redirect loop resolves to itself, so that the
+        API, rather than the map, reports the broken page.
+        """
+        try:
+            hops = self.chain(title)
+        except RedirectLoopError as exc:
+            self.misses += 1
+            return exc.titles[0]
+        if len(hops) > 1:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return hops[-1]
+
+    def __contains__(self, title: str) -> bool:
+        return self._target(self.normalize(title)) is not None
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        """Every ``(source, direct target)`` pair, learned entries included."""
+        if self._frozen is not None:
+            for source, target in self._frozen.items():
+                if source not in self._map:
+                    yield source, target
+        for source, target in self._map.items():
+            if target is not None:
+                yield source, target
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def loops(self) -> list[str]:
+        """Sources whose chain runs into a loop."""
+        looping = []
+        for source, _ in self.items():
+            try:
+                self.chain(source)
+            except RedirectLoopError:
+                looping.append(source)
+        return looping
+
+    @classmethod
+    def from_articles(cls, articles: Iterable[Article], *,
+                      capitalize: bool = True) -> RedirectMap:
+        """Collect the redirect pages of a dump (``Article.redirect`` set).
+
+        Pass all namespaces, e.g. ``DumpReader.iter_pages(None)``, to also
+        catch redirects from other namespaces into the main one.
+        """
+        return cls(((a.title, a.redirect) for a in articles if a.redirect), capitalize=capitalize)
+
+    @classmethod
+    def from_redirect_dump(cls, sql_path: str | os.PathLike,
+                           titles: Mapping[int, str] | str | os.PathLike, *,
+                           capitalize: bool = True) -> RedirectMap:
+        """Build from the ``redirect.sql.gz`` table dump.
+
+        The table names sources by page ID, so ``titles`` supplies the
+        titles: a page ID → title mapping, or the path of the multistream
+        index (``...-multistream-index.txt.bz2``), which is streamed and only
+        the redirecting page IDs are kept.  Interwiki redirects and targets
+        in namespaces missing from :data:`NAMESPACES` are skipped.
+        """
+        targets: dict[int, str] = {}
+        for pageid, namespace, title, interwiki, _ in iter_redirect_sql(sql_path):
+            name = NAMESPACES.get(namespace)
+            if interwiki or name is None:
+                continue
+            title = title.replace("_", " ")
+            targets[pageid] = sys.intern(f"{name}:{title}" if name else title)
+        if isinstance(titles, Mapping):
+            pairs = ((titles[p], t) for p, t in targets.items() if p in titles)
+        else:
+            pairs = ((title, targets[p]) for _, p, title in iter_index(titles) if p in targets)
+        return cls(pairs, capitalize=capitalize)
+
+    def save(self, path: str | os.PathLike) -> None:
+        """Write the map with every chain flattened to its final target.
+
+        Entries caught in loops are left out.
+        """
+        resolved = []
+        for source, _ in self.items():
+            try:
+                resolved.append((source.encode("utf-8"), self.chain(source)[-1]))
+            except RedirectLoopError:
+                continue
+        resolved.sort()
+        numbers: dict[str, int] = {}
+        target_of = array("I")
+        for _, target in resolved:
+            target_of.append(numbers.setdefault(target, len(numbers)))
+        src_offs = array("Q", [0])
+        for source, _ in resolved:
+            src_offs.append(src_offs[-1] + len(source))
+        encoded = [target.encode("utf-8") for target in numbers]
+        tgt_offs = array("Q", [0])
+        for target in encoded:
+            tgt_offs.append(tgt_offs[-1] + len(target))
+        sections = [src_offs.tobytes(), b"".join(s for s, _ in resolved), target_of.tobytes(),
+                    tgt_offs.tobytes(), b"".join(encoded)]
+        offsets = []
+        pos = _HEADER.size
+        for section in sections:
+            pos += -pos % 8
+            offsets.append(pos)
+            pos += len(section)
+        data = bytearray(pos)
+        _HEADER.pack_into(data, 0, MAGIC, VERSION, 0, len(resolved), len(numbers), *offsets)
+        for start, section in zip(offsets, sections):
+            data[start:start + len(section)] = section
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: str | os.PathLike, *, capitalize: bool = True) -> RedirectMap:
+        """Map a table written by :meth:`save` read-only; new entries stay in memory."""
+        redirects = cls(capitalize=capitalize)
+        with open(path, "rb") as fh:
+            redirects._frozen = _Frozen(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+        return redirects
+
+    def close(self) -> None:
+        if self._frozen is not None:
+            self._frozen.close()
+            self._frozen = None
+
+    def __enter__(self) -> RedirectMap:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
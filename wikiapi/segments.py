@@ -0,0 +1,591 @@
+"""Incrementally updatable search index made of immutable segments.
+
+A :class:`SegmentedIndex` lives in a directory of :mod:`~wikiapi.diskindex`
+files, the *segments*, plus an in-memory buffer for the newest documents.
+Documents are keyed by title.  Adding a title that is already indexed
+marks the old copy deleted (a *tombstone* in its segment's delete set) and
+puts the new one in the buffer; once the buffer holds ``flush_docs``
+documents it is written out as a new small segment.  Segment files never
+change after they are written; only their delete sets grow.
+
+As in an LSM tree, segments of similar size are merged in the background:
+whenever ``merge_factor`` segments share a size tier they are rewritten as
+one, dropping deleted documents.  Merging works on the stored postings, so
+no article text is needed.  Deletes that arrive while a merge runs are
+carried over to the merged segment before it replaces its inputs, and
+searches only ever see a complete set of segments, so results stay correct
+throughout.
+
+Scores use collection statistics over live documents (document count,
+average length and document frequency), so a query returns the same
+ranking as an index rebuilt from scratch over the same articles.
+
+``manifest.json`` lists the current segments and delete files; it is
+replaced atomically on every :meth:`SegmentedIndex.flush`, so a crash
+leaves the index as of the last flush.  :meth:`apply_recent_changes` and
+:meth:`apply_snapshot` feed the index from the live ``recentchanges`` list
+or from a fresh crawl.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections.abc import Iterable, Mapping
+from operator import itemgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .article import Article
+from .diskindex import DiskIndex, write_columns
+from .index import InvertedIndex, SearchHit, np, rank_bm25, tokenize
+
+if TYPE_CHECKING:
+    from .client import WikiClient
+    from .centrality import PageRank
+
+__all__ = ["SegmentedIndex"]
+
+_MANIFEST = "manifest.json"
+_SEGMENT_FILE = re.compile(r"seg-\d+\.(idx|\d+\.del)$")
+
+
+class _Segment:
+    """One immutable segment file, or the mutable in-memory buffer."""
+
+    __slots__ = ("name", "index", "deleted", "del_file", "dirty", "_titles", "_dead")
+
+    def __init__(self, name: str | None, index: DiskIndex | InvertedIndex,
+                 deleted: Iterable[int] = (), del_file: str | None = None):
+        self.name = name
+        self.index = index
+        self.deleted: set[int] = set(deleted)
+        self.del_file = del_file
+        self.dirty = False
+        # Title -> doc ID, only kept for the buffer.
+        self._titles: dict[str, int] | None = {} if name is None else None
+        self._dead = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def live(self) -> int:
+        return len(self.index) - len(self.deleted)
+
+    def title(self, docid: int) -> str:
+        index = self.index
+        return index.titles[docid] if self._titles is not None else index.title(docid)
+
+    def find(self, title: str) -> int | None:
+        if self._titles is not None:
+            docid = self._titles.get(title)
+        else:
+            docid = self.index.find(title)
+        return None if docid is None or docid in self.deleted else docid
+
+    def add(self, title: str, text: str, pageid: int | None) -> int:
+        docid = self._titles[title] = self.index.add(title, text, pageid)
+        return docid
+
+    def delete(self, docid: int) -> None:
+        self.deleted.add(docid)
+        self.dirty = True
+        self._dead = None
+
+    def postings(self, term: str):
+        """Live ``(docids, tfs)`` of ``term`` in this segment, or ``None``."""
+        if self._titles is not None:
+            found = self.index.postings.get(term)
+            if found is not None and np is not None:
+                found = (np.frombuffer(found[0], dtype=np.uint32),
+                         np.frombuffer(found[1], dtype=np.uint32))
+        else:
+            found = self.index.postings(term)
+        if found is None or not self.deleted:
+            return found
+        docids, tfs = found
+        if np is not None:
+            if self._dead is None:
+                self._dead = np.fromiter(self.deleted, dtype=np.uint32, count=len(self.deleted))
+            keep = ~np.isin(docids, self._dead)
+            docids, tfs = docids[keep], tfs[keep]
+        else:
+            dead = self.deleted
+            keep = [i for i, d in enumerate(docids) if d not in dead]
+            docids, tfs = [docids[i] for i in keep], [tfs[i] for i in keep]
+        return (docids, tfs) if len(docids) else None
+
+    def iter_terms(self):
+        if self._titles is not None:
+            postings = self.index.postings
+            return ((term, *postings[term]) for term in sorted(postings))
+        return self.index.iter_terms()
+
+
+def _write_segment(path: Path, sources: list[_Segment], deleted: list[set[int]],
+                   k1: float, b: float) -> list:
+    """Write the live documents of ``sources`` as one segment file.
+
+    Returns, per source, the map from its doc IDs to the new segment's
+    (-1 for dropped documents).
+    """
+    titles: list[str] = []
+    pageids = array("q")
+    lengths = array("I")
+    remaps = []
+    for seg, dead in zip(sources, deleted):
+        base = len(titles)
+        n = len(seg)
+        if np is not None:
+            alive = np.ones(n, dtype=bool)
+            alive[np.fromiter(dead, dtype=np.int64, count=len(dead))] = False
+            remap = np.where(alive, np.cumsum(alive) - 1 + base, -1)
+        else:
+            remap, next_id = [], base
+            for d in range(n):
+                remap.append(-1 if d in dead else next_id)
+                next_id += d not in dead
+        seg_pageids, seg_lengths = seg.index.pageids, seg.index.lengths
+        for d in range(n):
+            if d not in dead:
+                titles.append(seg.title(d))
+                pageids.append(int(seg_pageids[d]))
+                lengths.append(int(seg_lengths[d]))
+        remaps.append(remap)
+
+    def tagged(i: int):
+        for term, ids, tfs in sources[i].iter_terms():
+            yield term, i, ids, tfs
+
+    def postings():
+        streams = [tagged(i) for i in range(len(sources))]
+        for term, group in itertools.groupby(heapq.merge(*streams, key=itemgetter(0)),
+                                             key=itemgetter(0)):
+            all_ids, all_tfs = [], []
+            for _, i, ids, tfs in group:
+                remap = remaps[i]
+                if np is not None:
+                    new = remap[np.asarray(ids, dtype=np.int64)]
+                    keep = new >= 0
+                    all_ids.append(new[keep])
+                    all_tfs.append(np.asarray(tfs)[keep])
+                else:
+                    for d, tf in zip(ids, tfs):
+                        if remap[d] >= 0:
+                            all_ids.append(remap[d])
+                            all_tfs.append(tf)
+            if np is not None:
+                ids, tfs = np.concatenate(all_ids), np.concatenate(all_tfs)
+            else:
+                ids, tfs = all_ids, all_tfs
+            if len(ids):
+                yield term, ids, tfs
+
+    write_columns(path, titles, pageids, lengths, postings(), k1=k1, b=b)
+    return remaps
+
+
+class SegmentedIndex:
+    """BM25 index over segment files that takes updates and deletions.
+
+    ``flush_docs`` bounds the in-memory buffer; ``merge_factor`` segments of
+    one size tier are merged into the next tier.  With ``background=True``
+    merges run on a daemon thread, otherwise call :meth:`merge`.
+    """
+
+    def __init__(self, directory: str | os.PathLike, *, k1: float = 1.2, b: float = 0.75,
+                 flush_docs: int = 10_000, merge_factor: int = 4, background: bool = True):
+        if merge_factor < 2:
+            raise ValueError("merge_factor must be at least 2")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.flush_docs = flush_docs
+        self.merge_factor = merge_factor
+        self._lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self._generation = 0
+        self._segments: list[_Segment] = []
+        #: Segment being written by a merge, not yet in the manifest.
+        self._merging: str | None = None
+        self._load()
+        self._buffer = self._new_buffer()
+        self._live_docs = sum(seg.live for seg in self._segments)
+        self._live_length = sum(self._live_length_of(seg) for seg in self._segments)
+        self.merges = 0
+        self._merge_error: BaseException | None = None
+        self._wakeup = threading.Condition()
+        self._pending = False
+        self._closing = False
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._merge_loop, daemon=True,
+                                            name="wikiapi-index-merge")
+            self._thread.start()
+
+    # -- persistence -------------------------------------------------------
+
+    def _load(self) -> None:
+        path = self.directory / _MANIFEST
+        if not path.exists():
+            return
+        manifest = json.loads(path.read_text())
+        self.k1, self.b = manifest["k1"], manifest["b"]
+        self._generation = manifest["generation"]
+        for entry in manifest["segments"]:
+            deleted: Iterable[int] = ()
+            if entry["deletes"]:
+                deleted = array("I", (self.directory / entry["deletes"]).read_bytes())
+            index = DiskIndex(self.directory / f"{entry['name']}.idx")
+            self._segments.append(_Segment(entry["name"], index, deleted, entry["deletes"]))
+        self._remove_unreferenced()
+
+    def _live_length_of(self, seg: _Segment) -> int:
+        lengths = seg.index.lengths
+        total = int(lengths.sum(dtype=np.uint64)) if np is not None else sum(lengths)
+        return total - sum(int(lengths[d]) for d in seg.deleted)
+
+    def _new_buffer(self) -> _Segment:
+        return _Segment(None, InvertedIndex(k1=self.k1, b=self.b))
+
+    def _next_name(self) -> str:
+        self._generation += 1
+        return f"seg-{self._generation:08d}"
+
+    def _write_manifest(self) -> None:
+        """Persist dirty delete sets, then atomically replace the manifest."""
+        for seg in self._segments:
+            if seg.dirty:
+                self._generation += 1
+                seg.del_file = f"{seg.name}.{self._generation}.del"
+                data = array("I", sorted(seg.deleted)).tobytes()
+                with open(self.directory / seg.del_file, "wb") as fh:
+                    fh.write(data)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                seg.dirty = False
+        manifest = {
+            "k1": self.k1,
+            "b": self.b,
+            "generation": self._generation,
+            "segments": [{"name": s.name, "deletes": s.del_file} for s in self._segments],
+        }
+        tmp = self.directory / (_MANIFEST + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.directory / _MANIFEST)
+        self._remove_unreferenced()
+
+    def _remove_unreferenced(self) -> None:
+        """Delete segment and delete-set files the manifest no longer lists."""
+        keep = {f"{s.name}.idx" for s in self._segments}
+        if self._merging is not None:
+            keep.add(f"{self._merging}.idx")
+        keep.update(s.del_file for s in self._segments if s.del_file)
+        for path in self.directory.iterdir():
+            if _SEGMENT_FILE.match(path.name) and path.name not in keep:
+                try:
+                    path.unlink()
+                except OSError:  # still mapped on Windows; retried next time
+                    pass
+
+    # -- updates -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    @property
+    def segments(self) -> int:
+        return len(self._segments)
+
+    def add(self, title: str, text: str, pageid: int | None = None) -> None:
+        """Index ``title``, replacing any document already indexed under it."""
+        with self._lock:
+            self._delete(title)
+            buffer = self._buffer
+            docid = buffer.add(title, text, pageid)
+            self._live_docs += 1
+            self._live_length += buffer.index.lengths[docid]
+            if len(buffer) >= self.flush_docs:
+                self.flush()
+
+    def add_article(self, article: Article) -> None:
+        """Index ``article``; missing and redirect pages are removed instead."""
+        if article.missing or article.redirect is not None:
+            self.delete(article.title)
+        else:
+            self.add(article.title, article.text, article.pageid)
+
+    def update(self, articles: Iterable[Article]) -> None:
+        for article in articles:
+            self.add_article(article)
+
+    def delete(self, title: str) -> bool:
+        """Remove ``title``; return ``False`` if it was not indexed."""
+        with self._lock:
+            return self._delete(title)
+
+    def _delete(self, title: str) -> bool:
+        # A title has at most one live copy; newer segments are likelier.
+        for seg in itertools.chain((self._buffer,), reversed(self._segments)):
+            docid = seg.find(title)
+            if docid is not None:
+                seg.delete(docid)
+                self._live_docs -= 1
+                self._live_length -= int(seg.index.lengths[docid])
+                return True
+        return False
+
+    def flush(self) -> None:
+        """Write the buffer as a new segment and persist all deletions."""
+        if self._merge_error is not None:
+            error, self._merge_error = self._merge_error, None
+            raise error
+        with self._lock:
+            buffer = self._buffer
+            if buffer.live:
+                name = self._next_name()
+                path = self.directory / f"{name}.idx"
+                _write_segment(path, [buffer], [buffer.deleted], self.k1, self.b)
+                self._segments.append(_Segment(name, DiskIndex(path)))
+            self._buffer = self._new_buffer()
+            self._write_manifest()
+        self._request_merge()
+
+    # -- merging -----------------------------------------------------------
+
+    def _tier(self, seg: _Segment) -> int:
+        return max(0, int(math.log(max(seg.live, 1) / self.flush_docs, self.merge_factor)))
+
+    def _pick_merge(self) -> list[_Segment]:
+        """Segments to merge next: a full size tier, or a mostly deleted one."""
+        tiers: dict[int, list[_Segment]] = {}
+        for seg in self._segments:
+            if len(seg.deleted) * 2 > len(seg):
+                return [seg]
+            tiers.setdefault(self._tier(seg), []).append(seg)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return sorted(tiers[tier], key=len)[:self.merge_factor]
+        return []
+
+    def _merge_once(self, *, full: bool = False) -> bool:
+        # Segments are picked under the merge lock, so no other merge can
+        # replace them before they are swapped out below.
+        with self._merge_lock:
+            with self._lock:
+                if full:
+                    picked = list(self._segments)
+                    if len(picked) < 2 and not any(seg.deleted for seg in picked):
+                        return False
+                else:
+                    picked = self._pick_merge()
+                if not picked:
+                    return False
+                before = [set(seg.deleted) for seg in picked]
+                if all(len(deleted) == len(seg) for seg, deleted in zip(picked, before)):
+                    self._segments = [s for s in self._segments if s not in picked]
+                    self._write_manifest()
+                    return True
+                name = self._merging = self._next_name()
+            # The expensive part runs without the lock; inputs are immutable.
+            path = self.directory / f"{name}.idx"
+            try:
+                remaps = _write_segment(path, picked, before, self.k1, self.b)
+                merged = _Segment(name, DiskIndex(path))
+                with self._lock:
+                    for seg, deleted, remap in zip(picked, before, remaps):
+                        for docid in seg.deleted - deleted:
+                            merged.delete(int(remap[docid]))
+                    position = self._segments.index(picked[0])
+                    segments = [s for s in self._segments if s not in picked]
+                    segments.insert(min(position, len(segments)), merged)
+                    self._segments = segments
+                    self._write_manifest()
+                    self.merges += 1
+            finally:
+                self._merging = None
+            # Searches still running on the inputs keep their mappings alive.
+            return True
+
+    def merge(self, *, full: bool = False) -> None:
+        """Run due merges now; ``full=True`` merges everything into one segment."""
+        if full:
+            self.flush()
+            self._merge_once(full=True)
+        while self._merge_once():
+            pass
+
+    def _request_merge(self) -> None:
+        if self._thread is None:
+            return
+        with self._wakeup:
+            self._pending = True
+            self._wakeup.notify()
+
+    def _merge_loop(self) -> None:
+        while True:
+            with self._wakeup:
+                while not self._pending and not self._closing:
+                    self._wakeup.wait()
+                if self._closing:
+                    return
+                self._pending = False
+            try:
+                while self._merge_once():
+                    pass
+            except Exception as exc:  # surfaced by the next flush()
+                self._merge_error = exc
+
+    # -- search ------------------------------------------------------------
+
+    def search(self, query: str, k: int = 10, *, priors: PageRank | None = None
+               ) -> list[SearchHit]:
+        """Return the ``k`` best live documents for ``query`` by BM25 score.
+
+        With ``priors``, each document's PageRank boost is added to its
+        score.  ``SearchHit.docid`` is only meaningful within one result
+        list; merges renumber documents.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not terms or k <= 0 or not self._live_docs:
+                return []
+            segments = [*self._segments, self._buffer]
+            bases = list(itertools.accumulate((len(s) for s in segments), initial=0))
+            k1, b = self.k1, self.b
+            scale = b * self._live_docs / self._live_length if self._live_length else 0.0
+            columns = []
+            for term in terms:
+                parts = []
+                for seg, base in zip(segments, bases):
+                    found = seg.postings(term)
+                    if found is None:
+                        continue
+                    ids, tfs = found
+                    lengths = seg.index.lengths
+                    if np is not None:
+                        if isinstance(lengths, array):
+                            lengths = np.frombuffer(lengths, dtype=np.uint32)
+                        norms = k1 * (1 - b + scale * lengths[ids])
+                        parts.append((ids.astype(np.int64) + base, tfs, norms))
+                    else:
+                        norms = [k1 * (1 - b + scale * lengths[d]) for d in ids]
+                        parts.append(([base + d for d in ids], tfs, norms))
+                if parts:
+                    if np is not None:
+                        columns.append(tuple(np.concatenate(col) for col in zip(*parts)))
+                    else:
+                        columns.append(tuple(list(itertools.chain(*col)) for col in zip(*parts)))
+            if not columns:
+                return []
+            prior = None
+            if priors is not None:
+                # Per-segment columns, cached by the scores, in search numbering.
+                parts = [priors.column(seg.index) for seg in segments]
+                prior = np.concatenate(parts) if np is not None else list(
+                    itertools.chain(*parts))
+            best = rank_bm25(columns, None, self._live_docs, k, k1, prior)
+            hits = []
+            for score, docid in best:
+                i = bisect.bisect_right(bases, docid) - 1
+                seg, local = segments[i], docid - bases[i]
+                pageid = int(seg.index.pageids[local])
+                hits.append(SearchHit(docid, seg.title(local), None if pageid < 0 else pageid,
+                                      score))
+            return hits
+
+    # -- feeds -------------------------------------------------------------
+
+    async def apply_recent_changes(self, client: WikiClient, since: str | None = None, *,
+                                   namespace: int = 0) -> str | None:
+        """Bring the index up to date with the wiki's ``recentchanges`` feed.
+
+        Edited, created, restored and moved-to pages since the ``since``
+        timestamp are refetched and reindexed; deleted and moved-from titles
+        are removed.  Returns the newest timestamp seen, to pass as ``since``
+        next time (recentchanges only reaches back about 30 days).
+        """
+        params: dict[str, Any] = {"rcprop": "title|ids|timestamp|loginfo", "rclimit": "max",
+                                  "rcnamespace": namespace, "rcdir": "newer",
+                                  "rctype": "edit|new|log"}
+        if since is not None:
+            params["rcstart"] = since
+        latest = since
+        changed: dict[str, bool] = {}
+        async for change in client.iter_list("recentchanges", **params):
+            latest = change.get("timestamp", latest)
+            title = change["title"]
+            if change["type"] != "log":
+                changed[title] = True
+            elif change.get("logtype") == "delete":
+                changed[title] = change.get("logaction") == "restore"
+            elif change.get("logtype") == "move":
+                changed[title] = False
+                target = change.get("logparams", {}).get("target_title")
+                if target is not None:
+                    changed[target] = True
+        for title in [t for t, present in changed.items() if not present]:
+            self.delete(title)
+        refetch = [t for t, present in changed.items() if present]
+        for title, article in zip(refetch, await client.fetch_articles(refetch)):
+            if article is None or article.missing:
+                self.delete(title)
+            elif article.title != title:  # now a redirect; index its target
+                self.delete(title)
+                self.add_article(article)
+            else:
+                self.add_article(article)
+        self.flush()
+        return latest
+
+    def apply_snapshot(self, articles: Iterable[Article],
+                       previous: Mapping[str, int | None]) -> dict[str, int | None]:
+        """Apply the difference between a new crawl and the previous one.
+
+        ``previous`` maps each title of the earlier snapshot to its revision
+        ID.  Articles whose revision changed, or that are new, are reindexed;
+        titles absent from ``articles`` are removed.  Returns the mapping for
+        ``articles``, to pass as ``previous`` next time.
+        """
+        current: dict[str, int | None] = {}
+        for article in articles:
+            current[article.title] = article.revid
+            if (article.title not in previous or previous[article.title] != article.revid
+                    or article.revid is None):
+                self.add_article(article)
+        for title in previous.keys() - current.keys():
+            self.delete(title)
+        self.flush()
+        return current
+
+    def close(self) -> None:
+        """Flush, stop the merge thread and release the segment files."""
+        self.flush()
+        if self._thread is not None:
+            with self._wakeup:
+                self._closing = True
+                self._wakeup.notify()
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            for seg in self._segments:
+                seg.index.close()
+            self._segments = []
+
+    def __enter__(self) -> SegmentedIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
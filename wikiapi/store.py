@@ -0,0 +1,446 @@
+"""Compressed article store with random access by page ID.
+
+Crawls and dumps produce millions of small pages, and a file per page
+wastes a disk block and an inode on each.  :class:`ArticleStore` appends
+them to one data file instead: records are collected in an open block of
+up to ``block_size`` bytes, and each full block is compressed on its own,
+so a page is read back by decompressing just the block that holds it.
+
+Pages of one wiki share much of their markup (infobox and citation
+templates, section headings, category and interlanguage links), but a
+block of a few dozen kilobytes holds too little of it to compress well.
+The store therefore trains a dictionary on the first ``train_bytes`` of
+records and compresses every block with it: with zstd when the
+``zstandard`` package is installed, otherwise with a zlib preset
+dictionary (``zdict``) made of the pieces most pages share.  The codec
+and dictionary are fixed when the store is created and kept in its index.
+
+A store is a directory of two files::
+
+    articles.dat    compressed blocks, back to back
+    articles.idx    header (magic, version, codec, counts, data length),
+                    dictionary, padded to 8 bytes
+                    block_offs  uint64[blocks+1] into articles.dat
+                    pageids     uint64[pages], sorted
+                    locations   uint64[pages], block << 32 | offset in the block
+
+Within a decompressed block each record is a uint32 length followed by
+the page as compact JSON.  :meth:`ArticleStore.get` finds the page ID by
+binary search over the mapped index and takes the block from an LRU cache
+of ``cache_blocks`` decompressed blocks, so pages stored together, as a
+crawl stores neighbours, cost one decompression between them.
+
+Adding a page that is already stored appends the new copy and points the
+index at it; the old copy stays in its block (see
+:attr:`ArticleStore.dead`) until the store is copied into a new one.
+:meth:`ArticleStore.flush` writes out the open block and replaces the
+index atomically.  Reopening a store cuts off blocks written after the
+last flush, so a crash loses at most the pages added since.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import re
+import struct
+import zlib
+from array import array
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from .article import Article
+from .graph import _map, _release, _write
+from .index import np
+
+try:
+    import zstandard as zstd
+except ImportError:  # pragma: no cover - optional dependency
+    zstd = None
+
+__all__ = ["ArticleStore"]
+
+MAGIC = b"WIKIART\x00"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQQI4x")
+_RECORD = struct.Struct("<I")
+_DATA = "articles.dat"
+_INDEX = "articles.idx"
+_LOW = 0xFFFFFFFF
+#: Where pages' JSON tends to repeat itself: line breaks, list items, sentences.
+_PIECE = re.compile(rb'\\n|","|\. ')
+
+
+class _Zlib:
+    """Raw deflate with a preset dictionary."""
+
+    name = "zlib"
+    default_level = 9
+    #: The deflate window; dictionary bytes further back are never referenced.
+    max_dictionary = 1 << 15
+
+    def __init__(self, level: int, dictionary: bytes):
+        self._options = {"zdict": dictionary} if dictionary else {}
+        self._level = level
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, -15, **self._options)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompressobj(-15, **self._options).decompress(data)
+
+    @staticmethod
+    def train(samples: list[bytes], size: int) -> bytes:
+        """The pieces shared by most samples, the most valuable last (nearest the data)."""
+        frequency: Counter[bytes] = Counter()
+        for sample in samples:
+            frequency.update({piece for piece in _PIECE.split(sample) if 8 <= len(piece) <= 512})
+        ranked = sorted(((count - 1) * len(piece), piece)
+                        for piece, count in frequency.items() if count > 1)
+        chosen: list[bytes] = []
+        room = size
+        for _, piece in reversed(ranked):
+            if len(piece) <= room:
+                chosen.append(piece)
+                room -= len(piece)
+        return b"".join(reversed(chosen))
+
+
+class _Zstd:
+    """Zstandard with a dictionary trained by ``zstandard.train_dictionary``."""
+
+    name = "zstd"
+    default_level = 9
+    max_dictionary = 1 << 20
+
+    def __init__(self, level: int, dictionary: bytes):
+        data = zstd.ZstdCompressionDict(dictionary) if dictionary else None
+        self._compressor = zstd.ZstdCompressor(level=level, dict_data=data)
+        self._decompressor = zstd.ZstdDecompressor(dict_data=data)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+    @staticmethod
+    def train(samples: list[bytes], size: int) -> bytes:
+        try:
+            return zstd.train_dictionary(size, samples).as_bytes()
+        except zstd.ZstdError:  # too few or too small samples to learn from
+            return b""
+
+
+_CODECS = (_Zlib, _Zstd)
+
+
+def _record(article: Article) -> bytes:
+    fields = {"title": article.title, "ns": article.ns, "revid": article.revid,
+              "text": article.text}
+    if article.links:
+        fields["links"] = article.links
+    if article.redirect is not None:
+        fields["redirect"] = article.redirect
+    return json.dumps(fields, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _article(pageid: int, record) -> Article:
+    return Article(pageid=pageid, **json.loads(record))
+
+
+class ArticleStore:
+    """Articles keyed by page ID in dictionary-compressed blocks under ``directory``.
+
+    An existing store is opened with the codec and dictionary it was
+    created with.  A new one uses ``codec`` (``"zstd"`` when ``zstandard``
+    is installed, else ``"zlib"``) and ``dictionary`` if given, for example
+    another store's :attr:`dictionary`; otherwise one of up to
+    ``dict_size`` bytes is trained on the first ``train_bytes`` of records,
+    or on those added before the first :meth:`flush` if that comes sooner.
+    """
+
+    def __init__(self, directory: str | os.PathLike, *, codec: str | None = None,
+                 level: int | None = None, block_size: int = 1 << 14,
+                 cache_blocks: int = 64, dictionary: bytes | None = None,
+                 dict_size: int = 1 << 17, train_bytes: int = 1 << 23):
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self.dict_size = dict_size
+        self.train_bytes = train_bytes
+        self.hits = 0
+        self.misses = 0
+        self._maps: list = []
+        self._cache: OrderedDict[int, bytes] = OrderedDict()
+        #: Records of the block being filled.
+        self._open = bytearray()
+        #: Page ID → location of copies added since the index was written.
+        self._new: dict[int, int] = {}
+        #: Records waiting for the dictionary to be trained on them, or ``None``.
+        self._pending: dict[int, bytes] | None = None
+        self._pending_bytes = 0
+        index = self.directory / _INDEX
+        data = self.directory / _DATA
+        if index.exists():
+            kind, self._offsets, self._records = self._load(index)
+            if codec is not None and codec != kind.name:
+                raise ValueError(f"{self.directory} is a {kind.name} store, not {codec}")
+        else:
+            if codec not in (None, "zstd", "zlib"):
+                raise ValueError(f"unknown codec {codec!r}; use 'zstd' or 'zlib'")
+            kind = (_Zstd if (codec or ("zstd" if zstd is not None else "zlib")) == "zstd"
+                    else _Zlib)
+            self._offsets = array("Q", [0])
+            self._records = 0
+            self._ids = self._locations = array("Q")
+            self._dictionary = b""
+            if dictionary is None:
+                self._pending = {}
+            else:
+                self._dictionary = bytes(dictionary)
+        if kind is _Zstd and zstd is None:
+            raise ValueError("zstd stores need the zstandard package")
+        self._kind = kind
+        self.level = kind.default_level if level is None else level
+        self._codec = kind(self.level, self._dictionary)
+        self._data = open(data, "r+b" if data.exists() else "w+b")
+        self._data.truncate(self._offsets[-1])
+        self._count = len(self._ids)
+
+    def _load(self, path: Path) -> tuple[type, array, int]:
+        """Map the index file; returns the codec, block offsets and record count."""
+        maps: list = []
+        data = _map(path)
+        maps.append(data)
+        (magic, version, codec, blocks, pages, records, length,
+         dict_len) = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            _release(maps)
+            raise ValueError(f"{path} is not a version {VERSION} article store index")
+        pos = _HEADER.size
+        self._dictionary = bytes(data[pos:pos + dict_len])
+        pos += dict_len + (-dict_len % 8)
+        offsets = array("Q", data[pos:pos + 8 * (blocks + 1)])
+        if offsets[-1] != length:
+            _release(maps)
+            raise ValueError(f"{path} is damaged: block offsets do not match the data length")
+        pos += 8 * (blocks + 1)
+        if np is not None:
+            self._ids = np.frombuffer(data, dtype="<u8", count=pages, offset=pos)
+            self._locations = np.frombuffer(data, dtype="<u8", count=pages,
+                                            offset=pos + 8 * pages)
+        else:
+            view = memoryview(data)
+            maps.append(view)
+            self._ids = view[pos:pos + 8 * pages].cast("Q")
+            self._locations = view[pos + 8 * pages:pos + 16 * pages].cast("Q")
+            maps += [self._ids, self._locations]
+        _release(self._maps)
+        self._maps = maps
+        return _CODECS[codec], offsets, records
+
+    # -- reading -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, pageid: int) -> bool:
+        return self._location(pageid) is not None
+
+    @property
+    def dictionary(self) -> bytes:
+        """The compression dictionary (empty until it is trained)."""
+        return self._dictionary
+
+    @property
+    def codec(self) -> str:
+        return self._kind.name
+
+    @property
+    def nbytes(self) -> int:
+        """Compressed size of the blocks written so far."""
+        return self._offsets[-1]
+
+    @property
+    def dead(self) -> int:
+        """Stored copies that a newer copy of the same page replaced."""
+        return self._records + len(self._pending or ()) - self._count
+
+    def _find(self, pageid: int) -> int | None:
+        """Location of ``pageid`` in the mapped index."""
+        ids = self._ids
+        if np is not None and not isinstance(ids, array):
+            i = int(np.searchsorted(ids, pageid))
+        else:
+            i = bisect.bisect_left(ids, pageid)
+        if i < len(ids) and ids[i] == pageid:
+            return int(self._locations[i])
+        return None
+
+    def _location(self, pageid: int) -> int | None:
+        if self._pending is not None and pageid in self._pending:
+            return -1
+        location = self._new.get(pageid)
+        return self._find(pageid) if location is None else location
+
+    def _block(self, block: int):
+        """Block number ``block``, decompressed."""
+        if block == len(self._offsets) - 1:
+            return self._open
+        data = self._cache.get(block)
+        if data is not None:
+            self.hits += 1
+            self._cache.move_to_end(block)
+            return data
+        self.misses += 1
+        start = self._offsets[block]
+        self._data.seek(start)
+        data = self._codec.decompress(self._data.read(self._offsets[block + 1] - start))
+        self._cache[block] = data
+        if len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return data
+
+    def _read(self, pageid: int, location: int) -> Article:
+        if location < 0:
+            return _article(pageid, self._pending[pageid])
+        data = self._block(location >> 32)
+        offset = location & _LOW
+        (length,) = _RECORD.unpack_from(data, offset)
+        return _article(pageid, data[offset + 4:offset + 4 + length])
+
+    def get(self, pageid: int) -> Article | None:
+        """The latest stored copy of page ``pageid``, or ``None``."""
+        location = self._location(pageid)
+        return None if location is None else self._read(pageid, location)
+
+    def get_many(self, pageids: Iterable[int]) -> list[Article | None]:
+        """The pages ``pageids``, in order, reading each block once for all of them."""
+        pageids = list(pageids)
+        out: list[Article | None] = [None] * len(pageids)
+        found = [(location, i) for i, pageid in enumerate(pageids)
+                 if (location := self._location(pageid)) is not None]
+        for location, i in sorted(found):
+            out[i] = self._read(pageids[i], location)
+        return out
+
+    def __iter__(self) -> Iterator[Article]:
+        """Every stored page once, its latest copy, in the order they were stored."""
+        ids, locations = self._merged()
+        for location, pageid in sorted(zip(locations.tolist(), ids.tolist())):
+            yield self._read(pageid, location)
+        if self._pending:
+            for pageid, record in list(self._pending.items()):
+                yield _article(pageid, record)
+
+    # -- writing -----------------------------------------------------------
+
+    def add(self, article: Article) -> None:
+        """Store ``article``, replacing an earlier copy of the same page."""
+        if article.pageid is None or article.missing:
+            raise ValueError(f"{article.title!r} has no page ID to store it under")
+        pageid = article.pageid
+        record = _record(article)
+        if self._location(pageid) is None:
+            self._count += 1
+        if self._pending is None:
+            self._append(pageid, record)
+            return
+        self._pending_bytes += len(record) - len(self._pending.pop(pageid, b""))
+        self._pending[pageid] = record
+        if self._pending_bytes >= self.train_bytes:
+            self._train()
+
+    def add_articles(self, articles: Iterable[Article]) -> int:
+        """Store every article that has a page ID; returns how many were stored."""
+        count = 0
+        for article in articles:
+            if article.pageid is not None and not article.missing:
+                self.add(article)
+                count += 1
+        return count
+
+    def _train(self) -> None:
+        pending, self._pending = self._pending, None
+        size = min(self.dict_size, self._kind.max_dictionary)
+        self._dictionary = self._kind.train(list(pending.values()), size) if pending else b""
+        self._codec = self._kind(self.level, self._dictionary)
+        for pageid, record in pending.items():
+            self._append(pageid, record)
+
+    def _append(self, pageid: int, record: bytes) -> None:
+        if self._open and len(self._open) + _RECORD.size + len(record) > self.block_size:
+            self._seal()
+        self._new[pageid] = (len(self._offsets) - 1) << 32 | len(self._open)
+        self._open += _RECORD.pack(len(record))
+        self._open += record
+        self._records += 1
+
+    def _seal(self) -> None:
+        """Compress the open block and append it to the data file."""
+        data = self._codec.compress(bytes(self._open))
+        self._data.seek(self._offsets[-1])
+        self._data.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self._open = bytearray()
+
+    def _merged(self):
+        """Page IDs and locations of the index and the new copies, by page ID."""
+        if np is not None:
+            new_ids = np.fromiter(self._new, dtype=np.uint64, count=len(self._new))
+            new_locations = np.fromiter(self._new.values(), dtype=np.uint64,
+                                        count=len(self._new))
+            ids = np.asarray(self._ids, dtype=np.uint64)
+            keep = ~np.isin(ids, new_ids)
+            ids = np.concatenate((ids[keep], new_ids))
+            locations = np.concatenate((np.asarray(self._locations, dtype=np.uint64)[keep],
+                                        new_locations))
+            order = np.argsort(ids, kind="stable")
+            return ids[order], locations[order]
+        merged = dict(zip(self._ids, self._locations))
+        merged.update(self._new)
+        ids = array("Q", sorted(merged))
+        return ids, array("Q", map(merged.__getitem__, ids))
+
+    def flush(self) -> None:
+        """Write out the open block and the index; new pages start a new block."""
+        if self._data.closed:
+            return
+        if self._pending is not None:
+            self._train()
+        if self._open:
+            self._seal()
+        self._data.flush()
+        os.fsync(self._data.fileno())
+        ids, locations = self._merged()
+        header = _HEADER.pack(MAGIC, VERSION, _CODECS.index(self._kind), len(self._offsets) - 1,
+                              len(ids), self._records, self._offsets[-1], len(self._dictionary))
+        _write(self.directory / _INDEX,
+               [header, self._dictionary, b"\0" * (-len(self._dictionary) % 8),
+                memoryview(self._offsets).cast("B"), memoryview(ids).cast("B"),
+                memoryview(locations).cast("B")])
+        self._ids = self._locations = None
+        self._load(self.directory / _INDEX)
+        self._new.clear()
+
+    def close(self) -> None:
+        if self._data.closed:
+            return
+        self.flush()
+        self._data.close()
+        self._cache.clear()
+        self._ids = self._locations = array("Q")
+        _release(self._maps)
+
+    def __enter__(self) -> ArticleStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
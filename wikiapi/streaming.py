@@ -0,0 +1,78 @@
+"""Blocking generators over the client's asynchronous streams.
+
+Each generator owns a private event loop running on a background thread, so
+a prefetched batch keeps downloading while the caller's loop body runs.
+Nothing is requested until the generator is first advanced, and closing it
+(or breaking out of the ``for`` loop) cancels whatever is still in flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any, TypeVar
+
+from .client import DEFAULT_ENDPOINT, WikiClient
+
+__all__ = ["iter_list", "iter_search", "iterate"]
+
+T = TypeVar("T")
+
+
+def iterate(factory: Callable[[WikiClient], AsyncIterator[T]], *,
+            endpoint: str = DEFAULT_ENDPOINT, **client_options: Any) -> Iterator[T]:
+    """Drive ``factory(client)`` from synchronous code, one item at a time."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="wikiapi-stream", daemon=True)
+    thread.start()
+
+    def call(coro):
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def start() -> tuple[WikiClient, AsyncIterator[T]]:
+        client = WikiClient(endpoint, **client_options)
+        return client, factory(client)
+
+    client, stream = call(start())
+    try:
+        while True:
+            try:
+                item = call(stream.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        try:
+            if hasattr(stream, "aclose"):
+                call(stream.aclose())
+            call(client.close())
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+def iter_search(query: str, *, namespace: int = 0, batch: int | str = "max",
+                prefetch: bool = False, endpoint: str = DEFAULT_ENDPOINT,
+                **client_options: Any) -> Iterator[dict[str, Any]]:
+    """Lazily yield every search hit for ``query``.
+
+    Memory stays at one batch (two with ``prefetch``) however many hits the
+    search has, and the first hit is available after the first request.
+    """
+    return iterate(lambda c: c.iter_search(query, namespace=namespace, batch=batch,
+                                           prefetch=prefetch),
+                   endpoint=endpoint, **client_options)
+
+
+def iter_list(name: str, params: dict[str, Any] | None = None, *, prefetch: bool = False,
+              endpoint: str = DEFAULT_ENDPOINT,
+              **client_options: Any) -> Iterator[dict[str, Any]]:
+    """Lazily yield the items of any ``list=`` module, e.g. ``allpages``.
+
+    ``params`` holds the module's own parameters, such as ``{"apprefix": "Graph"}``;
+    keyword arguments configure the client, as for :func:`iter_search`.
+    """
+    return iterate(lambda c: c.iter_list(name, prefetch=prefetch, **(params or {})),
+                   endpoint=endpoint, **client_options)
@@ -0,0 +1,407 @@
+"""Templates and infoboxes as typed key/value dicts.
+
+:class:`TemplateParser` splits a template invocation ``{{name|a|key=b}}``
+into its name and arguments, at the ``|`` that are not inside a nested
+template or link, and turns every argument into a Python value:
+
+* numbers (``6,114``, ``48.6``) become ``int`` or ``float`` and ``yes``
+  and ``no`` become ``bool``;
+* dates, written out (``17 April 1871``, ``1871-04-17``) or as date
+  templates (``{{birth date|1871|4|17}}``, ``{{start date}}``, ...),
+  become :class:`datetime.date`;
+* list templates (``{{plainlist}}``, ``{{ubl}}``, ``{{hlist}}``, ...) and
+  values split by ``<br>`` become lists of values;
+* ``{{convert}}`` becomes its number, ``{{coord}}`` a ``(lat, lon)`` pair
+  in degrees, and ``{{URL}}`` its address;
+* anything else becomes its plain text (see
+  :func:`~wikiapi.wikitext.to_plaintext`).  Empty arguments are left out.
+
+Most template invocations on Wikipedia are not unique: the same
+``{{flagicon|ITA}}``, ``{{convert|...}}`` or ``{{cite web |...}}`` recurs
+within an article and across many of them.  The parser keeps a bounded
+LRU of parsed invocations keyed by their source text, so a repeat is one
+dict lookup.  Nested templates go through the same cache.  Parsed
+:class:`Template` objects are shared between callers and must not be
+modified.
+
+:func:`iter_infoboxes` and :func:`iter_templates` work through documents
+in batches, in this process or on a process pool where each worker keeps
+its own cache across the batches it is given.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections import OrderedDict, deque
+from collections.abc import Collection, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import islice
+from typing import Any
+
+from .article import Article
+from .wikitext import _template_end, to_plaintext
+
+__all__ = ["Template", "TemplateParser", "extract_infobox", "extract_templates",
+           "iter_infoboxes", "iter_templates"]
+
+_SPLIT = re.compile(r"\{\{|\}\}|\[\[|\]\]|\|")
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref\s*>", re.S | re.I)
+_BREAK = re.compile(r"<br\s*/?>", re.I)
+_NUMBER = re.compile(r"[+-]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?")
+_DAY_MONTH_YEAR = re.compile(r"(\d{1,2}) ([A-Z][a-z]+),? (\d{3,4})")
+_MONTH_DAY_YEAR = re.compile(r"([A-Z][a-z]+) (\d{1,2}), (\d{3,4})")
+_ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_MONTHS = {datetime(2000, m, 1).strftime(fmt): m for m in range(1, 13) for fmt in ("%B", "%b")}
+_BOOLEANS = {"yes": True, "no": False, "true": True, "false": False}
+
+#: Templates whose positional arguments are year, month, day.  The "and
+#: age" ones give the date first and a reference date after it.
+_DATE_TEMPLATES = frozenset({
+    "birth date", "birth date and age", "bda", "death date", "death date and age",
+    "dda", "start date", "start date and age", "end date", "dob", "film date",
+    "release date", "date", "dts",
+})
+_LIST_TEMPLATES = frozenset({
+    "plainlist", "plain list", "flatlist", "flat list", "hlist", "ubl", "ubil",
+    "unbulleted list", "bulleted list", "ordered list", "collapsible list",
+})
+_MARKUP = frozenset("{[<'&")
+
+
+@dataclass(frozen=True, slots=True)
+class Template:
+    """One template invocation with typed arguments.
+
+    ``name`` is normalized the way MediaWiki resolves it (no ``Template:``
+    prefix, underscores as spaces, first letter upper case).  Positional
+    arguments are keyed ``"1"``, ``"2"``, ... as in MediaWiki.  ``raw``
+    keeps every argument's wikitext, empty ones included.
+    """
+
+    name: str
+    args: dict[str, Any]
+    raw: dict[str, str]
+
+    def __getitem__(self, key: str) -> Any:
+        return self.args[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.args.get(key, default)
+
+    @property
+    def is_infobox(self) -> bool:
+        return self.name.startswith("Infobox")
+
+
+def _split(body: str) -> list[str]:
+    """``body`` cut at the ``|`` that are not inside a nested template or link."""
+    if "{" not in body and "[" not in body:
+        return body.split("|")
+    parts = []
+    depth = 0
+    last = 0
+    for m in _SPLIT.finditer(body):
+        token = m.group()
+        if token == "|":
+            if depth == 0:
+                parts.append(body[last:m.start()])
+                last = m.end()
+        elif token in ("{{", "[["):
+            depth += 1
+        elif depth:
+            depth -= 1
+    parts.append(body[last:])
+    return parts
+
+
+def _head(parts: list[str]) -> str:
+    """Split a magic word or parser function off the first of ``parts`` and return its name.
+
+    ``{{#if:x|...}}`` and ``{{DEFAULTSORT:Key}}`` take their first
+    argument after the colon.
+    """
+    name = parts[0]
+    colon = name.find(":")
+    if colon > 0 and (name.startswith("#") or name[:colon].isupper()):
+        parts[0:1] = [name[:colon], name[colon + 1:]]
+        name = name[:colon]
+    return _template_name(name)
+
+
+def _template_name(name: str) -> str:
+    name = " ".join(name.replace("_", " ").split())
+    if name[:9].lower() == "template:":
+        name = name[9:].lstrip()
+    return name[:1].upper() + name[1:]
+
+
+def _top_level(wikitext: str) -> Iterator[tuple[int, int]]:
+    """Spans of the templates in ``wikitext`` that are not inside another."""
+    pos = wikitext.find("{{")
+    while pos >= 0:
+        end = _template_end(wikitext, pos)
+        if end < 0:
+            return
+        yield pos, end
+        pos = wikitext.find("{{", end)
+
+
+def _scalar(text: str) -> Any:
+    """``text`` (plain text, one line) as a number, boolean, date or itself."""
+    if not text:
+        return None
+    first = text[0]
+    if first.isdigit() or first in "+-":
+        # Codes with a leading zero (area codes, ZIP codes) stay strings.
+        if _NUMBER.fullmatch(text) and not (text[0] == "0" and text[1:2].isdigit()):
+            text = text.replace(",", "")
+            return float(text) if "." in text else int(text)
+        if m := _ISO_DATE.fullmatch(text):
+            return _date(m.group(1), m.group(2), m.group(3)) or text
+        if m := _DAY_MONTH_YEAR.fullmatch(text):
+            return _date(m.group(3), _MONTHS.get(m.group(2)), m.group(1)) or text
+    elif first.isupper():
+        if m := _MONTH_DAY_YEAR.fullmatch(text):
+            return _date(m.group(3), _MONTHS.get(m.group(1)), m.group(2)) or text
+    boolean = _BOOLEANS.get(text.lower())
+    return text if boolean is None else boolean
+
+
+def _date(year: Any, month: Any, day: Any) -> date | None:
+    try:
+        return date(int(year), int(month), int(day))
+    except (TypeError, ValueError):
+        return None
+
+
+def _degrees(parts: list[str]) -> tuple[float, list[str]]:
+    """Degrees from ``d [m [s]] N|S|E|W`` at the start of ``parts``, and the rest."""
+    value = 0.0
+    for i, part in enumerate(parts[:4]):
+        part = part.strip()
+        if part in ("N", "S", "E", "W"):
+            return (-value if part in ("S", "W") else value), parts[i + 1:]
+        value += float(part) / 60 ** i
+    raise ValueError("no hemisphere")
+
+
+def _coordinates(parts: list[str]) -> tuple[float, float] | None:
+    """``(lat, lon)`` from the positional arguments of ``{{coord}}``."""
+    try:
+        if any(part.strip() in ("N", "S") for part in parts[:4]):
+            lat, parts = _degrees(parts)
+            lon, _ = _degrees(parts)
+        else:
+            lat, lon = float(parts[0]), float(parts[1])
+    except (ValueError, IndexError):
+        return None
+    return lat, lon
+
+
+class TemplateParser:
+    """Parse template invocations into :class:`Template`, memoizing by source.
+
+    ``max_entries`` bounds the cache; the least recently used invocation
+    is dropped first.  ``hits`` and ``misses`` count cache lookups.
+    """
+
+    def __init__(self, max_entries: int = 1 << 16):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, Template] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def clear(self) -> None:
+        """Drop the cache and reset the counters."""
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+    def parse(self, source: str) -> Template:
+        """The template ``source`` (``{{...}}``, braces optional) with typed arguments."""
+        template = self._cache.get(source)
+        if template is not None:
+            self.hits += 1
+            self._cache.move_to_end(source)
+            return template
+        self.misses += 1
+        body = source[2:-2] if source.startswith("{{") and source.endswith("}}") else source
+        parts = _split(body)
+        name = _head(parts)
+        raw: dict[str, str] = {}
+        number = 0
+        for part in parts[1:]:
+            key, eq, value = part.partition("=")
+            if eq and "{{" not in key and "[[" not in key and "<" not in key:
+                raw[key.strip()] = value.strip()
+            else:
+                number += 1
+                raw[str(number)] = part.strip()
+        args = {}
+        for key, value in raw.items():
+            if value:
+                typed = self.value(value)
+                if typed is not None and typed != []:
+                    args[key] = typed
+        template = Template(name, args, raw)
+        self._cache[source] = template
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return template
+
+    def value(self, wikitext: str) -> Any:
+        """An argument's ``wikitext`` as a typed value (see the module docs)."""
+        if not _MARKUP.intersection(wikitext):
+            return _scalar(" ".join(wikitext.split()))
+        if "<" in wikitext:
+            if "<!--" in wikitext:
+                wikitext = _COMMENT.sub("", wikitext)
+            if "<ref" in wikitext or "<REF" in wikitext:
+                wikitext = _REF.sub("", wikitext)
+            wikitext = wikitext.strip()
+            if "<" in wikitext and _BREAK.search(wikitext):
+                items = [self.value(item) for item in _BREAK.split(wikitext)]
+                return [item for item in items if item is not None]
+        if wikitext.startswith("{{") and _template_end(wikitext, 0) == len(wikitext):
+            typed = self._template_value(self.parse(wikitext))
+            if typed is not None:
+                return typed
+        return _scalar(" ".join(to_plaintext(wikitext).text.split()))
+
+    def _template_value(self, template: Template) -> Any:
+        """The value a template in an argument stands for, or ``None`` for its text."""
+        name = template.name.lower()
+        args = template.args
+        if name in _DATE_TEMPLATES:
+            year = args.get("1")
+            if isinstance(year, date):
+                return year
+            if isinstance(year, int):
+                return _date(year, args.get("2", 1), args.get("3", 1)) or year
+            return None
+        if name in _LIST_TEMPLATES:
+            if "1" not in template.raw:
+                return []
+            if len(template.raw) > 1 and name not in ("plainlist", "plain list",
+                                                      "flatlist", "flat list"):
+                return [args[k] for k in template.raw if k.isdigit() and k in args]
+            items = [line.lstrip("*#: \t") for line in template.raw["1"].split("\n")]
+            return [self.value(item) for item in items if item]
+        if name in ("convert", "cvt"):
+            number = args.get("1")
+            return number if isinstance(number, (int, float)) else None
+        if name == "coord":
+            return _coordinates([template.raw[k] for k in template.raw if k.isdigit()])
+        if name in ("url", "official website"):
+            return template.raw.get("1") or template.raw.get("url") or None
+        if name in ("marriage", "nowrap", "lang", "small", "nobr", "flag", "flagcountry"):
+            value = args.get("2" if name == "lang" else "1")
+            return value
+        return None
+
+    def templates(self, wikitext: str, *, names: Collection[str] | None = None) -> list[Template]:
+        """The templates in ``wikitext`` that are not nested in another one.
+
+        With ``names``, only those templates (matched case-insensitively
+        on the first letter, as MediaWiki does) are parsed and returned.
+        """
+        wanted = None if names is None else {_template_name(n) for n in names}
+        found = []
+        for start, end in _top_level(wikitext):
+            if wanted is not None:
+                bar = wikitext.find("|", start, end)
+                if _head([wikitext[start + 2:end - 2 if bar < 0 else bar]]) not in wanted:
+                    continue
+            found.append(self.parse(wikitext[start:end]))
+        return found
+
+    def infobox(self, wikitext: str) -> Template | None:
+        """The first ``{{Infobox ...}}`` in ``wikitext``, or ``None``."""
+        for start, end in _top_level(wikitext):
+            if wikitext[start + 2:start + 10].lstrip().lower().startswith("infobox"):
+                return self.parse(wikitext[start:end])
+        return None
+
+
+_parser = TemplateParser()
+
+
+def extract_templates(wikitext: str, *, names: Collection[str] | None = None) -> list[Template]:
+    """:meth:`TemplateParser.templates` with a shared module-level parser."""
+    return _parser.templates(wikitext, names=names)
+
+
+def extract_infobox(wikitext: str) -> Template | None:
+    """:meth:`TemplateParser.infobox` with a shared module-level parser."""
+    return _parser.infobox(wikitext)
+
+
+def _wikitext(page: str | Article) -> str:
+    return page.text if isinstance(page, Article) else page
+
+
+def _batch(pages: list[str], names: Collection[str] | None,
+           infobox: bool) -> list[Any]:
+    """Worker: one batch of documents, with the worker's own parser."""
+    if infobox:
+        return [_parser.infobox(text) for text in pages]
+    return [_parser.templates(text, names=names) for text in pages]
+
+
+def _iter_batches(pages: Iterable[str | Article], names: Collection[str] | None,
+                  infobox: bool, batch_size: int, workers: int,
+                  parser: TemplateParser | None) -> Iterator[Any]:
+    texts = map(_wikitext, pages)
+    if workers <= 1:
+        parser = parser or _parser
+        while batch := list(islice(texts, batch_size)):
+            if infobox:
+                yield from (parser.infobox(text) for text in batch)
+            else:
+                yield from (parser.templates(text, names=names) for text in batch)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit() -> Future | None:
+            batch = list(islice(texts, batch_size))
+            if not batch:
+                return None
+            return pool.submit(_batch, batch, names, infobox)
+
+        pending: deque[Future] = deque()
+        for _ in range(2 * workers):
+            if (future := submit()) is None:
+                break
+            pending.append(future)
+        while pending:
+            results = pending.popleft().result()
+            if (future := submit()) is not None:
+                pending.append(future)
+            yield from results
+
+
+def iter_infoboxes(pages: Iterable[str | Article], *, batch_size: int = 64,
+                   workers: int | None = 1,
+                   parser: TemplateParser | None = None) -> Iterator[Template | None]:
+    """The infobox of each page (wikitext or :class:`Article`), in order.
+
+    Pages are taken ``batch_size`` at a time.  With ``workers > 1`` (or
+    ``None`` for one per CPU) batches go to a process pool, at most
+    ``2 * workers`` at a time, and each worker parses with its own cache;
+    otherwise they are parsed here with ``parser`` (default: the shared one).
+    """
+    workers = workers or os.cpu_count() or 1
+    return _iter_batches(pages, None, True, batch_size, workers, parser)
+
+
+def iter_templates(pages: Iterable[str | Article], *, names: Collection[str] | None = None,
+                   batch_size: int = 64, workers: int | None = 1,
+                   parser: TemplateParser | None = None) -> Iterator[list[Template]]:
+    """The top-level templates of each page, in order; see :func:`iter_infoboxes`."""
+    workers = workers or os.cpu_count() or 1
+    return _iter_batches(pages, names, False, batch_size, workers, parser)
@@ -0,0 +1,284 @@
+"""Memory-compact membership sets for crawl bookkeeping.
+
+:class:`PageIdBitmap` is an exact set of page IDs stored the way Roaring
+bitmaps do it: IDs are split into a 16-bit high part selecting a container
+and a 16-bit low part stored in it, either as a sorted ``array('H')`` while
+the container is sparse or as an 8 KiB bitmap once it holds more than 4096
+values.  Wikipedia page IDs are dense, so most containers end up as bitmaps
+costing one bit per ID.
+
+:class:`ScalableBloomFilter` handles keys that have no ID yet, such as
+titles seen as link targets.  It chains fixed-size Bloom filters of growing
+capacity and tightening error rates, so the overall false-positive rate
+stays under ``error_rate`` however many keys are added.
+
+:class:`VisitedSet` combines the two behind a ``set``-like interface.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Hashable, Iterable, Iterator
+from functools import reduce
+from hashlib import blake2b
+from operator import or_
+
+__all__ = ["BloomFilter", "PageIdBitmap", "ScalableBloomFilter", "VisitedSet"]
+
+_ARRAY_MAX = 4096
+_BITMAP_BYTES = 8192
+_BLOCK_BITS = 512
+_BLOCK_BYTES = _BLOCK_BITS // 8
+_MAX_HASHES = 8
+# Eight 16-bit words after the 4 block-selecting bytes of a 20-byte digest;
+# the low 9 bits of each pick a bit in the block.
+_POSITIONS = struct.Struct("<8H")
+_BIT_INDEX = (_BLOCK_BITS - 1).__and__
+_BIT = [1 << i for i in range(_BLOCK_BITS)]
+
+
+class PageIdBitmap:
+    """Exact set of non-negative 32-bit integers in Roaring-style containers."""
+
+    __slots__ = ("_containers", "_len")
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._containers: dict[int, array | bytearray] = {}
+        self._len = 0
+        for i in ids:
+            self.add(i)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] & (1 << (low & 7)))
+        pos = bisect_left(container, low)
+        return pos < len(container) and container[pos] == low
+
+    def add(self, value: int) -> bool:
+        """Add ``value``; return ``False`` if it was already present."""
+        if not 0 <= value < 1 << 32:
+            raise ValueError("page IDs must fit in 32 bits")
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            container = self._containers[high] = array("H")
+        if isinstance(container, bytearray):
+            byte, bit = low >> 3, 1 << (low & 7)
+            if container[byte] & bit:
+                return False
+            container[byte] |= bit
+        else:
+            pos = bisect_left(container, low)
+            if pos < len(container) and container[pos] == low:
+                return False
+            container.insert(pos, low)
+            if len(container) > _ARRAY_MAX:
+                self._containers[high] = _to_bitmap(container)
+        self._len += 1
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._containers):
+            base = high << 16
+            container = self._containers[high]
+            if isinstance(container, bytearray):
+                for byte_index, byte in enumerate(container):
+                    if byte:
+                        for bit in range(8):
+                            if byte & (1 << bit):
+                                yield base | (byte_index << 3) | bit
+            else:
+                for low in container:
+                    yield base | low
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint in bytes."""
+        total = sys.getsizeof(self._containers)
+        for container in self._containers.values():
+            total += sys.getsizeof(container)
+        return total
+
+
+def _to_bitmap(values: array) -> bytearray:
+    bitmap = bytearray(_BITMAP_BYTES)
+    for low in values:
+        bitmap[low >> 3] |= 1 << (low & 7)
+    return bitmap
+
+
+def _hash(key: str | bytes) -> bytes:
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return blake2b(key, digest_size=20).digest()
+
+
+class BloomFilter:
+    """Fixed-capacity, cache-blocked Bloom filter over BLAKE2b.
+
+    All bits of a key fall into one 512-bit block, so a lookup is a single
+    big-integer ``block & mask == mask`` test instead of one probe per hash.
+    The number of hashes is capped at :data:`_MAX_HASHES` to keep the mask
+    cheap to build; the bit count is sized for that ``k`` (plus 20% for the
+    accuracy that blocking costs) so ``error_rate`` still holds.
+    """
+
+    __slots__ = ("capacity", "error_rate", "num_blocks", "num_hashes", "count", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate in (0, 1)")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        k = min(_MAX_HASHES, max(1, round(-math.log2(error_rate))))
+        bits_per_key = -k / math.log(1 - error_rate ** (1 / k))
+        self.num_hashes = k
+        self.num_blocks = max(1, math.ceil(capacity * bits_per_key * 1.2 / _BLOCK_BITS))
+        self.count = 0
+        self._bits = bytearray(self.num_blocks * _BLOCK_BYTES)
+
+    def _locate(self, digest: bytes) -> tuple[int, int]:
+        offset = int.from_bytes(digest[:4], "little") % self.num_blocks * _BLOCK_BYTES
+        positions = _POSITIONS.unpack_from(digest, 4)[:self.num_hashes]
+        return offset, reduce(or_, map(_BIT.__getitem__, map(_BIT_INDEX, positions)))
+
+    def contains_hashed(self, digest: bytes) -> bool:
+        offset, mask = self._locate(digest)
+        block = int.from_bytes(self._bits[offset:offset + _BLOCK_BYTES], "little")
+        return block & mask == mask
+
+    def add_hashed(self, digest: bytes) -> None:
+        offset, mask = self._locate(digest)
+        end = offset + _BLOCK_BYTES
+        block = int.from_bytes(self._bits[offset:end], "little") | mask
+        self._bits[offset:end] = block.to_bytes(_BLOCK_BYTES, "little")
+        self.count += 1
+
+    def __contains__(self, key: str | bytes) -> bool:
+        return self.contains_hashed(_hash(key))
+
+    def add(self, key: str | bytes) -> None:
+        self.add_hashed(_hash(key))
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._bits)
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by chaining filters (Almeida et al., 2007).
+
+    Filter ``i`` has ``initial_capacity * growth**i`` slots and error rate
+    ``error_rate * (1 - ratio) * ratio**i``; the series sums to at most
+    ``error_rate``.
+    """
+
+    def __init__(self, error_rate: float = 1e-4, *, initial_capacity: int = 1 << 20,
+                 growth: int = 2, ratio: float = 0.85):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be in (0, 1)")
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.growth = growth
+        self.ratio = ratio
+        self.filters: list[BloomFilter] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _contains_hashed(self, digest: bytes) -> bool:
+        for bloom in reversed(self.filters):
+            if bloom.contains_hashed(digest):
+                return True
+        return False
+
+    def __contains__(self, key: str | bytes) -> bool:
+        return self._contains_hashed(_hash(key))
+
+    def add(self, key: str | bytes) -> bool:
+        """Add ``key``; return ``False`` if it was (probably) present."""
+        h = _hash(key)
+        if self._contains_hashed(h):
+            return False
+        if not self.filters or self.filters[-1].count >= self.filters[-1].capacity:
+            n = len(self.filters)
+            self.filters.append(BloomFilter(
+                self.initial_capacity * self.growth ** n,
+                self.error_rate * (1 - self.ratio) * self.ratio ** n,
+            ))
+        self.filters[-1].add_hashed(h)
+        self._len += 1
+        return True
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.filters) + sum(f.nbytes() for f in self.filters)
+
+
+def _key_bytes(key: Hashable) -> bytes:
+    if isinstance(key, str):
+        return key.encode("utf-8")
+    if isinstance(key, bytes):
+        return key
+    if isinstance(key, tuple):
+        return b"\x1f".join(_key_bytes(part) for part in key)
+    return repr(key).encode("utf-8")
+
+
+class VisitedSet:
+    """Set-like visited tracking with bounded memory.
+
+    Keys (titles, or ``(endpoint, title)`` pairs) go into a scalable Bloom
+    filter, so a key never added is reported as present with probability at
+    most ``error_rate``; added keys are always found.  Page IDs, once known,
+    go into an exact :class:`PageIdBitmap` per ``namespace`` (e.g. per wiki).
+    """
+
+    def __init__(self, error_rate: float = 1e-4, *, initial_capacity: int = 1 << 20):
+        self.error_rate = error_rate
+        self.keys = ScalableBloomFilter(error_rate, initial_capacity=initial_capacity)
+        self.pageids: dict[str, PageIdBitmap] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return _key_bytes(key) in self.keys
+
+    def add(self, key: Hashable) -> bool:
+        return self.keys.add(_key_bytes(key))
+
+    def add_pageid(self, pageid: int, namespace: str = "") -> bool:
+        """Record a page ID; return ``False`` if it was already recorded."""
+        bitmap = self.pageids.get(namespace)
+        if bitmap is None:
+            bitmap = self.pageids[namespace] = PageIdBitmap()
+        return bitmap.add(pageid)
+
+    def has_pageid(self, pageid: int, namespace: str = "") -> bool:
+        bitmap = self.pageids.get(namespace)
+        return bitmap is not None and pageid in bitmap
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint in bytes."""
+        return (self.keys.nbytes() + sys.getsizeof(self.pageids)
+                + sum(b.nbytes() for b in self.pageids.values()))
+
+    def memory_report(self) -> dict[str, int | float]:
+        return {
+            "keys": len(self.keys),
+            "key_bytes": self.keys.nbytes(),
+            "bloom_filters": len(self.keys.filters),
+            "pageids": sum(len(b) for b in self.pageids.values()),
+            "pageid_bytes": sum(b.nbytes() for b in self.pageids.values()),
+            "error_rate": self.error_rate,
+        }
@@ -0,0 +1,404 @@
+"""Wikitext to plain text in one pass.
+
+:func:`to_plaintext` turns an article's wikitext into readable text split
+into sections, for indexing and text analysis.  A common way to do this is
+a cascade of regular expressions (comments, then nested templates until
+none are left, refs, tables, links, quotes, ...), each a full pass over
+the article, some of them backtracking.  Here a single left-to-right scan
+finds the next character that can start markup, copies the plain text
+before it and handles the construct it starts:
+
+* templates ``{{...}}`` and tables ``{| ... |}`` are dropped, nested or
+  not, except for a few that only wrap text (``{{lang}}``,
+  ``{{nowrap}}``, ``{{convert}}``, ...);
+* ``<ref>``, ``<gallery>``, ``<syntaxhighlight>`` and similar elements are dropped
+  along with their content; other tags are dropped and their content is
+  kept; ``<nowiki>``, ``<pre>`` and ``<math>`` content is kept as is;
+* ``[[target|label]]`` keeps the label, ``[[File:...]]``,
+  ``[[Category:...]]`` and interlanguage links are dropped, and
+  ``[https://... label]`` keeps the label;
+* comments, bold and italic quotes, behaviour switches (``__TOC__``),
+  list markers and horizontal rules are dropped;
+* ``== headings ==`` start a new :class:`Section`.
+
+Only substring searches and regular expressions without nested
+repetition are used, so the running time is linear in the size of the
+wikitext.  The work that is the same everywhere in the text, dropping
+quote runs and list markers, decoding entities and tidying whitespace, is
+done once over the finished text by C-level string operations rather than
+per token.
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from dataclasses import dataclass
+
+__all__ = ["PlainText", "Section", "to_plaintext"]
+
+#: What can start markup in running text (headings start at "\n=").
+_SPECIAL = re.compile(r"\{\{|\{\||\[\[?|<|\n=|__")
+_BRACES = re.compile(r"\{\{|\}\}")
+_BRACKETS = re.compile(r"\[\[|\]\]")
+_TABLE_EDGE = re.compile(r"\n[ \t]*(\{\||\|\})")
+_TAG = re.compile(r"<(/?)([A-Za-z][A-Za-z0-9]*)[^<>]*>")
+
+#: Elements dropped with everything inside them.
+_DROP_TAGS = frozenset({
+    "ref", "references", "gallery", "timeline", "score", "imagemap",
+    "templatedata", "includeonly", "syntaxhighlight", "source", "graph", "mapframe",
+    "maplink", "hiero", "inputbox", "categorytree", "section",
+})
+#: Elements whose content is kept without interpreting it.
+_RAW_TAGS = frozenset({"nowiki", "pre", "math", "chem", "ce"})
+#: Link namespaces that do not render as text.
+_DROP_LINKS = frozenset({"file", "image", "media", "category"})
+#: Wikipedia language editions: a link prefixed with one is an interlanguage link.
+_LANGUAGES = frozenset("""
+    aa ab ace ady af ak als alt am ami an ang anp ar arc ary arz as ast atj av avk awa ay az
+    azb ba ban bar bat-smg bcl be be-tarask be-x-old bew bg bh bi bjn blk bm bn bo bpy br bs
+    bug bxr ca cbk-zam cdo ce ceb ch cho chr chy ckb co cr crh cs csb cu cv cy da dag de dga
+    din diq dsb dty dv dz ee el eml en eo es et eu ext fa fat ff fi fiu-vro fj fo fon fr frp
+    frr fur fy ga gag gan gcr gd gl glk gn gom gor got gpe gu guc gur guw gv ha hak haw he hi
+    hif ho hr hsb ht hu hy hyw hz ia id ie ig igl ii ik ilo inh io is it iu ja jam jbo jv ka
+    kaa kab kbd kbp kcg kg ki kj kk kl km kn knc ko koi kr krc ks ksh ku kus kv kw ky la lad
+    lb lbe lez lfn lg li lij lld lmo ln lo lrc lt ltg lv lzh mad mai map-bms mdf mg mh mhr mi
+    min mk ml mn mni mnw mos mr mrj ms mt mus mwl my myv mzn na nah nap nb nds nds-nl ne new
+    ng nia nl nn no nov nqo nr nrm nso nv ny oc olo om or os pa pag pam pap pcd pcm pdc pfl pi
+    pih pl pms pnb pnt ps pt pwn qu rm rmy rn ro roa-rup roa-tara rsk ru rue rup rw sa sah sat
+    sc scn sco sd se sg sh shi shn si simple sk skr sl sm smn sn so sq sr srn ss st stq su sv
+    sw szl szy ta tay tcy tdd te tet tg th ti tig tk tl tly tn to tpi tr trv ts tt tum tw ty
+    tyv udm ug uk ur uz ve vec vep vi vls vo wa war wo wuu xal xh xmf yi yo yue za zea zgh zh
+    zh-classical zh-min-nan zh-yue zu
+""".split())
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_URL_SCHEMES = ("http://", "https://", "//", "ftp://", "mailto:", "irc://", "news:")
+#: Marks where a section starts in the text before it is tidied.
+_SECTION = "\x00"
+# Each of these starts with a literal, which the regex engine searches for
+# much faster than for a character class.
+_LINE_START = re.compile(r"\n[ *#:;]+")
+_SPACE_RUN = re.compile(r"  +")
+_BLANK_RUN = re.compile(r"\n\n\n+")
+_CLOSE_TAGS: dict[str, re.Pattern] = {}
+#: Words between the numbers of a ``{{convert}}`` range.
+_RANGE_WORDS = frozenset({"-", "–", "to", "and", "or", "x", "×", "by", "+", "to(-)"})
+
+#: Templates that render (some of) their arguments: name -> positional argument.
+_TEXT_TEMPLATES = {
+    "nowrap": 1, "nobr": 1, "small": 1, "smaller": 1, "big": 1, "larger": 1, "em": 1,
+    "strong": 1, "lang": 2, "transl": 2, "abbr": 1, "ill": 1, "interlanguage link": 1,
+    "vanchor": 1, "visible anchor": 1, "nihongo": 1, "sic": 1, "not a typo": 1,
+    "proper name": 1, "math": 1, "mvar": 1, "var": 1, "keypress": 1, "ship": 2,
+}
+
+
+@dataclass(slots=True)
+class Section:
+    """A heading and its body in :attr:`PlainText.text`.
+
+    ``start``/``end`` span the heading line and the body; the lead section
+    has an empty title and level 0.
+    """
+
+    title: str
+    level: int
+    start: int
+    end: int
+
+
+@dataclass(slots=True)
+class PlainText:
+    """Plain text of an article and its sections, in order."""
+
+    text: str
+    sections: list[Section]
+
+    def section(self, title: str) -> str | None:
+        """Body of the first section called ``title``, without the heading."""
+        for section in self.sections:
+            if section.title == title:
+                body = self.text[section.start:section.end]
+                return body.partition("\n")[2] if section.level else body
+        return None
+
+
+def _template_text(body: str) -> str:
+    """Text rendered by a template without nested templates (or ``""``)."""
+    bar = body.find("|")
+    if bar < 0:
+        return ""
+    name = body[:bar].strip().lower()
+    if name.startswith("lang-"):
+        which = 1
+    elif name in ("convert", "cvt"):
+        args = [p.strip() for p in body.split("|")[1:] if "=" not in p]
+        i = 1
+        while i + 1 < len(args) and args[i] in _RANGE_WORDS:
+            i += 2
+        return " ".join(args[:i + 1])
+    else:
+        which = _TEXT_TEMPLATES.get(name.replace("_", " "))
+        if which is None:
+            return ""
+    positional = [p for p in body.split("|")[1:] if "=" not in p]
+    if len(positional) < which:
+        return ""
+    return _inline(positional[which - 1].strip())
+
+
+def _heading(line: str) -> tuple[int, str] | None:
+    """Level and title of a heading line, or ``None`` if it is ordinary text."""
+    if "<!--" in line:
+        line = _COMMENT.sub("", line)
+    line = line.rstrip()
+    level = min(len(line) - len(line.lstrip("=")), len(line) - len(line.rstrip("=")), 6)
+    if level < 1 or len(line) <= 2 * level:
+        return None
+    return level, line[level:-level].strip()
+
+
+def _inline(text: str) -> str:
+    """Clean a fragment (a link label, a heading) to one line of text."""
+    if "{" in text or "[" in text or "<" in text or "__" in text:
+        chunks: list[str] = []
+        _scan(text, chunks, None)
+        text = "".join(chunks)
+    if "''" in text:
+        text = text.replace("\'\'\'", "").replace("\'\'", "")
+    return " ".join(text.split())
+
+
+def _template_end(text: str, pos: int) -> int:
+    """End of the template starting at ``pos``, or -1 if unclosed."""
+    close = text.find("}}", pos + 2)
+    if close < 0:
+        return -1
+    if text.find("{{", pos + 2, close) < 0:
+        return close + 2
+    depth = 0
+    for m in _BRACES.finditer(text, pos):
+        depth += 1 if m.group() == "{{" else -1
+        if depth == 0:
+            return m.end()
+    return -1
+
+
+def _link_end(text: str, pos: int) -> int:
+    """End of the ``[[link]]`` starting at ``pos``, or -1 if unclosed."""
+    close = text.find("]]", pos + 2)
+    if close < 0:
+        return -1
+    if text.find("[[", pos + 2, close) < 0:
+        return close + 2
+    depth = 0
+    for m in _BRACKETS.finditer(text, pos):
+        depth += 1 if m.group() == "[[" else -1
+        if depth == 0:
+            return m.end()
+    return -1
+
+
+def _link_text(inner: str) -> str:
+    target, bar, label = inner.partition("|")
+    if ":" in target:
+        target = target.strip()
+        if target.startswith(":"):  # [[:Category:X]] links to the page instead
+            target = target[1:]
+        else:
+            prefix = target.partition(":")[0].strip().lower()
+            if prefix in _DROP_LINKS or prefix in _LANGUAGES:
+                return ""  # files, categories, interlanguage links
+    if not bar:
+        return _inline(target.replace("_", " "))
+    if "|" in label:  # only files take several arguments; the label is the last
+        label = label.rpartition("|")[2]
+    if not label:  # the pipe trick: [[Paris, Texas|]] shows "Paris"
+        return target.partition("(")[0].partition(",")[0].strip()
+    if "{" in label or "[" in label or "<" in label:
+        return _inline(label)
+    return label
+
+
+def _table_end(text: str, pos: int) -> int:
+    """End of the line closing the table that starts at ``pos``."""
+    depth = 1
+    for m in _TABLE_EDGE.finditer(text, pos + 2):
+        depth += 1 if m.group(1) == "{|" else -1
+        if depth == 0:
+            end = text.find("\n", m.end())
+            return len(text) if end < 0 else end
+    return len(text)
+
+
+def _close_tag(text: str, name: str, pos: int) -> tuple[int, int]:
+    """Start and end of the first ``</name>`` at or after ``pos``, or ``(-1, -1)``."""
+    start = text.find("</" + name, pos)
+    if start < 0:
+        pattern = _CLOSE_TAGS.get(name)
+        if pattern is None:
+            pattern = _CLOSE_TAGS[name] = re.compile(f"</{name}", re.I)
+        m = pattern.search(text, pos)
+        if m is None:
+            return -1, -1
+        start = m.start()
+    end = text.find(">", start)
+    return start, len(text) if end < 0 else end + 1
+
+
+def _scan(text: str, chunks: list[str], sections: list | None) -> None:
+    """Append the text of ``text`` with its markup removed to ``chunks``.
+
+    Quote runs, list markers and extra whitespace are left for
+    :func:`_tidy`.  With ``sections`` (a list of ``(title, level)``),
+    headings are recorded there and marked by ``_SECTION`` in the text.
+    """
+    n = len(text)
+    pos = 0
+    append = chunks.append
+    search = _SPECIAL.search
+    while True:
+        m = search(text, pos)
+        if m is None:
+            append(text[pos:])
+            return
+        start = m.start()
+        if start > pos:
+            append(text[pos:start])
+        token = m.group()
+        pos = m.end()
+        if token == "[[":
+            end = _link_end(text, start)
+            if end < 0:
+                append(token)
+                continue
+            inner = text[pos:end - 2]
+            bar = inner.find("|")
+            if 0 < bar < len(inner) - 1 and inner.find("|", bar + 1) < 0 and not (
+                    ":" in inner or "[" in inner or "{" in inner or "<" in inner):
+                append(inner[bar + 1:])  # the common [[target|label]]
+            else:
+                append(_link_text(inner))
+            pos = end
+        elif token == "{{":
+            end = _template_end(text, start)
+            if end < 0:
+                append(token)
+            else:
+                body = text[pos:end - 2]
+                if "{" not in body:
+                    rendered = _template_text(body)
+                    if rendered:
+                        append(rendered)
+                pos = end
+        elif token == "<":
+            if text.startswith("!--", pos):
+                end = text.find("-->", pos)
+                pos = n if end < 0 else end + 3
+                continue
+            tag = _TAG.match(text, start)
+            if tag is None:
+                append(token)
+                continue
+            pos = tag.end()
+            name = tag.group(2).lower()
+            if tag.group(1) or text[pos - 2] == "/":
+                if name == "br":
+                    append("\n")
+            elif name in _DROP_TAGS:
+                pos = _close_tag(text, name, pos)[1]
+                if pos < 0:
+                    pos = n
+            elif name in _RAW_TAGS:
+                close, end = _close_tag(text, name, pos)
+                if close >= 0:
+                    append(text[pos:close])
+                    pos = end
+            elif name == "br":
+                append("\n")
+        elif token == "[":
+            end = text.find("]", pos)
+            if end < 0 or not text.startswith(_URL_SCHEMES, pos) or text.find("\n", pos, end) >= 0:
+                append(token)
+            else:
+                label = text[pos:end].partition(" ")[2]
+                if label:
+                    append(_inline(label))
+                pos = end + 1
+        elif token == "\n=":
+            append("\n")
+            end = text.find("\n", pos)
+            end = n if end < 0 else end
+            heading = _heading(text[start + 1:end])
+            if sections is not None and heading is not None:
+                level, title = heading
+                sections.append((_inline(title), level))
+                append(_SECTION)
+                pos = end
+            else:
+                pos = start + 1
+        elif token == "{|":
+            # A table only starts a line (perhaps indented with ":").
+            line = text.rfind("\n", 0, start) + 1
+            if text[line:start].strip(" \t:"):
+                append(token)
+            else:
+                pos = _table_end(text, start)
+        else:  # "__"
+            end = pos
+            while end < n and text[end].isupper():
+                end += 1
+            if end > pos and text.startswith("__", end):
+                pos = end + 2
+            else:
+                append(token)
+
+
+def _tidy(text: str) -> str:
+    """Drop quotes and list markers, decode entities and tidy whitespace."""
+    if "''" in text:
+        text = text.replace("\'\'\'", "").replace("\'\'", "")
+    if "&" in text:
+        text = html.unescape(text)
+    if "\n----" in text:
+        text = text.replace("\n----", "\n")
+    text = text.replace("\t", " ").replace("\xa0", " ")
+    text = _SPACE_RUN.sub(" ", text)
+    while " \n" in text:
+        text = text.replace(" \n", "\n")
+    text = _LINE_START.sub("\n", text)
+    text = _BLANK_RUN.sub("\n\n", text)
+    # Gaps left where templates and refs were: "born ( ; 1900 )" and "word ."
+    text = text.replace(" ,", ",").replace(" ;", ";").replace(" )", ")")
+    text = text.replace(" .\n", ".\n").replace(" . ", ". ")
+    if "(" in text:
+        text = text.replace("(;", "(").replace("(,", "(").replace("( ", "(")
+        if "()" in text:
+            text = text.replace(" ()", "").replace("()", "")
+    return text
+
+
+def to_plaintext(wikitext: str) -> PlainText:
+    """Plain text of ``wikitext`` with its section boundaries."""
+    if _SECTION in wikitext:
+        wikitext = wikitext.replace(_SECTION, "")
+    chunks: list[str] = []
+    headings: list[tuple[str, int]] = [("", 0)]
+    # The leading newline lets a heading or table on the first line be found.
+    _scan("\n" + wikitext, chunks, headings)
+    bodies = _tidy("".join(chunks)).split(_SECTION)
+    parts = []
+    sections = []
+    pos = 0
+    for (title, level), body in zip(headings, bodies):
+        body = body.strip()
+        part = (f"{title}\n{body}" if body else title) if level else body
+        if not part:
+            continue
+        if parts:
+            pos += 2
+        parts.append(part)
+        sections.append(Section(title, level, pos, pos + len(part)))
+        pos += len(part)
+    return PlainText("\n\n".join(parts), sections)